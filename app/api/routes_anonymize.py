@@ -1,10 +1,12 @@
 from __future__ import annotations
 
 from fastapi import APIRouter, Depends, HTTPException
+from app.core.errors import AppError
 from app.core.security import require_api_key
 from app.models.schemas import AnonymizeTextRequest, AnonymizeTextResponse
 from app.services.pipeline_text import TextPipeline
 from app.services.anonymizer import Anonymizer
+from app.services.concurrency import detection_pool
 
 router = APIRouter(prefix="/anonymize", tags=["anonymize"], dependencies=[Depends(require_api_key)])
 
@@ -13,9 +15,10 @@ anonymizer = Anonymizer(salt="dcp_eval_salt")  # en prod: env var
 
 
 @router.post("/text", response_model=AnonymizeTextResponse)
-def anonymize_text(req: AnonymizeTextRequest):
+async def anonymize_text(req: AnonymizeTextRequest):
     try:
-        spans, _, summary, _ = pipeline.detect(
+        spans, _, summary, _ = await detection_pool(req.detectors).run(
+            pipeline.detect,
             text=req.text,
             language=req.language,
             detectors=req.detectors,
@@ -26,5 +29,7 @@ def anonymize_text(req: AnonymizeTextRequest):
         )
         anon = anonymizer.anonymize(req.text, spans, strategy=req.strategy)
         return AnonymizeTextResponse(anonymized_text=anon, spans=spans, summary=summary)
+    except AppError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
@@ -1,8 +1,10 @@
 from __future__ import annotations
 
 from fastapi import APIRouter, Depends, HTTPException
+from app.core.errors import AppError
 from app.core.security import require_api_key
 from app.models.schemas import BenchTextRequest
+from app.services.concurrency import get_work_pool
 from app.services.pipeline_text import TextPipeline
 
 router = APIRouter(prefix="/bench", tags=["bench"], dependencies=[Depends(require_api_key)])
@@ -11,13 +13,16 @@ pipeline = TextPipeline()
 
 
 @router.post("/text")
-def bench_text(req: BenchTextRequest):
+async def bench_text(req: BenchTextRequest):
     try:
-        return pipeline.bench(
+        return await get_work_pool("model").run(
+            pipeline.bench,
             text=req.text,
             language=req.language,
             detectors=req.detectors,
             min_score=req.min_score,
         )
+    except AppError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
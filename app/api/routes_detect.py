@@ -1,8 +1,17 @@
 from __future__ import annotations
 
 from fastapi import APIRouter, Depends, HTTPException
+from app.core.errors import AppError
 from app.core.security import require_api_key
-from app.models.schemas import DetectTextRequest, DetectTextResponse, DetectStructuredRequest
+from app.models.schemas import (
+    DetectBatchRequest,
+    DetectBatchResponse,
+    DetectStructuredRequest,
+    DetectTextRequest,
+    DetectTextResponse,
+    ProfileStructuredRequest,
+)
+from app.services.concurrency import detection_pool
 from app.services.pipeline_text import TextPipeline
 from app.services.pipeline_structured import StructuredPipeline
 
@@ -13,9 +22,10 @@ structured_pipeline = StructuredPipeline()
 
 
 @router.post("/text", response_model=DetectTextResponse)
-def detect_text(req: DetectTextRequest):
+async def detect_text(req: DetectTextRequest):
     try:
-        spans, by_detector, summary, errors = text_pipeline.detect(
+        res = await detection_pool(req.detectors).run(
+            text_pipeline.run,
             text=req.text,
             language=req.language,
             detectors=req.detectors,
@@ -23,21 +33,87 @@ def detect_text(req: DetectTextRequest):
             merge_overlaps=req.merge_overlaps,
             return_text=req.return_text,
             best_effort=req.best_effort,
+            parallel=req.parallel,
+            cascade=req.cascade,
         )
-        return DetectTextResponse(spans=spans, by_detector=by_detector, summary=summary, errors=errors)
+        return DetectTextResponse(
+            spans=res.spans,
+            by_detector=res.by_detector,
+            summary=res.summary,
+            errors=res.errors,
+            timings_ms=res.timings_ms,
+            cascade=res.cascade,
+        )
+    except AppError:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/batch", response_model=DetectBatchResponse)
+async def detect_batch(req: DetectBatchRequest):
+    try:
+        results, timings = await detection_pool(req.detectors).run(
+            text_pipeline.detect_batch,
+            texts=req.texts,
+            language=req.language,
+            detectors=req.detectors,
+            min_score=req.min_score,
+            merge_overlaps=req.merge_overlaps,
+            return_text=req.return_text,
+            best_effort=req.best_effort,
+            parallel=req.parallel,
+            cascade=req.cascade,
+        )
+        return DetectBatchResponse(
+            results=[
+                DetectTextResponse(
+                    spans=r.spans, by_detector=r.by_detector, summary=r.summary, errors=r.errors, cascade=r.cascade
+                )
+                for r in results
+            ],
+            timings_ms=timings,
+        )
+    except AppError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.post("/structured")
-def detect_structured(req: DetectStructuredRequest):
+async def detect_structured(req: DetectStructuredRequest):
     # Retour libre (détaillé par champ)
     try:
-        return structured_pipeline.detect_object(
+        return await detection_pool(req.detectors).run(
+            structured_pipeline.detect_object,
+            obj=req.obj,
+            language=req.language,
+            detectors=req.detectors,
+            min_score=req.min_score,
+        )
+    except AppError:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/structured/profile")
+async def profile_structured(req: ProfileStructuredRequest):
+    # Profil par colonne (échantillonnage + arrêt anticipé), pas de détail par cellule
+    try:
+        return await detection_pool(req.detectors).run(
+            structured_pipeline.profile,
             obj=req.obj,
             language=req.language,
             detectors=req.detectors,
             min_score=req.min_score,
+            max_samples=req.max_samples,
+            step=req.step,
+            min_rate=req.min_rate,
+            confidence=req.confidence,
+            seed=req.seed,
         )
+    except AppError:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=400, detail=str(e))
@@ -1,14 +1,17 @@
 from __future__ import annotations
 
-import os
-import uuid
+import json
+from dataclasses import asdict
 from pathlib import Path
 
 from fastapi import APIRouter, Depends, File, UploadFile, HTTPException
+from fastapi.responses import StreamingResponse
+from app.core.errors import AppError
 from app.core.security import require_api_key
-from app.core.config import get_settings
+from app.services.concurrency import get_work_pool
 from app.services.pipeline_docs import DocumentPipeline
 from app.services.pipeline_images import ImagePipeline
+from app.services.uploads import StoredUpload, get_upload_store
 
 router = APIRouter(prefix="/files", tags=["files"], dependencies=[Depends(require_api_key)])
 
@@ -16,55 +19,136 @@ doc_pipeline = DocumentPipeline()
 img_pipeline = ImagePipeline()
 
 
-def _save_upload(upload: UploadFile) -> str:
-    settings = get_settings()
-    tmp_dir = Path(settings.storage_dir)
-    tmp_dir.mkdir(parents=True, exist_ok=True)
-    suffix = Path(upload.filename or "").suffix
-    path = tmp_dir / f"upload_{uuid.uuid4().hex}{suffix}"
-    with path.open("wb") as f:
-        f.write(upload.file.read())
-    return str(path)
+def _save_upload(upload: UploadFile) -> StoredUpload:
+    """Chunked copy to storage_dir/uploads (size limit, sha256); remove it once processed."""
+    return get_upload_store().save(upload)
 
 
 @router.post("/detect/document")
-def detect_document(
+async def detect_document(
     file: UploadFile = File(...),
     language: str = "fr",
     detectors: str = "regex,presidio",
     min_score: float = 0.4,
 ):
+    def work():
+        with _save_upload(file) as up:
+            spans, by_det, summary, errors = doc_pipeline.detect_file(
+                file_path=up.path,
+                language=language,
+                detectors=[d.strip() for d in detectors.split(",") if d.strip()],
+                min_score=min_score,
+                merge_overlaps=True,
+                return_text=False,
+            )
+        return {
+            "spans": spans,
+            "by_detector": by_det,
+            "summary": summary,
+            "errors": errors,
+            "file": file.filename,
+            "sha256": up.sha256,
+        }
+
     try:
-        path = _save_upload(file)
-        spans, by_det, summary, errors = doc_pipeline.detect_file(
-            file_path=path,
-            language=language,
-            detectors=[d.strip() for d in detectors.split(",") if d.strip()],
-            min_score=min_score,
-            merge_overlaps=True,
-            return_text=False,
-        )
-        return {"spans": spans, "by_detector": by_det, "summary": summary, "errors": errors, "file": file.filename}
+        return await get_work_pool("extract").run(work)
+    except AppError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
-@router.post("/detect/image")
-def detect_image(
+@router.post("/detect/document/stream")
+async def detect_document_stream(
     file: UploadFile = File(...),
     language: str = "fr",
     detectors: str = "regex,presidio",
     min_score: float = 0.4,
 ):
+    """NDJSON: une ligne par page (PDF) dès qu'elle est traitée, puis une ligne de synthèse.
+
+    Les offsets des spans sont relatifs à la page. Les autres formats
+    produisent une seule ligne (page = null).
+    """
+    pool = get_work_pool("extract")
+    pool.admit()  # libéré à la fin du stream
     try:
-        path = _save_upload(file)
-        spans, by_det, summary, errors = img_pipeline.detect_image(
-            image_path=path,
+        up = await pool.call(_save_upload, file)
+    except BaseException:
+        pool.release()
+        raise
+    dets = [d.strip() for d in detectors.split(",") if d.strip()]
+
+    def pages():
+        # fichier supprimé en fin de stream (sinon purgé par le sweep des uploads)
+        with up:
+            if Path(up.path).suffix.lower() == ".pdf":
+                yield from doc_pipeline.detect_pages(
+                    file_path=up.path, language=language, detectors=dets, min_score=min_score, return_text=False
+                )
+                return
+            spans, by_det, summary, errors = doc_pipeline.detect_file(
+                file_path=up.path, language=language, detectors=dets, min_score=min_score, return_text=False
+            )
+            yield {"page": None, "spans": spans, "by_detector": by_det, "summary": summary, "errors": errors}
+
+    def lines():
+        total: dict = {}
+        n_pages = 0
+        try:
+            for res in pages():
+                n_pages += 1
+                for label, n in res["summary"].items():
+                    total[label] = total.get(label, 0) + n
+                res["spans"] = [s.model_dump() for s in res["spans"]]
+                res["by_detector"] = {k: [s.model_dump() for s in v] for k, v in res["by_detector"].items()}
+                yield json.dumps({"type": "page", **res}, ensure_ascii=False) + "\n"
+        except Exception as e:
+            yield json.dumps({"type": "error", "detail": str(e)}, ensure_ascii=False) + "\n"
+        yield json.dumps(
+            {"type": "summary", "pages": n_pages, "summary": total, "file": file.filename, "sha256": up.sha256},
+            ensure_ascii=False,
+        ) + "\n"
+
+    return StreamingResponse(pool.stream(lines()), media_type="application/x-ndjson")
+
+
+@router.post("/detect/image")
+async def detect_image(
+    file: UploadFile = File(...),
+    language: str = "fr",
+    detectors: str = "regex,presidio",
+    min_score: float = 0.4,
+    ocr_lines: bool = False,
+):
+    """`ocr_lines=true` adds the OCR lines (text, confidence, box) to the response."""
+
+    def work():
+        with _save_upload(file) as up:
+            # le sha256 de l'upload sert directement de clé au cache OCR
+            ocr = img_pipeline.ocr_result(up.path, digest=up.sha256)
+        spans, by_det, summary, errors = img_pipeline.detect_ocr_text(
+            text=ocr.text,
             language=language,
             detectors=[d.strip() for d in detectors.split(",") if d.strip()],
             min_score=min_score,
             merge_overlaps=True,
         )
-        return {"spans": spans, "by_detector": by_det, "summary": summary, "errors": errors, "file": file.filename}
+        out = {
+            "spans": spans,
+            "by_detector": by_det,
+            "summary": summary,
+            "errors": errors,
+            "file": file.filename,
+            "sha256": up.sha256,
+        }
+        if ocr_lines:
+            out["ocr"] = {"width": ocr.width, "height": ocr.height, "lines": [asdict(line) for line in ocr.lines]}
+        return out
+
+    try:
+        return await get_work_pool("extract").run(work)
+    except AppError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
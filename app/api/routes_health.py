@@ -4,5 +4,6 @@ router = APIRouter(tags=["health"])
 
 
 @router.get("/health")
-def health():
+async def health():
+    # async + sans I/O: servi par la boucle même quand les pools sont saturés
     return {"status": "ok"}
\ No newline at end of file
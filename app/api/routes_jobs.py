@@ -1,61 +1,153 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, HTTPException
-from app.core.security import require_api_key
-from app.jobs.queue import JobQueue
-from app.jobs.worker import JobWorker
+import asyncio
+import json
+import time
+from typing import AsyncIterator, List, Optional, Tuple
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from app.core.config import get_settings
+from app.core.errors import TooManyRequests
+from app.core.security import require_api_key, tenant_id
+from app.jobs.queue import JobEventRecord, JobQueue, JobRecord
 from app.models.schemas import BenchTextRequest, ScanRequest
-from app.services.pipeline_text import TextPipeline
-from app.services.scan_service import ScanService  # ci-dessous
+from app.services.concurrency import get_work_pool
 
 router = APIRouter(prefix="/jobs", tags=["jobs"], dependencies=[Depends(require_api_key)])
 
+# File durable (table job_results): les jobs sont exécutés par le worker
+# in-process de l'API et/ou par des workers externes (python -m app.jobs.worker)
 queue = JobQueue()
-worker = JobWorker(queue, max_workers=2)
 
-pipeline = TextPipeline()
-scan_service = ScanService()
+# None = classe par défaut du kind (settings.jobs_default_priority)
+PriorityParam = Query(default=None, pattern="^(interactive|batch|bulk)$")
 
 
 @router.post("/bench")
-def create_bench_job(req: BenchTextRequest):
-    job = queue.create(kind="bench_text", meta={"detectors": req.detectors, "language": req.language})
-
-    def run():
-        report = pipeline.bench(
-            text=req.text,
-            language=req.language,
-            detectors=req.detectors,
-            min_score=req.min_score,
-        )
-        return {"report": report}
-
-    worker.submit(job_id=job.id, fn=run)
-    return {"job_id": job.id}
+def create_bench_job(req: BenchTextRequest, priority: Optional[str] = PriorityParam, tenant: str = Depends(tenant_id)):
+    job = queue.enqueue(
+        kind="bench_text",
+        params=req.model_dump(),
+        meta={"detectors": req.detectors, "language": req.language},
+        priority=priority,
+        tenant=tenant,
+    )
+    return {"job_id": job.id, "priority": job.priority}
 
 
 @router.post("/scan")
-def create_scan_job(req: ScanRequest):
-    job = queue.create(kind="scan", meta={"root": req.root, "connector": req.connector})
+def create_scan_job(req: ScanRequest, priority: Optional[str] = PriorityParam, tenant: str = Depends(tenant_id)):
+    job = queue.enqueue(
+        kind="scan",
+        params=req.model_dump(),
+        meta={"root": req.root, "connector": req.connector},
+        priority=priority,
+        tenant=tenant,
+    )
+    return {"job_id": job.id, "priority": job.priority}
 
-    def run():
-        return scan_service.scan(
-            connector=req.connector,
-            root=req.root,
-            recursive=req.recursive,
-            language=req.language,
-            detectors=req.detectors,
-            min_score=req.min_score,
-            limit=req.limit,
-        )
 
-    worker.submit(job_id=job.id, fn=run)
-    return {"job_id": job.id}
+@router.get("/stats")
+async def jobs_stats():
+    """Queue depth and wait times per priority class, running jobs per kind / tenant."""
+    stats = await get_work_pool("jobs").run(queue.stats)
+    settings = get_settings()
+    if settings.jobs_inprocess_workers > 0:
+        from app.jobs.worker import get_job_worker
+
+        stats["local_worker"] = get_job_worker().stats()
+    return stats
 
 
 @router.get("/{job_id}")
-def get_job(job_id: str):
-    job = queue.get(job_id)
+async def get_job(job_id: str):
+    # lecture en base (job créé par n'importe quel replica), hors event loop, sur
+    # le pool jobs et sans admission: jamais de 429 pendant une rafale de /detect
+    job = await get_work_pool("jobs").call(queue.get, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="job_not_found")
+    return job
+
+
+@router.post("/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    """Cancel a queued job, or ask a running one to stop (at its next progress report)."""
+    status = await get_work_pool("jobs").run(queue.cancel, job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="job_not_found")
+    return {"job_id": job_id, "status": status.value, "cancel_requested": status.value == "running"}
+
+
+@router.get("/{job_id}/status")
+async def get_job_status(job_id: str):
+    """Job state without its result (cheap to poll)."""
+    job = await get_work_pool("jobs").call(queue.status, job_id)
     if not job:
         raise HTTPException(status_code=404, detail="job_not_found")
-    return job
\ No newline at end of file
+    return job
+
+
+def _sse(event: JobEventRecord) -> str:
+    data = json.dumps(event.data, ensure_ascii=False, default=str)
+    return f"id: {event.id}\nevent: {event.type}\ndata: {data}\n\n"
+
+
+@router.get("/{job_id}/events")
+async def stream_job_events(job_id: str, last_event_id: Optional[str] = Header(default=None)):
+    """Server-Sent Events: status, progress, per-file results, then done / error.
+
+    Events are read from job_events (written by whichever worker runs the
+    job), so any replica can serve the stream. A client reconnecting with
+    Last-Event-ID resumes after that event. The stream ends with an `end`
+    event carrying the final status.
+    """
+    settings = get_settings()
+    pool = get_work_pool("jobs")
+    job = await pool.run(queue.status, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="job_not_found")
+    after = int(last_event_id) if last_event_id and last_event_id.isdigit() else 0
+    min_poll = settings.jobs_stream_poll_ms / 1000.0
+    max_poll = max(min_poll, settings.jobs_stream_max_poll_ms / 1000.0)
+
+    def poll_once(after_id: int) -> Tuple[Optional[JobRecord], List[JobEventRecord]]:
+        # lu avant les events: tout event antérieur à la fin du job est déjà en base
+        return queue.status(job_id), queue.events_since(job_id, after_id)
+
+    async def events() -> AsyncIterator[str]:
+        nonlocal after
+        last_sent = time.monotonic()
+        poll = min_poll
+        while True:
+            try:
+                # avec admission: trop de clients SSE => on espace les lectures
+                # au lieu d'occuper le pool
+                state, batch = await pool.run(poll_once, after)
+            except TooManyRequests:
+                state, batch = None, None
+            if batch is not None:
+                for event in batch:
+                    yield _sse(event)
+                    after = event.id
+                if batch:
+                    last_sent = time.monotonic()
+                    poll = min_poll
+                    continue  # peut-être d'autres events en attente
+                if state is None or state.status.finished:
+                    status = state.status.value if state else "unknown"
+                    end = {"status": status, "error": state.error if state else None}
+                    yield f"event: end\ndata: {json.dumps(end)}\n\n"
+                    return
+            if time.monotonic() - last_sent >= settings.jobs_stream_keepalive_s:
+                yield ": keep-alive\n\n"
+                last_sent = time.monotonic()
+            await asyncio.sleep(poll)
+            # rien de neuf (ou pool saturé): lectures de plus en plus espacées
+            poll = min(max_poll, poll * 2)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
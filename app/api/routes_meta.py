@@ -4,6 +4,10 @@ from fastapi import APIRouter, Depends
 from pydantic import BaseModel
 
 from app.core.security import require_api_key
+from app.jobs.store import get_job_writer
+from app.services.batching import batching_stats
+from app.services.cache import get_detection_cache, get_ocr_cache
+from app.services.concurrency import get_work_pool
 from app.services.orchestrator import Orchestrator
 
 router = APIRouter(prefix="/meta", tags=["meta"], dependencies=[Depends(require_api_key)])
@@ -19,8 +23,8 @@ class WarmupRequest(BaseModel):
 def list_detectors():
     """Expose la liste des détecteurs disponibles et ceux déjà instanciés."""
     return {
-        "available": sorted(list(orc.registry.keys())),
-        "loaded": sorted(list(orc._instances.keys())),
+        "available": orc.registry.available(),
+        "loaded": orc.registry.loaded(),
     }
 
 
@@ -29,3 +33,57 @@ def warmup_detectors(req: WarmupRequest):
     """Permet de précharger certains détecteurs à la demande."""
     status = orc.warmup(req.detectors)
     return {"status": status}
+
+
+@router.get("/batching")
+def batching():
+    """Micro-batching par modèle: batches, taille moyenne, file d'attente, rejets."""
+    return batching_stats()
+
+
+@router.get("/pools")
+def pools():
+    """Exécuteurs des routes async: workers, requêtes en cours, rejets (429)."""
+    return {kind: get_work_pool(kind).stats() for kind in ("light", "model", "extract", "jobs")}
+
+
+@router.get("/jobs/writer")
+def job_writer_stats():
+    """Persistance write-behind des jobs: écritures, regroupements, batches, baux perdus."""
+    return get_job_writer().stats()
+
+
+@router.get("/cache")
+def cache_stats():
+    """Compteurs hit/miss du cache de détection."""
+    cache = get_detection_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+
+@router.delete("/cache")
+def cache_clear(detector: str | None = None):
+    """Vide le cache (tout, ou seulement un détecteur)."""
+    cache = get_detection_cache()
+    if cache is None:
+        return {"enabled": False, "removed": 0}
+    return {"enabled": True, "removed": cache.invalidate(detector)}
+
+
+@router.get("/cache/ocr")
+def ocr_cache_stats():
+    """Compteurs hit/miss et taille du cache OCR."""
+    cache = get_ocr_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+
+@router.delete("/cache/ocr")
+def ocr_cache_clear():
+    """Vide le cache OCR."""
+    cache = get_ocr_cache()
+    if cache is None:
+        return {"enabled": False, "removed": 0}
+    return {"enabled": True, "removed": cache.clear()}
@@ -1,9 +1,14 @@
 from __future__ import annotations
 
+import json
+
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from app.core.errors import AppError
 from app.core.security import require_api_key
 from app.models.schemas import ScanRequest, ScanResponse
-from app.services.scan_service import ScanService
+from app.services.concurrency import get_work_pool
+from app.services.scan_service import ScanProgress, ScanService
 
 router = APIRouter(prefix="/scan", tags=["scan"], dependencies=[Depends(require_api_key)])
 
@@ -11,9 +16,10 @@ scan_service = ScanService()
 
 
 @router.post("", response_model=ScanResponse)
-def scan(req: ScanRequest):
+async def scan(req: ScanRequest):
     try:
-        result = scan_service.scan(
+        result = await get_work_pool("extract").run(
+            scan_service.scan,
             connector=req.connector,
             root=req.root,
             recursive=req.recursive,
@@ -21,7 +27,62 @@ def scan(req: ScanRequest):
             detectors=req.detectors,
             min_score=req.min_score,
             limit=req.limit,
+            parallel=req.parallel,
+            incremental=req.incremental,
         )
         return result
+    except AppError:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/stream")
+async def scan_stream(req: ScanRequest):
+    """NDJSON: une ligne par fichier dès qu'il est traité, puis une ligne de synthèse."""
+    pool = get_work_pool("extract")
+    pool.admit()  # libéré à la fin du stream
+
+    def start():
+        index = None
+        if req.incremental:
+            index = scan_service.open_index(
+                root=req.root,
+                recursive=req.recursive,
+                language=req.language,
+                detectors=req.detectors,
+                min_score=req.min_score,
+                limit=req.limit,
+            )
+        results = scan_service.iter_scan(
+            connector=req.connector,
+            root=req.root,
+            recursive=req.recursive,
+            language=req.language,
+            detectors=req.detectors,
+            min_score=req.min_score,
+            limit=req.limit,
+            parallel=req.parallel,
+            index=index,
+        )
+        return index, results
+
+    try:
+        index, results = await pool.call(start)
+    except Exception as e:
+        pool.release()
+        if isinstance(e, AppError):
+            raise
+        raise HTTPException(status_code=400, detail=str(e))
+
+    def lines():
+        progress = ScanProgress()
+        for res in results:
+            progress.add(res)
+            yield json.dumps({"type": "file", **res}, ensure_ascii=False) + "\n"
+        summary = progress.snapshot()
+        if index is not None:
+            summary["diff"] = index.finish()
+        yield json.dumps({"type": "summary", **summary}, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(pool.stream(lines()), media_type="application/x-ndjson")
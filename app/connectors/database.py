@@ -21,4 +21,22 @@ class DatabaseConnector:
         out: List[Dict[str, Any]] = []
         for r in rows:
             out.append({c: r[i] for i, c in enumerate(cols)})
-        return out
\ No newline at end of file
+        return out
+
+    def profile(
+        self,
+        query: str,
+        params: Optional[Dict[str, Any]] = None,
+        limit: int = 1000,
+        *,
+        pipeline: Any = None,
+        **kwargs: Any,
+    ) -> Dict[str, Any]:
+        """Which columns of a query result hold PII (sampled, see StructuredPipeline.profile_columns).
+
+        Extra kwargs (detectors, min_rate, max_samples...) go to profile_columns.
+        """
+        from app.services.pipeline_structured import StructuredPipeline
+
+        rows = self.fetch(query, params, limit=limit)
+        return (pipeline or StructuredPipeline()).profile_rows(rows=rows, **kwargs)
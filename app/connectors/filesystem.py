@@ -1,9 +1,9 @@
 from __future__ import annotations
 
 import mimetypes
-from dataclasses import asdict
+import os
 from pathlib import Path
-from typing import Iterable
+from typing import Iterator
 
 from app.connectors.base import Resource
 
@@ -17,20 +17,45 @@ class FileSystemConnector:
       file:///absolute/path
     """
 
-    def list(self, root: str, *, recursive: bool = True) -> Iterable[Resource]:
+    def list(self, root: str, *, recursive: bool = True) -> Iterator[Resource]:
+        """Lazily enumerate files under root (os.scandir, no full listing in memory)."""
         p = Path(root).expanduser().resolve()
         if not p.exists():
-            return []
+            return
+        if p.is_file():
+            yield self._resource(str(p), p.name)
+            return
 
-        files = p.rglob("*") if recursive else p.glob("*")
-        out = []
-        for f in files:
-            if f.is_dir():
+        stack = [str(p)]
+        while stack:
+            current = stack.pop()
+            try:
+                it = os.scandir(current)
+            except OSError:
                 continue
-            uri = f"file://{str(f)}"
-            kind = self._kind_from_suffix(f.suffix.lower())
-            out.append(Resource(uri=uri, kind=kind, metadata={"name": f.name, "suffix": f.suffix}))
-        return out
+            with it:
+                subdirs = []
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if recursive:
+                                subdirs.append(entry.path)
+                            continue
+                        if not entry.is_file():
+                            continue
+                    except OSError:
+                        continue
+                    yield self._resource(entry.path, entry.name)
+            # ordre de parcours stable (profondeur d'abord, ordre alphabétique)
+            stack.extend(sorted(subdirs, reverse=True))
+
+    def _resource(self, path: str, name: str) -> Resource:
+        suffix = os.path.splitext(name)[1]
+        return Resource(
+            uri=f"file://{path}",
+            kind=self._kind_from_suffix(suffix.lower()),
+            metadata={"name": name, "suffix": suffix},
+        )
 
     def read_bytes(self, uri: str) -> bytes:
         path = self._to_path(uri)
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from functools import lru_cache
 from pathlib import Path
-from typing import List, Literal
+from typing import Dict, List, Literal
 
 from pydantic import Field
 
@@ -48,13 +48,156 @@ class Settings(BaseSettings):
     # Storage
     storage_dir: str = Field(default="data/tmp")
 
+    # Uploads (/files): copiés par blocs sous storage_dir/uploads (sha256 au fil
+    # de l'eau), supprimés après traitement; orphelins plus vieux que ttl purgés
+    upload_max_mb: int = Field(default=512)  # 0 = illimité
+    upload_chunk_kb: int = Field(default=1024)
+    upload_ttl_s: int = Field(default=3600)
+
     # Models / caching
     hf_home: str = Field(default=str(Path(".hf_cache").resolve()))
     # Par défaut on précharge léger pour réduire le cold start + RAM
     preload_detectors: List[str] = Field(default_factory=lambda: ["regex", "presidio"])
 
+    # Mode prefork (gunicorn.conf.py, WEB_CONCURRENCY > 1): modèles chargés dans
+    # le master avant fork, partagés copy-on-write entre workers (vide =
+    # preload_detectors; les backends ONNX sont chargés par worker)
+    prefork_preload_detectors: List[str] = Field(default_factory=list)
+
+    # Catalogue du détecteur regex (vide = tous: email, iban, nir, siret,
+    # credit_card, phone_fr, siren)
+    regex_patterns: List[str] = Field(default_factory=list)
+
+    # Exécuteurs dédiés des routes async (light = regex seul, model = détecteurs
+    # lourds, extract = fichiers / OCR / scans); au-delà de max_pending => 429
+    light_detectors: List[str] = Field(default_factory=lambda: ["regex"])
+    pool_light_workers: int = Field(default=4)
+    pool_light_max_pending: int = Field(default=256)
+    pool_model_workers: int = Field(default=8)
+    pool_model_max_pending: int = Field(default=64)
+    pool_extract_workers: int = Field(default=2)
+    pool_extract_max_pending: int = Field(default=8)
+    # /jobs: lectures d'état sans admission (toujours servies), SSE avec admission
+    pool_jobs_workers: int = Field(default=4)
+    pool_jobs_max_pending: int = Field(default=64)
+    pool_retry_after_s: int = Field(default=2)
+
+    # Exécution parallèle des détecteurs
+    detector_parallel: bool = Field(default=True)
+    detector_max_workers: int = Field(default=4)
+    # Budget total de threads CPU de l'hôte (0 = os.cpu_count()), divisé entre workers prefork
+    cpu_thread_budget: int = Field(default=0)
+    # Threads CPU consommés par détecteur (torch / spaCy intra-op)
+    detector_thread_budgets: Dict[str, int] = Field(
+        default_factory=lambda: {
+            "regex": 1,
+            "presidio": 1,
+            "spacy": 1,
+            "hf": 2,
+            "piiranha": 2,
+            "gliner-small": 2,
+        }
+    )
+
+    # Backend d'inférence des détecteurs transformers: torch | onnx | onnx-int8
+    # (les modèles ONNX sont produits par scripts/export_onnx.py)
+    detector_backends: Dict[str, str] = Field(
+        default_factory=lambda: {"hf": "torch", "piiranha": "torch", "gliner-small": "torch"}
+    )
+    onnx_model_dir: str = Field(default="models/onnx")
+
+    # Micro-batching: appels concurrents sur un même modèle regroupés en un batch
+    # (max_items textes, ou max_wait_ms après le plus ancien); file bornée => 503
+    microbatch_enabled: bool = Field(default=True)
+    microbatch_detectors: List[str] = Field(default_factory=lambda: ["hf", "piiranha", "gliner-small", "spacy"])
+    microbatch_max_items: int = Field(default=16)
+    microbatch_max_wait_ms: float = Field(default=10.0)
+    microbatch_max_queue: int = Field(default=256)
+
+    # Découpage en fenêtres de tokens (détecteurs transformers)
+    hf_window_tokens: int = Field(default=512)
+    hf_window_overlap: int = Field(default=64)
+    hf_batch_size: int = Field(default=8)
+    # Taille de batch pour nlp.pipe (spaCy), Presidio et GLiNER
+    nlp_batch_size: int = Field(default=32)
+
+    # Cascade: les détecteurs transformers ne tournent que sur les segments
+    # présentant un signal bon marché (regex, prénoms, mots capitalisés, adresses).
+    # Désactivée par défaut: le signal rate des PII (noms en minuscules...),
+    # à activer quand le débit prime sur le rappel
+    ner_cascade_enabled: bool = Field(default=False)
+    ner_cascade_detectors: List[str] = Field(default_factory=lambda: ["hf", "piiranha", "gliner-small"])
+    ner_cascade_segment_chars: int = Field(default=1000)
+    ner_cascade_min_letters: int = Field(default=2)
+    ner_cascade_short_chars: int = Field(default=200)  # texte court: majuscule en début de phrase comptée
+    ner_cascade_cap_density: float = Field(default=0.05)
+    ner_gazetteer_path: str = Field(default="")  # prénoms additionnels, 1 par ligne
+
+    # File de jobs durable (table job_results, bail FOR UPDATE SKIP LOCKED sur
+    # Postgres): slots du worker in-process de l'API (0 = uniquement des
+    # workers externes: python -m app.jobs.worker)
+    jobs_inprocess_workers: int = Field(default=2)
+    jobs_visibility_timeout_s: int = Field(default=300)  # bail non renouvelé => job repris
+    jobs_max_attempts: int = Field(default=3)
+    jobs_retry_backoff_s: int = Field(default=10)  # x numéro de tentative
+    jobs_poll_interval_s: float = Field(default=1.0)
+    # Ordonnancement: classe par défaut par kind (interactive | batch | bulk),
+    # une classe gagnée par tranche d'attente de priority_aging_s (0 = strict);
+    # kind_limits = jobs simultanés max par kind, tous workers confondus
+    jobs_default_priority: Dict[str, str] = Field(
+        default_factory=lambda: {"bench_text": "interactive", "scan": "batch"}
+    )
+    jobs_priority_aging_s: int = Field(default=300)
+    jobs_kind_limits: Dict[str, int] = Field(default_factory=lambda: {"scan": 1})
+    jobs_cancel_poll_s: float = Field(default=2.0)
+    # Persistance write-behind de l'état des jobs (écritures regroupées par batch)
+    jobs_flush_interval_ms: float = Field(default=50.0)
+    jobs_flush_max_batch: int = Field(default=500)
+    # Au-delà, résultat compressé hors ligne (table job_payloads), pointeur +
+    # résumé dans payload_json
+    jobs_result_inline_max_kb: int = Field(default=64)
+    # GET /jobs/{id}/events (SSE): intervalle de lecture des events en base,
+    # allongé (x2) tant qu'aucun event n'arrive, jusqu'à max_poll
+    jobs_stream_poll_ms: int = Field(default=500)
+    jobs_stream_max_poll_ms: int = Field(default=5000)
+    jobs_stream_keepalive_s: int = Field(default=15)
+    # job_events des jobs terminés depuis plus de N heures purgés par les workers (0 = jamais)
+    jobs_events_retention_h: float = Field(default=24.0)
+
+    # Cache des détections (clé = hash du texte + langue + détecteur/config + min_score)
+    detection_cache_enabled: bool = Field(default=True)
+    detection_cache_max_entries: int = Field(default=10_000)
+    # Tier disque optionnel (SQLite sous storage_dir)
+    detection_cache_disk: bool = Field(default=False)
+    detection_cache_disk_max_entries: int = Field(default=200_000)
+    # écritures disque groupées par un thread (1 commit par batch, hors du lock du cache)
+    detection_cache_disk_flush_ms: int = Field(default=200)
+    detection_cache_disk_flush_max: int = Field(default=500)
+
+    # Scan parallèle (pools par stage)
+    scan_parallel: bool = Field(default=True)
+    scan_extract_workers: int = Field(default=0)  # process pool (0 = os.cpu_count())
+    scan_ocr_workers: int = Field(default=1)
+    scan_detect_workers: int = Field(default=2)
+    scan_max_in_flight: int = Field(default=64)  # backlog max de fichiers en attente
+    scan_pdf_streams: int = Field(default=2)  # PDF traités page par page en parallèle
+    pdf_pages_per_task: int = Field(default=8)  # pages par tâche d'extraction (process pool)
+    # auto = sonde de la couche texte: passe brute pdfminer si suffisante,
+    # pdfplumber (layout) sinon, OCR si PDF scanné
+    pdf_text_mode: Literal["auto", "raw", "layout"] = Field(default="auto")
+    pdf_probe_pages: int = Field(default=3)
+    pdf_ocr_dpi: int = Field(default=200)
+
     # OCR
     ocr_backend: Literal["auto", "paddleocr", "tesseract"] = Field(default="auto")
+    ocr_workers: int = Field(default=1)  # 1 modèle PaddleOCR par worker
+    ocr_target_dpi: int = Field(default=200)  # réduction avant OCR
+    ocr_max_side: int = Field(default=2480)  # côté max en pixels (A4 à 300 dpi)
+    # Pas de classifieur d'angle pour les images déjà droites (EXIF / scans / pages PDF)
+    ocr_skip_angle_cls: bool = Field(default=True)
+    # Cache persistant des résultats OCR (SQLite sous storage_dir)
+    ocr_cache_enabled: bool = Field(default=True)
+    ocr_cache_max_mb: int = Field(default=256)
 
 
 @lru_cache(maxsize=1)
@@ -36,4 +36,31 @@ class NotFound(AppError):
 
 class DependencyError(AppError):
     def __init__(self, message: str = "Missing/invalid dependency", *, details: Any = None):
-        super().__init__(message, code="DEPENDENCY_ERROR", status_code=500, details=details)
\ No newline at end of file
+        super().__init__(message, code="DEPENDENCY_ERROR", status_code=500, details=details)
+
+
+class RetryableError(AppError):
+    """Request refused for lack of capacity; `retry_after` in seconds (Retry-After header)."""
+
+    def __init__(self, message: str, *, code: str, status_code: int, retry_after: int = 1, details: Any = None):
+        super().__init__(message, code=code, status_code=status_code, details=details)
+        self.retry_after = retry_after
+
+
+class Overloaded(RetryableError):
+    """Queue full (micro-batcher)."""
+
+    def __init__(self, message: str = "Server overloaded", *, retry_after: int = 1, details: Any = None):
+        super().__init__(message, code="OVERLOADED", status_code=503, retry_after=retry_after, details=details)
+
+
+class TooManyRequests(RetryableError):
+    """Admission refused (work pool saturated)."""
+
+    def __init__(self, message: str = "Too many requests", *, retry_after: int = 1, details: Any = None):
+        super().__init__(message, code="TOO_MANY_REQUESTS", status_code=429, retry_after=retry_after, details=details)
+
+
+class PayloadTooLarge(AppError):
+    def __init__(self, message: str = "Payload too large", *, details: Any = None):
+        super().__init__(message, code="PAYLOAD_TOO_LARGE", status_code=413, details=details)
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import hashlib
 import secrets
 from typing import Optional
 
@@ -39,4 +40,18 @@ def require_api_key(
         if secrets.compare_digest(x_api_key, k):
             return
 
-    raise Unauthorized("Invalid API key")
\ No newline at end of file
+    raise Unauthorized("Invalid API key")
+
+
+def tenant_id(
+    x_api_key: Optional[str] = Header(default=None, alias="X-API-Key"),
+    settings: Settings = Depends(get_settings),
+) -> str:
+    """Caller id used for fair scheduling: short hash of its API key.
+
+    Single "anonymous" tenant when API keys are disabled: the header is then
+    unchecked and any client could pick as many tenants as it likes.
+    """
+    if not _is_enabled(settings) or not x_api_key:
+        return "anonymous"
+    return hashlib.sha256(x_api_key.encode("utf-8")).hexdigest()[:16]
@@ -4,7 +4,7 @@ Contains SQLAlchemy models + session/engine setup.
 """
 
 from app.db.session import Base, engine, SessionLocal, get_db, init_db
-from app.db.models import JobResult
+from app.db.models import JobEvent, JobPayload, JobResult, ScanIndexEntry
 
 __all__ = [
     "Base",
@@ -12,5 +12,8 @@ __all__ = [
     "SessionLocal",
     "get_db",
     "init_db",
+    "JobEvent",
+    "JobPayload",
     "JobResult",
+    "ScanIndexEntry",
 ]
\ No newline at end of file
@@ -5,7 +5,7 @@ import json
 import uuid
 from typing import Any, Dict, Optional
 
-from sqlalchemy import DateTime, String, Text, Index
+from sqlalchemy import BigInteger, Boolean, DateTime, Float, Index, Integer, LargeBinary, String, Text, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.db.session import Base
@@ -22,7 +22,7 @@ class JobResult(Base):
 
     id: Mapped[str] = mapped_column(String(64), primary_key=True, default=lambda: uuid.uuid4().hex)
     kind: Mapped[str] = mapped_column(String(32), index=True)  # detect_text | bench_text | anonymize | detect_file ...
-    status: Mapped[str] = mapped_column(String(16), default="done")  # queued|running|done|error
+    status: Mapped[str] = mapped_column(String(16), default="done")  # queued|running|done|error|cancelled
     created_at: Mapped[dt.datetime] = mapped_column(DateTime(timezone=True), default=lambda: dt.datetime.now(dt.timezone.utc))
     updated_at: Mapped[dt.datetime] = mapped_column(DateTime(timezone=True), default=lambda: dt.datetime.now(dt.timezone.utc))
 
@@ -34,8 +34,27 @@ class JobResult(Base):
     payload_json: Mapped[str] = mapped_column(Text, default="{}")
     error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
 
+    # File de jobs (app/jobs): paramètres rejoués par le worker, méta d'affichage,
+    # progression, et bail (lease) du worker qui exécute le job
+    params_json: Mapped[str] = mapped_column(Text, default="{}")
+    meta_json: Mapped[str] = mapped_column(Text, default="{}")
+    progress_json: Mapped[str] = mapped_column(Text, default="{}")
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    max_attempts: Mapped[int] = mapped_column(Integer, default=1)
+    available_at: Mapped[Optional[dt.datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    lease_owner: Mapped[Optional[str]] = mapped_column(String(128), nullable=True)
+    lease_expires_at: Mapped[Optional[dt.datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    started_at: Mapped[Optional[dt.datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    finished_at: Mapped[Optional[dt.datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    # Ordonnancement: classe de priorité (0 interactive, 1 batch, 2 bulk),
+    # tenant (hash de la clé API) pour le partage équitable, annulation demandée
+    priority: Mapped[int] = mapped_column(Integer, default=1)
+    tenant: Mapped[str] = mapped_column(String(64), default="")
+    cancel_requested: Mapped[bool] = mapped_column(Boolean, default=False)
+
     __table_args__ = (
         Index("ix_job_results_kind_created_at", "kind", "created_at"),
+        Index("ix_job_results_sched", "status", "priority", "tenant", "kind", "created_at"),
     )
 
     def set_payload(self, payload: Dict[str, Any]) -> None:
@@ -45,4 +64,71 @@ class JobResult(Base):
         try:
             return json.loads(self.payload_json or "{}")
         except Exception:
-            return {}
\ No newline at end of file
+            return {}
+
+
+class JobPayload(Base):
+    """Large job result stored out of line (gzip-compressed JSON).
+
+    The job row keeps a pointer + summary in payload_json; the blob lives in
+    the database too, so every worker / replica can read it.
+    """
+
+    __tablename__ = "job_payloads"
+
+    job_id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    encoding: Mapped[str] = mapped_column(String(16), default="gzip+json")
+    size: Mapped[int] = mapped_column(BigInteger, default=0)  # taille JSON non compressée
+    data: Mapped[bytes] = mapped_column(LargeBinary)
+    created_at: Mapped[dt.datetime] = mapped_column(DateTime(timezone=True), default=lambda: dt.datetime.now(dt.timezone.utc))
+
+
+class JobEvent(Base):
+    """Job progress / partial result, tailed by GET /jobs/{id}/events (SSE).
+
+    `id` is global and increasing: it is the SSE event id, so a client
+    reconnecting with Last-Event-ID resumes where it stopped.
+    """
+
+    __tablename__ = "job_events"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    job_id: Mapped[str] = mapped_column(String(64))
+    type: Mapped[str] = mapped_column(String(16))  # status | progress | result | retry | done | error
+    data_json: Mapped[str] = mapped_column(Text, default="{}")
+    created_at: Mapped[dt.datetime] = mapped_column(DateTime(timezone=True), default=lambda: dt.datetime.now(dt.timezone.utc))
+
+    __table_args__ = (
+        Index("ix_job_events_job_id_id", "job_id", "id"),
+    )
+
+
+class ScanIndexEntry(Base):
+    """Fingerprint + last result of a scanned file (incremental rescans).
+
+    One row per (path, detectors_key): the same file scanned with another
+    detector set / language / min_score has its own entry.
+    """
+
+    __tablename__ = "scan_index"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    path: Mapped[str] = mapped_column(String(1024), index=True)
+    detectors_key: Mapped[str] = mapped_column(String(512))  # language|min_score|detectors triés
+    kind: Mapped[str] = mapped_column(String(16), default="file")
+
+    size: Mapped[int] = mapped_column(BigInteger, default=0)
+    mtime: Mapped[float] = mapped_column(Float, default=0.0)
+    content_hash: Mapped[str] = mapped_column(String(64), default="")
+
+    # Résultat par fichier (summary/errors en JSON texte, cf. JobResult)
+    summary_json: Mapped[str] = mapped_column(Text, default="{}")
+    errors_json: Mapped[str] = mapped_column(Text, default="{}")
+    count: Mapped[int] = mapped_column(Integer, default=0)
+    scanned_at: Mapped[dt.datetime] = mapped_column(DateTime(timezone=True), default=lambda: dt.datetime.now(dt.timezone.utc))
+    # Dernier scan ayant vu le fichier: les entrées d'un autre scan sont les fichiers supprimés
+    scan_id: Mapped[str] = mapped_column(String(32), default="")
+
+    __table_args__ = (
+        UniqueConstraint("path", "detectors_key", name="uq_scan_index_path_key"),
+    )
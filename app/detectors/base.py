@@ -1,11 +1,24 @@
 from __future__ import annotations
 from abc import ABC, abstractmethod
-from typing import List
+from typing import Any, Dict, List
 from app.models.schemas import DcpSpan
 
 class BaseDetector(ABC):
     name: str
+    # À incrémenter quand la logique de détection change (invalide le cache)
+    version: str = "1"
+    # Paramètres qui influencent le résultat (modèle, seuils...), cf. fingerprint()
+    config: Dict[str, Any] = {}
 
     @abstractmethod
     def detect(self, text: str, language: str = "fr") -> List[DcpSpan]:
-        raise NotImplementedError
\ No newline at end of file
+        raise NotImplementedError
+
+    def detect_batch(self, texts: List[str], language: str = "fr") -> List[List[DcpSpan]]:
+        """Detect on several texts; override when the backend has a native batch API."""
+        return [self.detect(text=t, language=language) for t in texts]
+
+    def fingerprint(self) -> str:
+        """Identifies detector code + configuration (part of the detection cache key)."""
+        cfg = ",".join(f"{k}={v}" for k, v in sorted(self.config.items()))
+        return f"{self.name}:{self.version}:{cfg}"
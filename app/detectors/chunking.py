@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from app.core.config import get_settings
+
+# (text index, window start, window end) en offsets caractères du texte d'origine
+Window = Tuple[int, int, int]
+
+
+class TokenWindowChunker:
+    """Token-aware sliding windows for transformer token-classification models.
+
+    - Windows are built from tokenizer offsets (no token is ever cut), with
+      `overlap` tokens shared between consecutive windows.
+    - Long texts are tokenized section by section, so memory stays bounded
+      even for very large documents.
+    - Each window "owns" the characters up to the middle of its overlap with
+      the next one; entities are kept only by the window owning their start,
+      which deduplicates entities seen twice in overlapping windows.
+    """
+
+    def __init__(
+        self,
+        tokenizer: Any,
+        *,
+        max_tokens: Optional[int] = None,
+        overlap: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        section_chars: int = 20_000,
+    ) -> None:
+        settings = get_settings()
+        self.tokenizer = tokenizer
+
+        max_tokens = max_tokens or settings.hf_window_tokens
+        model_max = getattr(tokenizer, "model_max_length", None) or max_tokens
+        try:
+            specials = tokenizer.num_special_tokens_to_add(pair=False)
+        except Exception:
+            specials = 2
+        self.max_tokens = max(8, min(max_tokens, int(model_max)) - specials)
+
+        overlap = settings.hf_window_overlap if overlap is None else overlap
+        self.overlap = max(0, min(overlap, self.max_tokens // 2))
+        self.batch_size = max(1, batch_size or settings.hf_batch_size)
+        self.section_chars = max(1_000, section_chars)
+
+    def windows(self, text: str) -> Iterator[Tuple[int, int]]:
+        """Yield (start, end) char offsets of overlapping token windows."""
+        n = len(text)
+        step = max(1, self.max_tokens - self.overlap)
+        pos = 0
+        while pos < n:
+            sec_end = min(n, pos + self.section_chars)
+            if sec_end < n:
+                # coupe la section sur un blanc pour ne pas couper un mot
+                lo = pos + self.section_chars // 2
+                cut = max(text.rfind(" ", lo, sec_end), text.rfind("\n", lo, sec_end))
+                if cut > pos:
+                    sec_end = cut
+            last_section = sec_end >= n
+
+            enc = self.tokenizer(text[pos:sec_end], add_special_tokens=False, return_offsets_mapping=True)
+            offsets = [o for o in enc["offset_mapping"] if o[1] > o[0]]
+            if not offsets:
+                pos = sec_end
+                continue
+
+            next_pos = sec_end
+            i = 0
+            while True:
+                j = min(i + self.max_tokens, len(offsets))
+                if j == len(offsets) and not last_section and i > 0:
+                    # la fin de section est retraitée avec la section suivante
+                    next_pos = pos + offsets[i][0]
+                    break
+                yield pos + offsets[i][0], pos + offsets[j - 1][1]
+                if j == len(offsets):
+                    break
+                i += step
+            pos = next_pos
+
+    def iter_batches(self, texts: Sequence[str]) -> Iterator[List[Window]]:
+        """Group windows of all texts into batches of `batch_size`."""
+        batch: List[Window] = []
+        for idx, text in enumerate(texts):
+            if not text:
+                continue
+            for start, end in self.windows(text):
+                batch.append((idx, start, end))
+                if len(batch) >= self.batch_size:
+                    yield batch
+                    batch = []
+        if batch:
+            yield batch
+
+
+def _owned_range(prev: Optional[Window], w: Window, nxt: Optional[Window]) -> Tuple[int, int]:
+    """Char range owned by a window (split at the middle of its overlaps)."""
+    idx, start, end = w
+    own_start, own_end = start, end
+    if prev is not None and prev[0] == idx and prev[2] > start:
+        own_start = (start + prev[2]) // 2
+    if nxt is not None and nxt[0] == idx and nxt[1] < end:
+        own_end = (nxt[1] + end) // 2
+    return own_start, own_end
+
+
+def run_token_classification(
+    pipe: Any,
+    texts: Sequence[str],
+    *,
+    max_tokens: Optional[int] = None,
+    overlap: Optional[int] = None,
+    batch_size: Optional[int] = None,
+) -> List[List[Dict[str, Any]]]:
+    """Run a HF token-classification pipeline over arbitrarily long texts.
+
+    Returns, for each input text, the pipeline entities with `start` / `end`
+    mapped back to offsets in that text (deduplicated across windows).
+    """
+    chunker = TokenWindowChunker(pipe.tokenizer, max_tokens=max_tokens, overlap=overlap, batch_size=batch_size)
+    results: List[List[Dict[str, Any]]] = [[] for _ in texts]
+    seen: List[set] = [set() for _ in texts]
+
+    def _collect(w: Window, ents: List[Dict[str, Any]], own: Tuple[int, int]) -> None:
+        idx, start, _ = w
+        for e in ents:
+            s, t = int(e["start"]) + start, int(e["end"]) + start
+            if not (own[0] <= s < own[1]):
+                continue
+            key = (s, t, e.get("entity_group") or e.get("entity"))
+            if key in seen[idx]:
+                continue
+            seen[idx].add(key)
+            results[idx].append({**e, "start": s, "end": t})
+
+    # Une fenêtre n'est collectée qu'une fois sa voisine de droite connue
+    prev: Optional[Window] = None
+    held: Optional[Tuple[Window, List[Dict[str, Any]]]] = None
+
+    for batch in chunker.iter_batches(texts):
+        outputs = pipe([texts[i][s:e] for i, s, e in batch], batch_size=chunker.batch_size)
+        # un seul texte en entrée => certaines versions renvoient une liste plate
+        if len(batch) == 1 and (not outputs or isinstance(outputs[0], dict)):
+            outputs = [outputs]
+
+        for w, ents in zip(batch, outputs):
+            if held is not None:
+                _collect(held[0], held[1], _owned_range(prev, held[0], w))
+                prev = held[0]
+            held = (w, list(ents))
+
+    if held is not None:
+        _collect(held[0], held[1], _owned_range(prev, held[0], None))
+
+    for spans in results:
+        spans.sort(key=lambda e: (e["start"], e["end"]))
+    return results
@@ -1,6 +1,8 @@
 from __future__ import annotations
 from typing import List, Dict
+from app.core.config import get_settings
 from app.detectors.base import BaseDetector
+from app.detectors.onnx_backend import detector_backend, onnx_model_path, session_options
 from app.models.schemas import DcpSpan
 
 class GLiNERSmallDetector(BaseDetector):
@@ -15,7 +17,20 @@ class GLiNERSmallDetector(BaseDetector):
         except Exception as e:
             raise RuntimeError("GLiNER non installé. Fais: pip install gliner") from e
 
-        self.model = GLiNER.from_pretrained(model, load_tokenizer=True)
+        self.backend = detector_backend(self.name)
+        if self.backend == "torch":
+            self.model = GLiNER.from_pretrained(model, load_tokenizer=True)
+        else:
+            # export ONNX (scripts/export_onnx.py): config + tokenizer + model*.onnx
+            path = onnx_model_path(self.name, self.backend)
+            self.model = GLiNER.from_pretrained(
+                str(path.parent),
+                load_tokenizer=True,
+                load_onnx_model=True,
+                onnx_model_file=path.name,
+                session_options=session_options(self.name),
+            )
+        self.config = {"model": model, "threshold": 0.5, "backend": self.backend}
         
         # Labels PII à détecter (zéro-shot)
         self.labels = [
@@ -34,6 +49,19 @@ class GLiNERSmallDetector(BaseDetector):
 
     def detect(self, text: str, language: str = "fr") -> List[DcpSpan]:
         entities = self.model.predict_entities(text, self.labels, threshold=0.5)
+        return self._to_spans(entities)
+
+    def detect_batch(self, texts: List[str], language: str = "fr") -> List[List[DcpSpan]]:
+        # selon la version de gliner: batch_predict_entities (ancien) ou inference
+        batch_fn = getattr(self.model, "batch_predict_entities", None) or self.model.inference
+        size = get_settings().nlp_batch_size
+        out: List[List[DcpSpan]] = []
+        for i in range(0, len(texts), size):
+            for entities in batch_fn(texts[i : i + size], self.labels, threshold=0.5):
+                out.append(self._to_spans(entities))
+        return out
+
+    def _to_spans(self, entities: List[Dict]) -> List[DcpSpan]:
         spans: List[DcpSpan] = []
         for ent in entities:
             label = self.map.get(ent["label"], "OTHER")
@@ -1,6 +1,9 @@
 from __future__ import annotations
 from typing import List, Dict
+from app.core.config import get_settings
 from app.detectors.base import BaseDetector
+from app.detectors.chunking import run_token_classification
+from app.detectors.onnx_backend import detector_backend, token_classification_pipeline
 from app.models.schemas import DcpSpan
 
 class HFNerDetector(BaseDetector):
@@ -10,19 +13,24 @@ class HFNerDetector(BaseDetector):
         """
         Tu peux remplacer par un modèle NER FR différent.
         """
-        try:
-            from transformers import pipeline
-        except Exception as e:
-            raise RuntimeError("Transformers non installé. Fais: pip install transformers torch") from e
-
-        self.pipe = pipeline(
-            "token-classification",
-            model=model,
+        # backend torch (défaut) ou onnx / onnx-int8 (settings.detector_backends)
+        self.backend = detector_backend(self.name)
+        self.pipe = token_classification_pipeline(
+            self.name,
+            model,
+            backend=self.backend,
             revision=revision,                 # optionnel mais recommandé
-            aggregation_strategy="simple",
             device=-1,                         # CPU (évite surprises)
             local_files_only=True,             # ✅ interdit tout download
         )
+        settings = get_settings()
+        self.config = {
+            "model": model,
+            "revision": revision,
+            "backend": self.backend,
+            "window": settings.hf_window_tokens,
+            "overlap": settings.hf_window_overlap,
+        }
 
         # mapping BIO/NER -> DCP labels (best-effort)
         self.map: Dict[str, str] = {
@@ -33,7 +41,14 @@ class HFNerDetector(BaseDetector):
         }
 
     def detect(self, text: str, language: str = "fr") -> List[DcpSpan]:
-        out = self.pipe(text)
+        return self.detect_batch([text], language=language)[0]
+
+    def detect_batch(self, texts: List[str], language: str = "fr") -> List[List[DcpSpan]]:
+        # fenêtres de tokens avec overlap (pas de troncature à 512 tokens), batchées
+        outs = run_token_classification(self.pipe, texts)
+        return [self._to_spans(text, out) for text, out in zip(texts, outs)]
+
+    def _to_spans(self, text: str, out: List[Dict]) -> List[DcpSpan]:
         spans: List[DcpSpan] = []
         for r in out:
             ent = r.get("entity_group") or r.get("entity") or "OTHER"
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Literal, Optional
+
+from app.core.config import get_settings
+
+# torch     : transformers / GLiNER eager PyTorch
+# onnx      : modèle exporté (scripts/export_onnx.py), ONNX Runtime
+# onnx-int8 : idem, poids quantifiés INT8 (quantization dynamique)
+InferenceBackend = Literal["torch", "onnx", "onnx-int8"]
+
+ONNX_FILES = {"onnx": "model.onnx", "onnx-int8": "model_quantized.onnx"}
+
+
+def detector_backend(detector: str) -> InferenceBackend:
+    backend = get_settings().detector_backends.get(detector, "torch")
+    if backend not in ("torch", *ONNX_FILES):
+        raise ValueError(f"Backend inconnu pour {detector}: {backend} (torch, onnx, onnx-int8)")
+    return backend  # type: ignore[return-value]
+
+
+def onnx_model_dir(detector: str) -> Path:
+    """Export directory of a detector (settings.onnx_model_dir/<detector>)."""
+    return Path(get_settings().onnx_model_dir) / detector
+
+
+def onnx_model_path(detector: str, backend: InferenceBackend) -> Path:
+    path = onnx_model_dir(detector) / ONNX_FILES[backend]
+    if not path.is_file():
+        raise RuntimeError(f"Modèle ONNX absent: {path}. Lance: python scripts/export_onnx.py --detector {detector}")
+    return path
+
+
+def session_options(detector: str) -> Any:
+    """ORT session sized on the detector CPU thread budget (cf. detector_thread_budgets)."""
+    try:
+        import onnxruntime as ort
+    except Exception as e:
+        raise RuntimeError("ONNX Runtime non installé. Fais: pip install 'optimum[onnxruntime]'") from e
+
+    settings = get_settings()
+    opts = ort.SessionOptions()
+    opts.intra_op_num_threads = max(1, int(settings.detector_thread_budgets.get(detector, 1)))
+    opts.inter_op_num_threads = 1
+    opts.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    return opts
+
+
+def token_classification_pipeline(
+    detector: str,
+    model: str,
+    *,
+    backend: Optional[InferenceBackend] = None,
+    revision: Optional[str] = None,
+    device: int = -1,
+    local_files_only: bool = False,
+) -> Any:
+    """HF token-classification pipeline on the selected backend.
+
+    Both backends return a regular transformers pipeline (same outputs,
+    same `.tokenizer`), so run_token_classification works unchanged.
+    """
+    try:
+        from transformers import AutoTokenizer, pipeline
+    except Exception as e:
+        raise RuntimeError("Transformers non installé. Fais: pip install transformers torch") from e
+
+    backend = backend or detector_backend(detector)
+    if backend == "torch":
+        return pipeline(
+            "token-classification",
+            model=model,
+            revision=revision,
+            aggregation_strategy="simple",
+            device=device,
+            local_files_only=local_files_only,
+        )
+
+    try:
+        from optimum.onnxruntime import ORTModelForTokenClassification
+    except Exception as e:
+        raise RuntimeError("Optimum non installé. Fais: pip install 'optimum[onnxruntime]'") from e
+
+    path = onnx_model_path(detector, backend)
+    ort_model = ORTModelForTokenClassification.from_pretrained(
+        path.parent,
+        file_name=path.name,
+        session_options=session_options(detector),
+        provider="CPUExecutionProvider",
+    )
+    tokenizer = AutoTokenizer.from_pretrained(path.parent)
+    return pipeline("token-classification", model=ort_model, tokenizer=tokenizer, aggregation_strategy="simple")
@@ -0,0 +1,271 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# (start, end, spec)
+PatternMatch = Tuple[int, int, "PatternSpec"]
+
+
+_NON_DIGITS = re.compile(r"\D")
+_LUHN_DOUBLE = (0, 2, 4, 6, 8, 1, 3, 5, 7, 9)
+# Lettres -> "10".."35" (conversion ISO 13616)
+_IBAN_LETTERS = {ord(c): str(i) for i, c in enumerate("ABCDEFGHIJKLMNOPQRSTUVWXYZ", start=10)}
+
+
+def _digits(s: str) -> str:
+    return _NON_DIGITS.sub("", s)
+
+
+def luhn_ok(s: str) -> bool:
+    digits = _digits(s)
+    if not digits:
+        return False
+    total = sum(map(int, digits[-1::-2])) + sum(_LUHN_DOUBLE[int(c)] for c in digits[-2::-2])
+    return total % 10 == 0
+
+
+def iban_ok(s: str) -> bool:
+    """ISO 13616 mod-97 checksum."""
+    iban = s.replace(" ", "").upper()
+    if not 15 <= len(iban) <= 34:
+        return False
+    return int((iban[4:] + iban[:4]).translate(_IBAN_LETTERS)) % 97 == 1
+
+
+def nir_ok(s: str) -> bool:
+    """NIR (n° de sécurité sociale): clé = 97 - (13 premiers chiffres mod 97); Corse 2A/2B."""
+    nir = s.replace(" ", "").upper()
+    body, key = nir[:13], nir[13:]
+    body = body.replace("2A", "19").replace("2B", "18")
+    if not (body.isdigit() and key.isdigit()):
+        return False
+    return 97 - int(body) % 97 == int(key)
+
+
+def siren_ok(s: str) -> bool:
+    digits = _digits(s)
+    # La Poste (SIREN 356000000) déroge à Luhn: somme des chiffres multiple de 5
+    if digits.startswith("356000000"):
+        return sum(int(c) for c in digits) % 5 == 0
+    return luhn_ok(digits)
+
+
+@dataclass(frozen=True)
+class PatternSpec:
+    """One entry of the pattern catalogue.
+
+    `validator` runs on candidates only (checksum, key...). `anchor` is a
+    cheap regex (or literal) that every match overlaps; the engine only runs
+    the full pattern around anchor hits. None = no anchor (full scan).
+    `context` (case-insensitive regex) must occur in the `context_chars`
+    characters before the match, for formats a checksum alone does not
+    make specific enough.
+    """
+    name: str
+    label: str
+    pattern: str
+    score: float
+    validator: Optional[Callable[[str], bool]] = None
+    anchor: Optional[str] = None
+    context: Optional[str] = None
+    context_chars: int = 48
+
+
+# Ancres: un charset en tête de motif profite du fast path de `re`, et `@`
+# est cherché comme littéral (str.find)
+AT_SIGN = "@"
+# Suite de chiffres, ou clé d'un IBAN (pays en lookbehind): un BBAN fait de
+# groupes de lettres ("WEST", "ABNA") n'a pas toujours 9 chiffres d'affilée.
+# Une seule regex menée par un chiffre: une passe, avec le fast path de `re`
+DIGIT_RUN = r"[0-9](?:[0-9 .()-]{8,}|(?<=[A-Z]{2}[0-9])[0-9][ A-Z0-9])"
+# Luhn seul laisse passer ~1 suite de 9 chiffres sur 10 (n° de commande, montants):
+# un SIREN isolé n'est retenu qu'annoncé comme tel
+SIREN_CONTEXT = r"\b(?:siren|rcs|immatricul\w*)\b|\br\.c\.s\b"
+
+# Ordre = priorité quand plusieurs motifs matchent à la même position
+# (le plus spécifique d'abord).
+DEFAULT_CATALOGUE: Tuple[PatternSpec, ...] = (
+    PatternSpec("email", "EMAIL", r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}", 0.95, anchor=AT_SIGN),
+    PatternSpec(
+        "iban",
+        "IBAN",
+        r"[A-Z]{2}\d{2}(?:[A-Z0-9]{11,30}|(?: [A-Z0-9]{4}){2,7}(?: [A-Z0-9]{1,3})?)",
+        0.90,
+        iban_ok,
+        DIGIT_RUN,
+    ),
+    PatternSpec(
+        "nir",
+        "ID_NUMBER",
+        r"[12] ?\d{2} ?(?:0[1-9]|1[0-2]|[2-9]\d) ?(?:\d{2}|2[ABab]) ?\d{3} ?\d{3} ?\d{2}",
+        0.90,
+        nir_ok,
+        DIGIT_RUN,
+    ),
+    PatternSpec("siret", "ID_NUMBER", r"\d{3} ?\d{3} ?\d{3} ?\d{5}", 0.80, siren_ok, DIGIT_RUN),
+    PatternSpec("credit_card", "FINANCE", r"\d(?:[ -]?\d){12,18}", 0.85, luhn_ok, DIGIT_RUN),
+    PatternSpec("phone_fr", "PHONE", r"(?:(?:\+|00)33 ?(?:\(0\) ?)?|0)[1-9](?:[ .-]?\d{2}){4}", 0.85, anchor=DIGIT_RUN),
+    PatternSpec("siren", "ID_NUMBER", r"\d{3} ?\d{3} ?\d{3}", 0.60, siren_ok, DIGIT_RUN, SIREN_CONTEXT),
+)
+
+
+_WHITESPACE = re.compile(r"\s")
+# Recul max pour retrouver le début du token d'une ancre (le lookbehind
+# `(?<!\w)` voit le texte avant `pos`, la borne reste donc sûre)
+_MAX_BACKTRACK = 256
+# En dessous d'une fenêtre pour N caractères, on scanne tout le texte
+_DENSE_WINDOW_CHARS = 64
+# Élargissement de chaque ancre, de part et d'autre, avant recalage sur les
+# tokens: le plus long motif du catalogue (IBAN espacé, 43 caractères) tient
+# en entier dans la fenêtre quelle que soit la partie qui a servi d'ancre
+_ANCHOR_REACH = 48
+
+
+def _token_start(text: str, i: int) -> int:
+    lo = max(0, i - _MAX_BACKTRACK)
+    return max(lo, *(text.rfind(c, lo, i) + 1 for c in " \n\t"))
+
+
+def _token_end(text: str, i: int, n: int) -> int:
+    m = _WHITESPACE.search(text, i)
+    return m.start() if m else n
+
+
+class PatternEngine:
+    """Compiles a pattern catalogue into one alternation scanned in a single pass.
+
+    Each entry becomes a named group; the match is dispatched with
+    `m.lastgroup`. When a candidate fails its validator, the lower priority
+    entries are tried at the same position before moving on.
+
+    When every entry has an anchor, the text is first searched for anchors
+    only (literal find / leading-charset regexes, several times faster than
+    the alternation) and the alternation runs on the surrounding tokens.
+    """
+
+    def __init__(self, specs: Sequence[PatternSpec] = DEFAULT_CATALOGUE) -> None:
+        self.specs: Tuple[PatternSpec, ...] = tuple(specs)
+        self._by_group: Dict[str, int] = {f"p{i}": i for i in range(len(self.specs))}
+        self._single = [re.compile(rf"(?<!\w)(?:{s.pattern})(?!\w)") for s in self.specs]
+        self._context = [re.compile(s.context, re.IGNORECASE) if s.context else None for s in self.specs]
+        self._combined = re.compile(
+            "(?<!\\w)(?:" + "|".join(f"(?P<p{i}>{s.pattern})" for i, s in enumerate(self.specs)) + ")(?!\\w)"
+        )
+        anchors = [s.anchor for s in self.specs]
+        self._literal_anchors: List[str] = []
+        self._regex_anchors: List[re.Pattern[str]] = []
+        if anchors and all(anchors):
+            for a in dict.fromkeys(anchors):
+                if re.escape(a) == a:
+                    self._literal_anchors.append(a)  # type: ignore[arg-type]
+                else:
+                    self._regex_anchors.append(re.compile(a))  # type: ignore[arg-type]
+        self._anchored = bool(self._literal_anchors or self._regex_anchors)
+
+    @classmethod
+    def from_names(cls, names: Iterable[str]) -> "PatternEngine":
+        """Engine restricted to some catalogue entries (empty = whole catalogue)."""
+        wanted = list(names)
+        if not wanted:
+            return cls()
+        known = {s.name: s for s in DEFAULT_CATALOGUE}
+        unknown = [n for n in wanted if n not in known]
+        if unknown:
+            raise ValueError(f"Unknown regex patterns: {unknown} (available: {sorted(known)})")
+        return cls([s for s in DEFAULT_CATALOGUE if s.name in wanted])
+
+    @property
+    def names(self) -> List[str]:
+        return [s.name for s in self.specs]
+
+    def _validate_from(self, text: str, pos: int, endpos: int, first: int) -> Optional[PatternMatch]:
+        for i in range(first, len(self.specs)):
+            spec = self.specs[i]
+            m = self._single[i].match(text, pos, endpos)
+            if m is None:
+                continue
+            if self._accept(i, text, m):
+                return m.start(), m.end(), spec
+        return None
+
+    def _accept(self, i: int, text: str, m: re.Match[str]) -> bool:
+        spec = self.specs[i]
+        # contexte d'abord: quelques dizaines de caractères, écarte la plupart des candidats
+        ctx = self._context[i]
+        if ctx is not None and ctx.search(text, max(0, m.start() - spec.context_chars), m.start()) is None:
+            return False
+        return spec.validator is None or spec.validator(m.group(0))
+
+    def _windows(self, text: str) -> Optional[List[Tuple[int, int]]]:
+        """Merged [start, end) regions around anchor hits, widened by
+        _ANCHOR_REACH then to whitespace.
+
+        None when the text is dense in candidates (more than one window per
+        _DENSE_WINDOW_CHARS characters): a single pass is cheaper.
+        """
+        hits: List[Tuple[int, int]] = []
+        for lit in self._literal_anchors:
+            i = text.find(lit)
+            while i != -1:
+                hits.append((i, i + len(lit)))
+                i = text.find(lit, i + len(lit))
+        for rx in self._regex_anchors:
+            hits.extend(m.span() for m in rx.finditer(text))
+        budget = len(text) // _DENSE_WINDOW_CHARS
+        if len(hits) > 2 * budget:
+            # fusionner ne peut pas ramener sous le seuil: inutile d'élargir chaque hit
+            return None
+        hits.sort()
+
+        out: List[Tuple[int, int]] = []
+        n = len(text)
+        for s, e in hits:
+            e = _token_end(text, min(n, e + _ANCHOR_REACH), n)
+            if out and e <= out[-1][1]:
+                continue  # hit déjà couvert par la fenêtre précédente
+            s = _token_start(text, max(0, s - _ANCHOR_REACH))
+            if out and s <= out[-1][1]:
+                out[-1] = (out[-1][0], e)
+            else:
+                out.append((s, e))
+        return out
+
+    def iter_matches(self, text: str) -> Iterator[PatternMatch]:
+        """Validated, non-overlapping matches in text order."""
+        if not self._anchored:
+            yield from self._iter_region(text, 0, len(text))
+            return
+        windows = self._windows(text)
+        if windows is None or len(windows) * _DENSE_WINDOW_CHARS > len(text):
+            # texte dense en candidats: une seule passe coûte moins que N fenêtres
+            yield from self._iter_region(text, 0, len(text))
+            return
+        for start, end in windows:
+            yield from self._iter_region(text, start, end)
+
+    def _iter_region(self, text: str, pos: int, endpos: int) -> Iterator[PatternMatch]:
+        search = self._combined.search
+        while True:
+            m = search(text, pos, endpos)
+            if m is None:
+                return
+            idx = self._by_group[m.lastgroup]  # type: ignore[index]
+            if self._accept(idx, text, m):
+                yield m.start(), m.end(), self.specs[idx]
+                pos = m.end()
+                continue
+            hit = self._validate_from(text, m.start(), endpos, idx + 1)
+            if hit is not None:
+                yield hit
+                pos = hit[1]
+            else:
+                pos = m.end()
+
+    def scan(self, text: str) -> List[PatternMatch]:
+        return list(self.iter_matches(text))
+
+    def has_match(self, text: str) -> bool:
+        """True as soon as one validated candidate is found."""
+        return next(self.iter_matches(text), None) is not None
@@ -1,10 +1,13 @@
 from __future__ import annotations
 from typing import List
+from app.core.config import get_settings
 from app.detectors.base import BaseDetector
+from app.detectors.patterns import DEFAULT_CATALOGUE
 from app.models.schemas import DcpSpan
 
 class PresidioDetector(BaseDetector):
     name = "presidio"
+    version = "2"
 
     def __init__(self):
         try:
@@ -30,32 +33,21 @@ class PresidioDetector(BaseDetector):
         }
 
         # --- Injecte quelques recognizers FR (patterns) ---
-        # Ça garantit que language="fr" ne plantera pas.
-        email_rec = PatternRecognizer(
-            supported_entity="EMAIL_ADDRESS",
-            patterns=[Pattern("email", r"\b[A-Z0-9._%+-]+@[A-Z0-9.-]+\.[A-Z]{2,}\b", 0.95)],
-            supported_language="fr",
-        )
-
-        iban_rec = PatternRecognizer(
-            supported_entity="IBAN_CODE",
-            patterns=[Pattern("iban", r"\b[A-Z]{2}\d{2}[A-Z0-9]{11,30}\b", 0.90)],
-            supported_language="fr",
-        )
-
-        phone_rec = PatternRecognizer(
-            supported_entity="PHONE_NUMBER",
-            patterns=[Pattern(
-                "phone",
-                r"\b(?:\+?\d{1,3}[\s.-]?)?(?:\(?\d{1,4}\)?[\s.-]?)?\d{2,4}[\s.-]?\d{2,4}[\s.-]?\d{2,4}\b",
-                0.60
-            )],
-            supported_language="fr",
-        )
-
-        self.engine.registry.add_recognizer(email_rec)
-        self.engine.registry.add_recognizer(iban_rec)
-        self.engine.registry.add_recognizer(phone_rec)
+        # Ça garantit que language="fr" ne plantera pas. Les motifs viennent
+        # du catalogue partagé avec le détecteur regex.
+        catalogue = {s.name: s for s in DEFAULT_CATALOGUE}
+        for entity, pattern_name, score in (
+            ("EMAIL_ADDRESS", "email", 0.95),
+            ("IBAN_CODE", "iban", 0.90),
+            ("PHONE_NUMBER", "phone_fr", 0.60),
+        ):
+            self.engine.registry.add_recognizer(
+                PatternRecognizer(
+                    supported_entity=entity,
+                    patterns=[Pattern(pattern_name, rf"(?<!\w){catalogue[pattern_name].pattern}(?!\w)", score)],
+                    supported_language="fr",
+                )
+            )
 
     def _build_engine(self):
         from presidio_analyzer import AnalyzerEngine
@@ -87,17 +79,30 @@ class PresidioDetector(BaseDetector):
         }
         return mapping.get(entity_type, "OTHER")
     
+    def _engine_lang(self, language: str) -> str:
+        # si l'engine n'a pas la langue, fallback en en
+        supported = getattr(self.engine, "supported_languages", ["en"])
+        return language if language in supported else "en"
+
     def detect(self, text: str, language: str = "fr", min_score: float = 0.4) -> List[DcpSpan]:
         """
         FR-safe:
         - essaie en language demandé
         - si KeyError / pas de recognizers, fallback en "en"
         """
-        # si l'engine n'a pas la langue, fallback en en
-        supported = getattr(self.engine, "supported_languages", ["en"])
-        lang = language if language in supported else "en"
+        lang = self._engine_lang(language)
         results = self.engine.analyze(text=text, language=lang)
+        return self._to_spans(text, results, lang=lang, min_score=min_score)
+
+    def detect_batch(self, texts: List[str], language: str = "fr", min_score: float = 0.4) -> List[List[DcpSpan]]:
+        from presidio_analyzer import BatchAnalyzerEngine
+
+        lang = self._engine_lang(language)
+        batch = BatchAnalyzerEngine(analyzer_engine=self.engine)
+        results = batch.analyze_iterator(texts, language=lang, batch_size=get_settings().nlp_batch_size)
+        return [self._to_spans(text, res, lang=lang, min_score=min_score) for text, res in zip(texts, results)]
 
+    def _to_spans(self, text: str, results, *, lang: str, min_score: float) -> List[DcpSpan]:
         spans: List[DcpSpan] = []
         for r in results:
             score = float(r.score or 0.0)
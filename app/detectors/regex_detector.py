@@ -1,46 +1,38 @@
 from __future__ import annotations
-import re
-from typing import List
+from typing import List, Optional, Sequence
+from app.core.config import get_settings
 from app.detectors.base import BaseDetector
+from app.detectors.patterns import PatternEngine
 from app.models.schemas import DcpSpan
 
-EMAIL = re.compile(r"\b[A-Z0-9._%+-]+@[A-Z0-9.-]+\.[A-Z]{2,}\b", re.IGNORECASE)
 
-# IBAN (simple, robuste pour FR/EU; tu peux renforcer avec checksum ensuite)
-IBAN = re.compile(r"\b[A-Z]{2}\d{2}[A-Z0-9]{11,30}\b")
+class RegexDetector(BaseDetector):
+    """High precision patterns (email, IBAN, FR phone, NIR, SIRET/SIREN, cards).
 
-PHONE = re.compile(r"""
-\b(?:\+?\d{1,3}[\s.-]?)?(?:\(?\d{1,4}\)?[\s.-]?)?\d{2,4}[\s.-]?\d{2,4}[\s.-]?\d{2,4}\b
-""", re.VERBOSE)
+    The whole catalogue is scanned in a single pass by PatternEngine;
+    checksums (mod-97, Luhn, clé NIR) only run on candidates.
+    """
 
-class RegexDetector(BaseDetector):
     name = "regex"
+    version = "4"
 
-    def detect(self, text: str, language: str = "fr", min_score: float = 0.0) -> List[DcpSpan]:
-        spans: List[DcpSpan] = []
+    def __init__(self, patterns: Optional[Sequence[str]] = None) -> None:
+        names = get_settings().regex_patterns if patterns is None else patterns
+        self.engine = PatternEngine.from_names(names)
+        self.config = {"patterns": ",".join(self.engine.names)}
 
-        for m in EMAIL.finditer(text):
-            spans.append(
-                DcpSpan(
-                    start=m.start(),
-                    end=m.end(),
-                    label="EMAIL",
-                    score=0.95,
-                    source=self.name,
-                    text=m.group(0),
-                )
-            )
-
-        for m in IBAN.finditer(text):
-            spans.append(
-                DcpSpan(
-                    start=m.start(),
-                    end=m.end(),
-                    label="IBAN",
-                    score=0.90,
-                    source=self.name,
-                    text=m.group(0),
-                )
+    def detect(self, text: str, language: str = "fr", min_score: float = 0.0) -> List[DcpSpan]:
+        # model_construct: spans valides par construction, pas de validation pydantic par match
+        return [
+            DcpSpan.model_construct(
+                start=start,
+                end=end,
+                label=spec.label,
+                score=spec.score,
+                source=self.name,
+                text=text[start:end],
+                metadata={"pattern": spec.name},
             )
-
-        return [s for s in spans if s.score >= min_score]
+            for start, end, spec in self.engine.iter_matches(text)
+            if spec.score >= min_score
+        ]
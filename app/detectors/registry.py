@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import threading
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional
+
+from app.core.logging import get_logger
+
+from app.detectors.regex_detector import RegexDetector
+from app.detectors.presidio_detector import PresidioDetector
+from app.detectors.spacy_detector import SpacyDetector
+from app.detectors.hf_ner_detector import HFNerDetector
+from app.detectors.piiranha import PiiranhaDetector
+from app.detectors.gliner_small import GLiNERSmallDetector
+
+logger = get_logger(__name__)
+
+
+def default_factories() -> Dict[str, Callable[[], Any]]:
+    """Lazy factories for the built-in detectors."""
+    return {
+        "regex": lambda: RegexDetector(),
+        "presidio": lambda: PresidioDetector(),
+        "spacy": lambda: SpacyDetector(),
+        "hf": lambda: HFNerDetector(),
+        "gliner-small": lambda: GLiNERSmallDetector(),
+        "piiranha": lambda: PiiranhaDetector(),
+    }
+
+
+class DetectorRegistry:
+    """Process-wide, thread-safe detector registry.
+
+    - Each detector is instantiated at most once per process.
+    - One lock per detector: two requests asking for the same model wait for
+      a single load, while different models can load concurrently.
+    """
+
+    def __init__(self, factories: Optional[Dict[str, Callable[[], Any]]] = None) -> None:
+        self._factories: Dict[str, Callable[[], Any]] = factories or default_factories()
+        self._instances: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {name: threading.Lock() for name in self._factories}
+
+    def available(self) -> List[str]:
+        return sorted(self._factories.keys())
+
+    def loaded(self) -> List[str]:
+        with self._lock:
+            return sorted(self._instances.keys())
+
+    def is_loaded(self, name: str) -> bool:
+        with self._lock:
+            return name in self._instances
+
+    def get(self, name: str) -> Any:
+        if name not in self._factories:
+            raise ValueError(f"Detector inconnu: {name}")
+
+        # Fast path: already loaded
+        inst = self._instances.get(name)
+        if inst is not None:
+            return inst
+
+        with self._load_locks[name]:
+            # Double-check: another thread may have loaded it while we waited
+            inst = self._instances.get(name)
+            if inst is not None:
+                return inst
+            logger.info(f"Loading detector: {name}")
+            inst = self._factories[name]()
+            # modèle torch chargé: threads intra-op alignés sur le budget CPU
+            from app.services.concurrency import apply_torch_threads
+
+            apply_torch_threads()
+            with self._lock:
+                self._instances[name] = inst
+            return inst
+
+    def warmup(self, detectors: List[str] | None = None) -> Dict[str, str]:
+        """Best-effort warmup to preload models into RAM."""
+        detectors = detectors or self.available()
+        status: Dict[str, str] = {}
+        for d in detectors:
+            try:
+                self.get(d)
+                status[d] = "ok"
+            except Exception as e:
+                status[d] = f"error: {e}"
+        return status
+
+
+@lru_cache(maxsize=1)
+def get_detector_registry() -> DetectorRegistry:
+    """Shared registry accessor (1 seule instance par process)."""
+    return DetectorRegistry()
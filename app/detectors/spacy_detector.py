@@ -1,5 +1,6 @@
 from __future__ import annotations
 from typing import List
+from app.core.config import get_settings
 from app.detectors.base import BaseDetector
 from app.models.schemas import DcpSpan
 
@@ -13,6 +14,7 @@ class SpacyDetector(BaseDetector):
             raise RuntimeError("spaCy non installé. Fais: pip install spacy") from e
 
         self.nlp = spacy.load(model)
+        self.config = {"model": model, "spacy": spacy.__version__}
 
         # mapping spaCy labels -> DCP labels (best-effort)
         self.map = {
@@ -27,7 +29,14 @@ class SpacyDetector(BaseDetector):
         }
 
     def detect(self, text: str, language: str = "fr") -> List[DcpSpan]:
-        doc = self.nlp(text)
+        return self._to_spans(self.nlp(text))
+
+    def detect_batch(self, texts: List[str], language: str = "fr") -> List[List[DcpSpan]]:
+        # nlp.pipe: un seul passage batché au lieu d'un nlp() par texte
+        docs = self.nlp.pipe(texts, batch_size=get_settings().nlp_batch_size)
+        return [self._to_spans(doc) for doc in docs]
+
+    def _to_spans(self, doc) -> List[DcpSpan]:
         spans: List[DcpSpan] = []
         for ent in doc.ents:
             label = self.map.get(ent.label_, "OTHER")
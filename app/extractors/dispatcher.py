@@ -1,35 +1,97 @@
 from __future__ import annotations
 
 import mimetypes
-from typing import List, Optional
+import os
+import stat
+import zipfile
+from typing import Dict, List, Optional
 
 from app.extractors.base import BaseExtractor, ExtractResult
 
+# Signatures (magic bytes) -> nom d'extracteur, pour les fichiers sans suffixe connu
+_MAGIC = [
+    (b"%PDF-", "pdf"),
+    (b"\x89PNG\r\n\x1a\n", "image_ocr"),
+    (b"\xff\xd8\xff", "image_ocr"),
+    (b"II*\x00", "image_ocr"),
+    (b"MM\x00*", "image_ocr"),
+    (b"BM", "image_ocr"),
+]
+
 
 class ExtractorDispatcher:
-    """Select the best extractor for a given file path."""
+    """Select the best extractor for a given file path.
+
+    Dispatch is a suffix lookup (no per-extractor `can_extract` probing, a
+    single stat per file); files with an unknown suffix are sniffed from
+    their first bytes (PDF, images, OOXML zip), then treated as text unless
+    they look binary.
+    """
 
     def __init__(self, extractors: Optional[List[BaseExtractor]] = None):
         # default registry
+        from app.core.config import get_settings
         from app.extractors.text_extractor import TextExtractor
         from app.extractors.pdf_extractor import PdfExtractor
         from app.extractors.docx_extractor import DocxExtractor
         from app.extractors.xlsx_extractor import XlsxExtractor
         from app.extractors.ocr_extractor import ImageOcrExtractor
 
+        settings = get_settings()
         self.extractors: List[BaseExtractor] = extractors or [
-            PdfExtractor(),
+            PdfExtractor(settings.pdf_text_mode, probe_pages=settings.pdf_probe_pages, ocr_dpi=settings.pdf_ocr_dpi),
             DocxExtractor(),
             XlsxExtractor(),
             ImageOcrExtractor(),
             TextExtractor(),  # keep last as fallback for .txt/.md/.csv/.json etc.
         ]
+        self.by_name: Dict[str, BaseExtractor] = {ex.name: ex for ex in self.extractors}
+        self.by_suffix: Dict[str, BaseExtractor] = {}
+        for ex in self.extractors:
+            for suffix in ex.supported_suffixes:
+                self.by_suffix.setdefault(suffix, ex)  # le premier déclaré gagne
+
+    def select(self, path: str) -> BaseExtractor:
+        """Extractor for `path` (suffix first, then magic bytes). Does not stat the file."""
+        ex = self.by_suffix.get(os.path.splitext(path)[1].lower())
+        if ex is not None:
+            return ex
+        name = self._sniff(path)
+        if name is None or name not in self.by_name:
+            raise RuntimeError(f"No extractor found for: {path}")
+        return self.by_name[name]
 
     def extract(self, path: str) -> ExtractResult:
-        for ex in self.extractors:
-            if ex.can_extract(path):
-                res = ex.extract(path)
-                if not res.mime:
-                    res.mime = mimetypes.guess_type(path)[0]
-                return res
-        raise RuntimeError(f"No extractor found for: {path}")
\ No newline at end of file
+        path = os.path.abspath(os.path.expanduser(path))
+        st = os.stat(path)  # le seul appel système de métadonnées par fichier
+        if not stat.S_ISREG(st.st_mode):
+            raise RuntimeError(f"Not a regular file: {path}")
+        res = self.select(path).extract(path)
+        if not res.mime:
+            res.mime = mimetypes.guess_type(path)[0]
+        return res
+
+    @staticmethod
+    def _sniff(path: str) -> Optional[str]:
+        with open(path, "rb") as f:
+            head = f.read(4096)
+        for magic, name in _MAGIC:
+            if head.startswith(magic):
+                return name
+        if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+            return "image_ocr"
+        if head.startswith(b"PK\x03\x04"):
+            # OOXML: le contenu du zip dit s'il s'agit d'un docx ou d'un xlsx
+            try:
+                with zipfile.ZipFile(path) as z:
+                    names = set(z.namelist())
+            except zipfile.BadZipFile:
+                return None
+            if "word/document.xml" in names:
+                return "docx"
+            if "xl/workbook.xml" in names:
+                return "xlsx"
+            return None
+        if b"\x00" in head:
+            return None  # binaire inconnu
+        return "text"
@@ -1,31 +1,148 @@
 from __future__ import annotations
 
+from io import StringIO
+from typing import Iterator, List, Literal, Optional, Tuple
+
 from app.extractors.base import BaseExtractor, ExtractResult, normalize_path
 
+# raw    : pdfminer sans analyse de layout (rapide)
+# layout : pdfplumber extract_text (lent, meilleur ordre de lecture)
+# ocr    : pas de couche texte (PDF scanné), pages rendues puis OCR
+PdfTextMode = Literal["raw", "layout", "ocr"]
+
+
+def _pdfplumber():
+    try:
+        import pdfplumber
+    except Exception as e:
+        raise RuntimeError("pdfplumber not installed. Install with: pip install pdfplumber") from e
+    return pdfplumber
+
+
+def pdf_page_count(path: str) -> int:
+    with _pdfplumber().open(path) as pdf:
+        return len(pdf.pages)
+
+
+def iter_raw_pages(path: str, page_numbers: Optional[List[int]] = None) -> Iterator[str]:
+    """Fast text pass: pdfminer content-stream decoding, no layout analysis (0-based page_numbers)."""
+    try:
+        from pdfminer.converter import TextConverter
+        from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+        from pdfminer.pdfpage import PDFPage
+    except Exception as e:
+        raise RuntimeError("pdfminer.six not installed. Install with: pip install pdfminer.six") from e
+
+    rsrcmgr = PDFResourceManager(caching=True)
+    out = StringIO()
+    device = TextConverter(rsrcmgr, out, laparams=None)
+    interpreter = PDFPageInterpreter(rsrcmgr, device)
+    with open(path, "rb") as fp:
+        for page in PDFPage.get_pages(fp, set(page_numbers) if page_numbers is not None else None):
+            interpreter.process_page(page)
+            yield out.getvalue().replace("\x0c", "")  # saut de page ajouté par TextConverter
+            out.seek(0)
+            out.truncate(0)
+    device.close()
+
+
+def probe_text_layer(path: str, *, sample_pages: int = 3, min_chars: int = 20) -> PdfTextMode:
+    """Decide how to read a PDF from a raw pass over its first pages.
+
+    - no text at all              -> "ocr" (scanned document)
+    - words glued / undecodable   -> "layout" (pdfplumber rebuilds spacing)
+    - otherwise                   -> "raw" is enough
+    """
+    sample = "".join(iter_raw_pages(path, list(range(max(1, sample_pages)))))
+    chars = [c for c in sample if not c.isspace()]
+    if len(chars) < min_chars:
+        return "ocr"
+    if "(cid:" in sample or sample.count("�") > 0.05 * len(chars):
+        return "layout"
+    # glyphes positionnés sans espace explicite: la passe brute colle les mots
+    if len(chars) > 200 and sample.count(" ") < 0.05 * len(chars):
+        return "layout"
+    return "raw"
+
+
+def ocr_pdf_pages(path: str, *, start: int = 0, end: Optional[int] = None, dpi: int = 200) -> Iterator[str]:
+    """Render pages [start, end) with pypdfium2 and OCR them, one batch per OCR worker count."""
+    try:
+        import pypdfium2 as pdfium
+    except Exception as e:
+        raise RuntimeError("pypdfium2 not installed. Install with: pip install pypdfium2") from e
+    from app.services.ocr import get_ocr_service
+
+    ocr = get_ocr_service()
+    dpi = min(dpi, ocr.target_dpi)  # rendu directement à la résolution d'OCR
+    pdf = pdfium.PdfDocument(path)
+    try:
+        stop = len(pdf) if end is None else min(end, len(pdf))
+        for i in range(start, stop, ocr.workers):
+            # pages rendues par pdfium (rotation /Rotate appliquée): droites
+            images = [pdf[j].render(scale=dpi / 72).to_pil() for j in range(i, min(i + ocr.workers, stop))]
+            for res in ocr.ocr_batch(images, upright=True):
+                yield res.text
+    finally:
+        pdf.close()
+
+
+def extract_pdf_pages(path: str, start: int, end: int, mode: PdfTextMode = "layout") -> Tuple[int, List[str]]:
+    """Text of pages [start, end) (0-based). Top-level so it can run in a worker process."""
+    if mode == "raw":
+        return start, list(iter_raw_pages(path, list(range(start, end))))
+    texts: List[str] = []
+    with _pdfplumber().open(path, pages=list(range(start + 1, end + 1))) as pdf:
+        for page in pdf.pages:
+            texts.append(page.extract_text() or "")
+            page.close()  # libère le cache d'objets de la page
+    return start, texts
+
+
+def iter_pdf_pages(path: str, mode: PdfTextMode = "layout", *, ocr_dpi: int = 200) -> Iterator[Tuple[int, str]]:
+    """Sequential page stream: (1-based page number, text), one page in memory at a time."""
+    if mode == "ocr":
+        yield from enumerate(ocr_pdf_pages(path, dpi=ocr_dpi), start=1)
+        return
+    if mode == "raw":
+        yield from enumerate(iter_raw_pages(path), start=1)
+        return
+    with _pdfplumber().open(path) as pdf:
+        for i, page in enumerate(pdf.pages, start=1):
+            text = page.extract_text() or ""
+            page.close()
+            yield i, text
+
 
 class PdfExtractor:
     name = "pdf"
     supported_suffixes = {".pdf"}
 
+    def __init__(self, mode: Literal["auto", "raw", "layout"] = "auto", *, probe_pages: int = 3, ocr_dpi: int = 200):
+        self.mode = mode
+        self.probe_pages = probe_pages
+        self.ocr_dpi = ocr_dpi
+
     def can_extract(self, path: str) -> bool:
         p = normalize_path(path)
         return p.is_file() and p.suffix.lower() in self.supported_suffixes
 
+    def text_mode(self, path: str) -> PdfTextMode:
+        if self.mode != "auto":
+            return self.mode
+        return probe_text_layer(path, sample_pages=self.probe_pages)
+
+    def iter_pages(self, path: str) -> Iterator[Tuple[int, str]]:
+        return iter_pdf_pages(path, self.text_mode(path), ocr_dpi=self.ocr_dpi)
+
     def extract(self, path: str) -> ExtractResult:
         p = normalize_path(path)
-        try:
-            import pdfplumber
-        except Exception as e:
-            raise RuntimeError("pdfplumber not installed. Install with: pip install pdfplumber") from e
-
-        parts: list[str] = []
-        with pdfplumber.open(str(p)) as pdf:
-            for i, page in enumerate(pdf.pages):
-                parts.append(page.extract_text() or "")
+        mode = self.text_mode(str(p))
+        parts = [text for _, text in iter_pdf_pages(str(p), mode, ocr_dpi=self.ocr_dpi)]
 
         return ExtractResult(
             text="\n".join(parts).strip(),
             source_path=str(p),
             mime="application/pdf",
-            metadata={"extractor": self.name, "pages": str(len(parts))},
-        )
\ No newline at end of file
+            metadata={"extractor": self.name, "pages": str(len(parts)), "mode": mode},
+        )
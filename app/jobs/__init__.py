@@ -1,9 +1,10 @@
 """Background jobs for scanning/benchmarking/anonymization.
 
-Default implementation uses an in-process thread pool (POC-friendly).
-Can be swapped for Redis/Celery/RQ later with the same interface.
+Jobs are rows of the `job_results` table, leased by workers running in the
+API process and/or standalone (`python -m app.jobs.worker`), on any host
+sharing the database.
 """
 
-from app.jobs.queue import JobQueue, JobStatus, JobRecord
+from app.jobs.queue import JobEventRecord, JobQueue, JobStatus, JobRecord, LeasedJob
 
-__all__ = ["JobQueue", "JobStatus", "JobRecord"]
\ No newline at end of file
+__all__ = ["JobEventRecord", "JobQueue", "JobStatus", "JobRecord", "LeasedJob"]
\ No newline at end of file
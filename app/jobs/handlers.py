@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional
+
+from app.models.schemas import BenchTextRequest, ScanRequest
+
+# Un job = (kind, params JSON): le handler est rejoué par n'importe quel worker.
+# progress(counters, item): compteurs (échantillonnés) + résultat partiel
+# optionnel (ex. un fichier scanné), diffusés sur GET /jobs/{id}/events
+ProgressFn = Callable[[Dict[str, Any], Optional[Dict[str, Any]]], None]
+JobHandler = Callable[[Dict[str, Any], ProgressFn], Dict[str, Any]]
+
+
+@lru_cache(maxsize=1)
+def _text_pipeline():
+    from app.services.pipeline_text import TextPipeline
+
+    return TextPipeline()
+
+
+@lru_cache(maxsize=1)
+def _scan_service():
+    from app.services.scan_service import ScanService
+
+    return ScanService()
+
+
+def run_bench_text(params: Dict[str, Any], progress: ProgressFn) -> Dict[str, Any]:
+    req = BenchTextRequest(**params)
+    report = _text_pipeline().bench(
+        text=req.text,
+        language=req.language,
+        detectors=req.detectors,
+        min_score=req.min_score,
+    )
+    return {"report": report}
+
+
+def run_scan(params: Dict[str, Any], progress: ProgressFn) -> Dict[str, Any]:
+    req = ScanRequest(**params)
+
+    def on_result(res: Dict[str, Any], counters: Dict[str, Any]) -> None:
+        progress({**counters, "last": res["uri"]}, res)
+
+    return _scan_service().scan(
+        connector=req.connector,
+        root=req.root,
+        recursive=req.recursive,
+        language=req.language,
+        detectors=req.detectors,
+        min_score=req.min_score,
+        limit=req.limit,
+        parallel=req.parallel,
+        incremental=req.incremental,
+        on_result=on_result,
+    )
+
+
+JOB_HANDLERS: Dict[str, JobHandler] = {
+    "bench_text": run_bench_text,
+    "scan": run_scan,
+}
@@ -1,21 +1,42 @@
 from __future__ import annotations
 
 import datetime as dt
+import json
 import threading
 import uuid
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import Any, Callable, Dict, Optional
+from typing import Any, Callable, Dict, List, Optional
 
+from sqlalchemy import and_, delete, func, or_, select, update
+from sqlalchemy.orm import Session, aliased, defer
+
+from app.core.config import get_settings
 from app.core.logging import get_logger
-from app.db.models import JobResult
+from app.db.models import JobEvent, JobPayload, JobResult
 from app.db.session import SessionLocal
+from app.jobs.store import JobWrite, JobWriter, decode_result, encode_result, get_job_writer, summarize
+
 
 class JobStatus(str, Enum):
     queued = "queued"
     running = "running"
     done = "done"
     error = "error"
+    cancelled = "cancelled"
+
+    @property
+    def finished(self) -> bool:
+        return self in (JobStatus.done, JobStatus.error, JobStatus.cancelled)
+
+
+# Classes de priorité (plus petit = servi d'abord)
+JOB_PRIORITIES: Dict[str, int] = {"interactive": 0, "batch": 1, "bulk": 2}
+_PRIORITY_NAMES = {v: k for k, v in JOB_PRIORITIES.items()}
+
+
+class JobCancelled(Exception):
+    """Raised in a running job (progress callback) once its cancellation was requested."""
 
 
 @dataclass
@@ -29,83 +50,588 @@ class JobRecord:
     result: Optional[Dict[str, Any]] = None
     error: Optional[str] = None
     meta: Dict[str, Any] = field(default_factory=dict)
+    progress: Dict[str, Any] = field(default_factory=dict)
+    attempts: int = 0
+    max_attempts: int = 1
+    priority: str = "batch"
+    tenant: str = ""
+
+
+@dataclass
+class JobEventRecord:
+    id: int
+    type: str
+    data: Dict[str, Any]
+    created_at: dt.datetime
+
+
+@dataclass
+class LeasedJob:
+    """A job leased by a worker: its parameters and the lease it must renew."""
+    job: JobRecord
+    params: Dict[str, Any]
+    worker_id: str
+    lease_expires_at: dt.datetime
+    cancel: threading.Event = field(default_factory=threading.Event)
+
+
+def _now() -> dt.datetime:
+    return dt.datetime.now(dt.timezone.utc)
+
+
+def _aware(ts: Optional[dt.datetime]) -> Optional[dt.datetime]:
+    # SQLite renvoie des datetimes naïfs (stockés en UTC)
+    if ts is not None and ts.tzinfo is None:
+        return ts.replace(tzinfo=dt.timezone.utc)
+    return ts
+
+
+def _loads(raw: Optional[str]) -> Dict[str, Any]:
+    try:
+        return json.loads(raw or "{}")
+    except Exception:
+        return {}
+
+
+def _dumps(payload: Optional[Dict[str, Any]]) -> str:
+    return json.dumps(payload or {}, ensure_ascii=False, default=str)
+
+
+def _to_record(row: JobResult, *, with_payload: bool = True) -> JobRecord:
+    status = JobStatus(row.status) if row.status in JobStatus.__members__ else JobStatus.done
+    return JobRecord(
+        id=row.id,
+        kind=row.kind,
+        status=status,
+        created_at=_aware(row.created_at),  # type: ignore[arg-type]
+        started_at=_aware(row.started_at),
+        finished_at=_aware(row.finished_at),
+        result=row.get_payload() if with_payload and status == JobStatus.done else None,
+        error=row.error,
+        meta=_loads(row.meta_json),
+        progress=_loads(row.progress_json),
+        attempts=row.attempts or 0,
+        max_attempts=row.max_attempts or 1,
+        priority=_PRIORITY_NAMES.get(row.priority, "batch") if row.priority is not None else "batch",
+        tenant=row.tenant or "",
+    )
 
 
 class JobQueue:
-    """Minimal in-memory job queue (POC).
+    """Durable job queue on top of the `job_results` table.
 
-    - Thread-safe
-    - Stores results in memory
-    - Designed to be replaced later by DB/Redis without changing API.
+    - enqueue() inserts a queued row: any API replica / worker process
+      sharing the database sees it
+    - lease() takes the oldest available job: `SELECT ... FOR UPDATE SKIP
+      LOCKED` on Postgres (workers never wait on each other's rows), then a
+      conditional UPDATE on (status, attempts) so only one worker wins a row,
+      also on SQLite where FOR UPDATE is a no-op
+    - a running job whose lease expired (worker killed, stuck) is leased
+      again; leases are renewed by heartbeat() (visibility timeout)
+    - scheduling: priority classes (interactive, batch, bulk) with aging,
+      fair share between tenants (API keys), oldest first (cf. lease())
+    - `kind_limits` caps the jobs of a kind running at once across all
+      workers (ex. {"scan": 1}), checked in the leasing UPDATE itself
+    - fail() re-queues the job with a backoff while attempts < max_attempts
+    - cancel(): queued jobs are cancelled at once, running ones at their
+      next progress report (JobCancelled raised in the job)
+    - updates from a worker are fenced on its lease: a worker that lost its
+      lease cannot overwrite the attempt that replaced it
+    - enqueue / progress / completion go through the write-behind JobWriter
+      (batched, coalesced): callers never wait on the database; large results
+      are stored compressed out of line (job_payloads)
     """
 
-    def __init__(self):
-        self._lock = threading.Lock()
-        self._jobs: Dict[str, JobRecord] = {}
+    def __init__(
+        self,
+        *,
+        session_factory: Callable[[], Session] = SessionLocal,
+        visibility_timeout_s: Optional[float] = None,
+        retry_backoff_s: Optional[float] = None,
+        max_attempts: Optional[int] = None,
+        writer: Optional[JobWriter] = None,
+        kind_limits: Optional[Dict[str, int]] = None,
+    ) -> None:
+        settings = get_settings()
+        self._session = session_factory
+        self._writer = writer
+        self.result_inline_max = settings.jobs_result_inline_max_kb * 1024
+        self.visibility_timeout = dt.timedelta(seconds=visibility_timeout_s or settings.jobs_visibility_timeout_s)
+        self.retry_backoff = dt.timedelta(seconds=retry_backoff_s if retry_backoff_s is not None else settings.jobs_retry_backoff_s)
+        self.max_attempts = max(1, max_attempts or settings.jobs_max_attempts)
+        self.priority_aging = dt.timedelta(seconds=max(0, settings.jobs_priority_aging_s))
+        self.default_priorities = settings.jobs_default_priority
+        self.kind_limits = dict(settings.jobs_kind_limits if kind_limits is None else kind_limits)
         self._logger = get_logger(__name__)
 
-    def create(self, *, kind: str, meta: Optional[Dict[str, Any]] = None) -> JobRecord:
-        job_id = uuid.uuid4().hex
-        rec = JobRecord(id=job_id, kind=kind, meta=meta or {})
-        with self._lock:
-            self._jobs[job_id] = rec
-        self._persist(rec)
-        return rec
-
-    def get(self, job_id: str) -> Optional[JobRecord]:
-        with self._lock:
-            return self._jobs.get(job_id)
-
-    def set_running(self, job_id: str) -> None:
-        with self._lock:
-            job = self._jobs[job_id]
-            job.status = JobStatus.running
-            job.started_at = dt.datetime.now(dt.timezone.utc)
-        self._persist(job)
-
-    def set_done(self, job_id: str, result: Dict[str, Any]) -> None:
-        with self._lock:
-            job = self._jobs[job_id]
-            job.status = JobStatus.done
-            job.result = result
-            job.finished_at = dt.datetime.now(dt.timezone.utc)
-        self._persist(job)
-
-    def set_error(self, job_id: str, error: str) -> None:
-        with self._lock:
-            job = self._jobs[job_id]
-            job.status = JobStatus.error
-            job.error = error
-            job.finished_at = dt.datetime.now(dt.timezone.utc)
-        self._persist(job)
-
-    def _persist(self, job: JobRecord) -> None:
-        """Persist/refresh job record in the DB for durability."""
-        try:
-            with SessionLocal() as db:
-                db_job = db.get(JobResult, job.id) or JobResult(id=job.id, kind=job.kind)
-                db_job.status = job.status.value
-                db_job.updated_at = dt.datetime.now(dt.timezone.utc)
-                db_job.created_at = db_job.created_at or job.created_at
-
-                # Optional metadata
-                lang = job.meta.get("language") if job.meta else None
-                detectors = job.meta.get("detectors") if job.meta else None
-                if lang:
-                    db_job.language = lang
-                if detectors:
-                    if isinstance(detectors, list):
-                        db_job.detectors = ",".join(detectors)
-                    else:
-                        db_job.detectors = str(detectors)
-
-                # Payload
-                payload = job.result or job.meta or {}
-                if job.error:
-                    payload = {**payload, "error": job.error}
-                db_job.set_payload(payload)
-
-                db.add(db_job)
+    @property
+    def writer(self) -> JobWriter:
+        return self._writer or get_job_writer()
+
+    # --- Producteur (API) ---
+
+    def enqueue(
+        self,
+        *,
+        kind: str,
+        params: Optional[Dict[str, Any]] = None,
+        meta: Optional[Dict[str, Any]] = None,
+        max_attempts: Optional[int] = None,
+        priority: Optional[str] = None,
+        tenant: str = "",
+    ) -> JobRecord:
+        """Queue a job; the row is written by the background writer (no DB round-trip here).
+
+        `priority`: interactive | batch | bulk (default: settings.jobs_default_priority
+        for the kind, else batch); `tenant`: caller id for fair share.
+        """
+        now = _now()
+        meta = meta or {}
+        priority = priority or self.default_priorities.get(kind, "batch")
+        if priority not in JOB_PRIORITIES:
+            raise ValueError(f"Unknown job priority: {priority} ({', '.join(JOB_PRIORITIES)})")
+        detectors = meta.get("detectors")
+        values: Dict[str, Any] = {
+            "id": uuid.uuid4().hex,
+            "kind": kind,
+            "status": JobStatus.queued.value,
+            "created_at": now,
+            "updated_at": now,
+            "available_at": now,
+            "language": meta.get("language") or None,
+            "detectors": (",".join(detectors) if isinstance(detectors, list) else str(detectors)) if detectors else None,
+            "params_json": _dumps(params),
+            "meta_json": _dumps(meta),
+            "progress_json": "{}",
+            "payload_json": "{}",
+            "error": None,
+            "attempts": 0,
+            "max_attempts": max(1, max_attempts or self.max_attempts),
+            "lease_owner": None,
+            "lease_expires_at": None,
+            "started_at": None,
+            "finished_at": None,
+            "priority": JOB_PRIORITIES[priority],
+            "tenant": tenant,
+            "cancel_requested": False,
+        }
+        self.writer.submit(JobWrite(job_id=values["id"], values=values, insert=True))
+        return JobRecord(
+            id=values["id"],
+            kind=kind,
+            created_at=now,
+            meta=meta,
+            max_attempts=values["max_attempts"],
+            priority=priority,
+            tenant=tenant,
+        )
+
+    def _pending_record(self, job_id: str) -> Optional[JobRecord]:
+        # enqueue pas encore écrit (write-behind): état construit depuis l'INSERT en attente
+        values = self.writer.pending_insert(job_id)
+        return _to_record(JobResult(**values), with_payload=False) if values is not None else None
+
+    def get(self, job_id: str, *, with_result: bool = True) -> Optional[JobRecord]:
+        """Job state; `with_result` also loads a result stored out of line.
+
+        Never flushes the writer: a job enqueued here and not written yet is
+        answered from its pending INSERT; worker updates show up once the
+        writer has flushed them (jobs_flush_interval_ms).
+        """
+        pending = self._pending_record(job_id)  # avant la lecture: l'INSERT peut se terminer entre-temps
+        with self._session() as db:
+            row = db.get(JobResult, job_id)
+            if row is None:
+                return pending
+            rec = _to_record(row)
+            if with_result and rec.result and "result_ref" in rec.result:
+                blob = db.get(JobPayload, job_id)
+                if blob is not None:
+                    rec.result = decode_result(blob.data)
+            return rec
+
+    def status(self, job_id: str) -> Optional[JobRecord]:
+        """Job state without its result (payload / params columns not even loaded)."""
+        pending = self._pending_record(job_id)
+        with self._session() as db:
+            row = db.get(
+                JobResult,
+                job_id,
+                options=[defer(JobResult.payload_json), defer(JobResult.params_json)],
+            )
+            return _to_record(row, with_payload=False) if row is not None else pending
+
+    def events_since(self, job_id: str, after_id: int = 0, *, limit: int = 500) -> List[JobEventRecord]:
+        """Events of a job with id > after_id, oldest first (SSE tail)."""
+        with self._session() as db:
+            rows = db.execute(
+                select(JobEvent)
+                .where(JobEvent.job_id == job_id, JobEvent.id > after_id)
+                .order_by(JobEvent.id)
+                .limit(limit)
+            ).scalars().all()
+            return [JobEventRecord(r.id, r.type, _loads(r.data_json), _aware(r.created_at)) for r in rows]  # type: ignore[arg-type]
+
+    def cancel(self, job_id: str) -> Optional[JobStatus]:
+        """Cancel a job: immediately if queued, cooperatively if running.
+
+        Returns the job status after the call (running = cancellation
+        requested, the worker stops at its next progress report), or None
+        if the job does not exist.
+        """
+        if self.writer.has_pending(job_id):
+            self.writer.flush()
+        now = _now()
+        with self._session() as db:
+            res = db.execute(
+                update(JobResult)
+                .where(JobResult.id == job_id, JobResult.status == JobStatus.queued.value)
+                .values(status=JobStatus.cancelled.value, error="cancelled", finished_at=now, updated_at=now)
+                .execution_options(synchronize_session=False)
+            )
+            if res.rowcount == 1:
+                db.commit()
+                self.writer.submit_event(job_id, "cancelled", {"while": JobStatus.queued.value})
+                return JobStatus.cancelled
+            res = db.execute(
+                update(JobResult)
+                .where(JobResult.id == job_id, JobResult.status == JobStatus.running.value)
+                .values(cancel_requested=True, updated_at=now)
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+            if res.rowcount == 1:
+                return JobStatus.running
+            row = db.get(JobResult, job_id, options=[defer(JobResult.payload_json), defer(JobResult.params_json)])
+            return _to_record(row, with_payload=False).status if row is not None else None
+
+    def prune_events(self, *, older_than_s: float, batch: int = 500, max_batches: int = 20) -> int:
+        """Delete the events of jobs finished more than `older_than_s` ago.
+
+        Work is bounded per call (`max_batches` x `batch` jobs); the next call
+        goes on. Returns the number of events deleted.
+        """
+        cutoff = _now() - dt.timedelta(seconds=older_than_s)
+        deleted = 0
+        with self._session() as db:
+            for _ in range(max(1, max_batches)):
+                job_ids = list(
+                    db.execute(
+                        select(JobEvent.job_id)
+                        .join(JobResult, JobResult.id == JobEvent.job_id)
+                        .where(
+                            JobResult.status.in_([s.value for s in JobStatus if s.finished]),
+                            JobResult.finished_at < cutoff,
+                        )
+                        .distinct()
+                        .limit(batch)
+                    ).scalars()
+                )
+                if not job_ids:
+                    break
+                res = db.execute(
+                    delete(JobEvent).where(JobEvent.job_id.in_(job_ids)).execution_options(synchronize_session=False)
+                )
                 db.commit()
-        except Exception:
-            self._logger.exception("Failed to persist job", extra={"job_id": job.id})
+                deleted += res.rowcount or 0
+        return deleted
+
+    def cancel_requested(self, job_ids: List[str]) -> List[str]:
+        """Among running jobs, those whose cancellation was requested."""
+        if not job_ids:
+            return []
+        with self._session() as db:
+            return list(
+                db.execute(
+                    select(JobResult.id).where(JobResult.id.in_(job_ids), JobResult.cancel_requested.is_(True))
+                ).scalars()
+            )
+
+    def stats(self, *, window_s: int = 900) -> Dict[str, Any]:
+        """Queue depth / oldest wait per class and kind, running per kind and tenant,
+        and wait time (created -> started) of the jobs started in the last `window_s`."""
+        now = _now()
+        with self._session() as db:
+            queued = db.execute(
+                select(JobResult.priority, JobResult.kind, func.count(), func.min(JobResult.created_at))
+                .where(JobResult.status == JobStatus.queued.value)
+                .group_by(JobResult.priority, JobResult.kind)
+            ).all()
+            running = db.execute(
+                select(JobResult.kind, JobResult.tenant, func.count())
+                .where(JobResult.status == JobStatus.running.value)
+                .group_by(JobResult.kind, JobResult.tenant)
+            ).all()
+            started = db.execute(
+                select(JobResult.priority, JobResult.created_at, JobResult.started_at)
+                .where(JobResult.started_at >= now - dt.timedelta(seconds=window_s))
+                .order_by(JobResult.started_at.desc())
+                .limit(5000)
+            ).all()
+
+        depth: Dict[str, Dict[str, Any]] = {}
+        for priority, kind, count, oldest in queued:
+            name = _PRIORITY_NAMES.get(priority, "batch")
+            depth.setdefault(name, {})[kind] = {
+                "queued": count,
+                "oldest_wait_s": round((now - _aware(oldest)).total_seconds(), 1) if oldest else 0.0,  # type: ignore[operator]
+            }
+        by_kind: Dict[str, int] = {}
+        by_tenant: Dict[str, int] = {}
+        for kind, tenant, count in running:
+            by_kind[kind] = by_kind.get(kind, 0) + count
+            by_tenant[tenant or ""] = by_tenant.get(tenant or "", 0) + count
+        waits: Dict[str, List[float]] = {}
+        for priority, created, started_at in started:
+            if created and started_at:
+                waits.setdefault(_PRIORITY_NAMES.get(priority, "batch"), []).append(
+                    (_aware(started_at) - _aware(created)).total_seconds()  # type: ignore[operator]
+                )
+        wait_stats = {
+            name: {
+                "jobs": len(ws),
+                "avg_s": round(sum(ws) / len(ws), 3),
+                "p95_s": round(sorted(ws)[int(0.95 * (len(ws) - 1))], 3),
+                "max_s": round(max(ws), 3),
+            }
+            for name, ws in waits.items()
+        }
+        return {
+            "queued": depth,
+            "running": {"by_kind": by_kind, "by_tenant": by_tenant},
+            "wait": {"window_s": window_s, **wait_stats},
+        }
+
+    # --- Consommateur (workers) ---
+
+    def _available(self, now: dt.datetime, kinds: Optional[List[str]]) -> Any:
+        cond = or_(
+            and_(
+                JobResult.status == JobStatus.queued.value,
+                or_(JobResult.available_at.is_(None), JobResult.available_at <= now),
+            ),
+            and_(JobResult.status == JobStatus.running.value, JobResult.lease_expires_at < now),
+        )
+        return and_(cond, JobResult.kind.in_(kinds)) if kinds else cond
+
+    def _rank(self, priority: int, oldest: Optional[dt.datetime], now: dt.datetime) -> int:
+        """Effective class: one class up per `priority_aging` of waiting (no starvation of bulk)."""
+        if not self.priority_aging or oldest is None:
+            return priority
+        waited = (now - _aware(oldest)).total_seconds()  # type: ignore[operator]
+        return priority - int(waited // self.priority_aging.total_seconds())
+
+    def _under_limit(self, kind: str, running: int) -> bool:
+        limit = self.kind_limits.get(kind)
+        return limit is None or running < limit
+
+    def _limit_guard(self, kind: str, now: dt.datetime) -> Any:
+        """Leasing condition re-checked by the UPDATE: another process may have
+        leased a job of the same kind since the counts were read."""
+        limit = self.kind_limits.get(kind)
+        if limit is None:
+            return True
+        other = aliased(JobResult)
+        live = (
+            select(func.count())
+            .select_from(other)
+            .where(other.kind == kind, other.status == JobStatus.running.value, other.lease_expires_at >= now)
+            .scalar_subquery()
+        )
+        return live < limit
+
+    def lease(self, worker_id: str, *, kinds: Optional[List[str]] = None, scan: int = 4) -> Optional[LeasedJob]:
+        """Lease the next job (None if there is none).
+
+        Available jobs are grouped by (priority, tenant, kind); kinds at their
+        `kind_limits` (jobs running under a live lease, all workers) are
+        skipped. The group leased from is the one with the best effective
+        class (priority minus aging), then the tenant with the fewest running
+        jobs (fair share), then the oldest job. Inside the group the oldest
+        job wins.
+        """
+        now = _now()
+        with self._session() as db:
+            available = self._available(now, kinds)
+            groups = db.execute(
+                select(JobResult.priority, JobResult.tenant, JobResult.kind, func.min(JobResult.created_at))
+                .where(available)
+                .group_by(JobResult.priority, JobResult.tenant, JobResult.kind)
+            ).all()
+            if not groups:
+                return None
+            live = db.execute(
+                select(JobResult.tenant, JobResult.kind, func.count())
+                .where(JobResult.status == JobStatus.running.value, JobResult.lease_expires_at >= now)
+                .group_by(JobResult.tenant, JobResult.kind)
+            ).all()
+            running: Dict[str, int] = {}
+            running_kind: Dict[str, int] = {}
+            for tenant, kind, count in live:
+                running[tenant] = running.get(tenant, 0) + count
+                running_kind[kind] = running_kind.get(kind, 0) + count
+            groups = [g for g in groups if self._under_limit(g[2], running_kind.get(g[2], 0))]
+            ranked = sorted(
+                groups,
+                key=lambda g: (self._rank(g[0] or 0, g[3], now), running.get(g[1], 0), _aware(g[3]) or now),
+            )
+            for priority, tenant, kind, _ in ranked:
+                rows = db.execute(
+                    select(JobResult)
+                    .where(available, JobResult.priority == priority, JobResult.tenant == tenant, JobResult.kind == kind)
+                    .order_by(JobResult.created_at)
+                    .limit(scan)
+                    .with_for_update(skip_locked=True)
+                ).scalars().all()
+                leased = self._try_lease(db, rows, worker_id, now)
+                if leased is not None:
+                    return leased
+            db.commit()
+        return None
+
+    def _try_lease(self, db: Session, rows: List[JobResult], worker_id: str, now: dt.datetime) -> Optional[LeasedJob]:
+        expires = now + self.visibility_timeout
+        for row in rows:
+            attempts = row.attempts or 0
+            guard = and_(JobResult.id == row.id, JobResult.status == row.status, JobResult.attempts == attempts)
+            if row.status == JobStatus.running.value and attempts >= (row.max_attempts or 1):
+                # bail expiré sur la dernière tentative: le worker est mort en route
+                error = f"lease expired (worker {row.lease_owner}) after {attempts} attempts"
+                self.writer.submit_event(row.id, "error", {"error": error, "attempt": attempts})
+                db.execute(
+                    update(JobResult)
+                    .where(guard)
+                    .values(
+                        status=JobStatus.error.value,
+                        error=error,
+                        lease_owner=None,
+                        lease_expires_at=None,
+                        finished_at=now,
+                        updated_at=now,
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+                continue
+            won = db.execute(
+                update(JobResult)
+                .where(guard, self._limit_guard(row.kind, now))
+                .values(
+                    status=JobStatus.running.value,
+                    attempts=attempts + 1,
+                    lease_owner=worker_id,
+                    lease_expires_at=expires,
+                    started_at=now,
+                    updated_at=now,
+                )
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            if won != 1:
+                continue  # pris par un autre worker (SQLite) ou limite du kind atteinte
+            db.commit()
+            db.expire_all()
+            leased = db.get(JobResult, row.id)
+            wait_s = round((now - _aware(leased.created_at)).total_seconds(), 3)  # type: ignore[operator, union-attr]
+            self.writer.submit_event(
+                row.id,
+                "status",
+                {"status": JobStatus.running.value, "attempt": attempts + 1, "worker": worker_id, "wait_s": wait_s},
+            )
+            return LeasedJob(
+                job=_to_record(leased),  # type: ignore[arg-type]
+                params=_loads(leased.params_json),  # type: ignore[union-attr]
+                worker_id=worker_id,
+                lease_expires_at=expires,
+            )
+        return None
+
+    def heartbeat(self, leased: LeasedJob) -> bool:
+        """Extend the lease (synchronous); False if the job is no longer ours."""
+        with self._session() as db:
+            res = db.execute(
+                update(JobResult)
+                .where(
+                    JobResult.id == leased.job.id,
+                    JobResult.lease_owner == leased.worker_id,
+                    JobResult.status == JobStatus.running.value,
+                )
+                .values(lease_expires_at=_now() + self.visibility_timeout, updated_at=_now())
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+            return res.rowcount == 1
+
+    def _write_fenced(self, leased: LeasedJob, blob: Optional[bytes] = None, blob_size: int = 0, **values: Any) -> None:
+        values.setdefault("updated_at", _now())
+        self.writer.submit(
+            JobWrite(job_id=leased.job.id, values=values, fence=leased.worker_id, blob=blob, blob_size=blob_size)
+        )
+
+    def set_progress(self, leased: LeasedJob, progress: Dict[str, Any]) -> None:
+        """Store progress counters (write-behind, coalesced; also renews the lease)."""
+        self._write_fenced(
+            leased,
+            progress_json=_dumps(progress),
+            lease_expires_at=_now() + self.visibility_timeout,
+        )
+        self.writer.submit_event(leased.job.id, "progress", progress)
+
+    def add_result(self, leased: LeasedJob, item: Dict[str, Any]) -> None:
+        """Partial result (e.g. one scanned file), streamed as a `result` event."""
+        self.writer.submit_event(leased.job.id, "result", {**item, "attempt": leased.job.attempts})
+
+    def complete(self, leased: LeasedJob, result: Dict[str, Any]) -> None:
+        """Mark done; results above jobs_result_inline_max_kb are stored compressed in job_payloads."""
+        payload, blob, size = encode_result(result, inline_max_bytes=self.result_inline_max)
+        now = _now()
+        self._write_fenced(
+            leased,
+            blob=blob,
+            blob_size=size,
+            status=JobStatus.done.value,
+            payload_json=_dumps(payload),
+            error=None,
+            lease_owner=None,
+            lease_expires_at=None,
+            finished_at=now,
+            updated_at=now,
+        )
+        self.writer.submit_event(leased.job.id, "done", {"summary": summarize(result), "size": size})
+
+    def cancelled(self, leased: LeasedJob) -> None:
+        """Running job stopped after a cancel request."""
+        now = _now()
+        self._write_fenced(
+            leased,
+            status=JobStatus.cancelled.value,
+            error="cancelled",
+            lease_owner=None,
+            lease_expires_at=None,
+            finished_at=now,
+        )
+        self.writer.submit_event(leased.job.id, "cancelled", {"while": JobStatus.running.value})
+
+    def fail(self, leased: LeasedJob, error: str, *, retry: bool = True) -> JobStatus:
+        """Re-queue the job (backoff) while attempts remain, else mark it in error."""
+        now = _now()
+        attempts = leased.job.attempts
+        if retry and attempts < leased.job.max_attempts:
+            self._write_fenced(
+                leased,
+                status=JobStatus.queued.value,
+                error=error,
+                available_at=now + self.retry_backoff * attempts,
+                lease_owner=None,
+                lease_expires_at=None,
+            )
+            self.writer.submit_event(leased.job.id, "retry", {"error": error, "attempt": attempts})
+            return JobStatus.queued
+        self._write_fenced(
+            leased,
+            status=JobStatus.error.value,
+            error=error,
+            lease_owner=None,
+            lease_expires_at=None,
+            finished_at=now,
+        )
+        self.writer.submit_event(leased.job.id, "error", {"error": error, "attempt": attempts})
+        return JobStatus.error
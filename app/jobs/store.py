@@ -0,0 +1,290 @@
+from __future__ import annotations
+
+import atexit
+import datetime as dt
+import gzip
+import json
+import threading
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.core.logging import get_logger
+from app.db.models import JobEvent, JobPayload, JobResult
+from app.db.session import SessionLocal
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class JobWrite:
+    """Pending write of one job row."""
+    job_id: str
+    values: Dict[str, Any]
+    insert: bool = False  # nouvelle ligne (enqueue)
+    fence: Optional[str] = None  # lease_owner attendu: update ignoré si le bail a été perdu
+    blob: Optional[bytes] = None  # résultat hors ligne (job_payloads)
+    blob_size: int = 0
+    retries: int = 0  # tentatives d'écriture échouées (INSERT seulement)
+
+
+def summarize(result: Dict[str, Any], *, max_field_bytes: int = 4096) -> Dict[str, Any]:
+    """Small top-level fields of a result (summary, counters...), without the bulky ones."""
+    return {
+        k: v
+        for k, v in result.items()
+        if len(json.dumps(v, ensure_ascii=False, default=str)) <= max_field_bytes
+    }
+
+
+def encode_result(result: Dict[str, Any], *, inline_max_bytes: int) -> tuple[Dict[str, Any], Optional[bytes], int]:
+    """(payload_json content, compressed blob or None, JSON size).
+
+    Results above `inline_max_bytes` go to job_payloads; the row keeps a
+    pointer and the small top-level fields (summary, counters...).
+    """
+    raw = json.dumps(result, ensure_ascii=False, default=str).encode("utf-8")
+    if len(raw) <= inline_max_bytes:
+        return result, None, len(raw)
+    blob = gzip.compress(raw, compresslevel=5)
+    payload = {
+        "result_ref": {"table": "job_payloads", "encoding": "gzip+json", "size": len(raw), "stored": len(blob)},
+        "summary": summarize(result),
+    }
+    return payload, blob, len(raw)
+
+
+def decode_result(blob: bytes) -> Dict[str, Any]:
+    return json.loads(gzip.decompress(blob).decode("utf-8"))
+
+
+class JobWriter:
+    """Write-behind persistence of job state.
+
+    Callers only queue the new column values and return; a background
+    thread writes them every `interval_ms` (or as soon as `max_batch` writes
+    are waiting), in one transaction per batch.
+
+    - successive updates of a job under the same fence are coalesced
+      (latest value per column wins): a job reporting progress 100 times
+      between two flushes costs one UPDATE
+    - fenced updates only apply while the worker still holds the lease
+    - if a batch fails, its jobs are retried one by one so a bad write only
+      loses its own job's state; a job whose INSERT still fails is queued
+      again with exponential backoff (up to `insert_retries` times) rather
+      than dropped: the client already holds its job_id
+    - job events (progress, per-file results) are appended in the same
+      transaction as the row updates they go with
+    - flush() writes everything queued so far (shutdown, before a write
+      that must see the row); reads use pending_insert() instead
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        *,
+        interval_ms: float = 50.0,
+        max_batch: int = 500,
+        insert_retries: int = 8,
+        retry_backoff_s: float = 0.5,
+    ) -> None:
+        self._session = session_factory
+        self.interval = max(0.0, interval_ms) / 1000.0
+        self.max_batch = max(1, max_batch)
+        self.insert_retries = max(0, insert_retries)
+        self.retry_backoff = max(0.0, retry_backoff_s)
+        self._retry_at = 0.0
+        self._pending: Dict[str, List[JobWrite]] = {}
+        self._events: Dict[str, List[Dict[str, Any]]] = {}
+        self._count = 0
+        self._inflight: Set[str] = set()
+        self._flushing: Dict[str, List[JobWrite]] = {}  # batch en cours d'écriture
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {
+            "writes": 0,
+            "coalesced": 0,
+            "events": 0,
+            "batches": 0,
+            "rows": 0,
+            "lost_leases": 0,
+            "retried": 0,
+            "dropped": 0,
+        }
+
+    def submit(self, write: JobWrite) -> None:
+        with self._cond:
+            self._ensure_thread()
+            self._stats["writes"] += 1
+            writes = self._pending.setdefault(write.job_id, [])
+            last = writes[-1] if writes else None
+            if (
+                last is not None
+                and not write.insert
+                and last.fence == write.fence
+                and last.blob is None
+                and write.blob is None
+            ):
+                last.values.update(write.values)
+                self._stats["coalesced"] += 1
+            else:
+                writes.append(write)
+                self._count += 1
+            self._wake()
+
+    def _wake(self) -> None:
+        # 1er write en attente: réveille le thread (qui attend ensuite `interval`);
+        # batch plein: flush immédiat
+        if self._count == 1 or self._count >= self.max_batch:
+            self._cond.notify_all()
+
+    def submit_event(self, job_id: str, type: str, data: Dict[str, Any]) -> None:
+        """Append a job event (SSE stream); never coalesced."""
+        row = {
+            "job_id": job_id,
+            "type": type,
+            "data_json": json.dumps(data, ensure_ascii=False, default=str),
+            "created_at": dt.datetime.now(dt.timezone.utc),
+        }
+        with self._cond:
+            self._ensure_thread()
+            self._stats["events"] += 1
+            self._events.setdefault(job_id, []).append(row)
+            self._count += 1
+            self._wake()
+
+    def has_pending(self, job_id: str) -> bool:
+        with self._cond:
+            return job_id in self._pending or job_id in self._events or job_id in self._inflight
+
+    def pending_insert(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Row values of a job whose INSERT is not committed yet (queued or being written), else None.
+
+        Lets reads see a job enqueued by this process without flushing the
+        whole buffer on the request path.
+        """
+        with self._cond:
+            for writes in (self._flushing.get(job_id), self._pending.get(job_id)):
+                for w in writes or ():
+                    if w.insert:
+                        return dict(w.values)
+        return None
+
+    def flush(self) -> None:
+        """Write everything submitted before this call (blocking)."""
+        with self._flush_lock:
+            with self._cond:
+                batch, self._pending, self._count = self._pending, {}, 0
+                events, self._events = self._events, {}
+                self._inflight = set(batch) | set(events)
+                self._flushing = batch
+            try:
+                if batch or events:
+                    self._write(batch, events)
+            finally:
+                with self._cond:
+                    self._inflight = set()
+                    self._flushing = {}
+
+    def _ensure_thread(self) -> None:
+        # démarré au premier write: rien ne tourne dans le master en mode prefork
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._loop, name="job-writer", daemon=True)
+            self._thread.start()
+            atexit.register(self.flush)
+
+    def _loop(self) -> None:
+        while True:
+            with self._cond:
+                while not self._count:
+                    self._cond.wait()
+                if self._count < self.max_batch:
+                    self._cond.wait(self.interval)  # laisse les writes suivants se regrouper
+                delay = self._retry_at - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)  # INSERT en échec remis en file: backoff
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Job state flush failed")
+                time.sleep(1.0)
+
+    def _write(self, batch: Dict[str, List[JobWrite]], events: Dict[str, List[Dict[str, Any]]]) -> None:
+        job_ids = list(dict.fromkeys([*batch, *events]))
+        try:
+            with self._session() as db:
+                self._apply(db, [w for writes in batch.values() for w in writes])
+                rows = [e for evs in events.values() for e in evs]
+                if rows:
+                    db.execute(insert(JobEvent), rows)
+                db.commit()
+            with self._cond:
+                self._stats["batches"] += 1
+                self._stats["rows"] += len(batch)
+            return
+        except Exception as e:
+            if len(job_ids) == 1:
+                job_id = job_ids[0]
+                if self._requeue_insert(job_id, batch.get(job_id, []), events.get(job_id, [])):
+                    logger.warning(f"Job insert failed, will retry: {e}", extra={"job_id": job_id})
+                    return
+                logger.exception("Job state write failed, dropped", extra={"job_id": job_id})
+                with self._cond:
+                    self._stats["dropped"] += 1
+                return
+            logger.warning(f"Job state batch failed, retrying job by job: {e}")
+        for job_id in job_ids:
+            self._write({job_id: batch[job_id]} if job_id in batch else {}, {job_id: events[job_id]} if job_id in events else {})
+
+    def _requeue_insert(self, job_id: str, writes: List[JobWrite], events: List[Dict[str, Any]]) -> bool:
+        """Put back the writes of a job whose INSERT failed, ahead of newer ones; False once out of retries."""
+        insert = next((w for w in writes if w.insert), None)
+        if insert is None or insert.retries >= self.insert_retries:
+            return False
+        insert.retries += 1
+        with self._cond:
+            self._pending[job_id] = writes + self._pending.get(job_id, [])
+            self._events[job_id] = events + self._events.get(job_id, [])
+            if not self._events[job_id]:
+                del self._events[job_id]
+            self._count += len(writes) + len(events)
+            self._stats["retried"] += 1
+            delay = min(30.0, self.retry_backoff * 2 ** (insert.retries - 1))
+            self._retry_at = max(self._retry_at, time.monotonic() + delay)
+            self._cond.notify_all()
+        return True
+
+    def _apply(self, db: Session, writes: List[JobWrite]) -> None:
+        rows = [w.values for w in writes if w.insert]
+        if rows:
+            db.execute(insert(JobResult), rows)
+        for w in writes:
+            if w.insert:
+                continue
+            stmt = update(JobResult).where(JobResult.id == w.job_id)
+            if w.fence is not None:
+                stmt = stmt.where(JobResult.lease_owner == w.fence, JobResult.status == "running")
+            res = db.execute(stmt.values(**w.values).execution_options(synchronize_session=False))
+            if w.fence is not None and res.rowcount != 1:
+                logger.warning("Job lease lost, update dropped", extra={"job_id": w.job_id})
+                with self._cond:
+                    self._stats["lost_leases"] += 1
+                continue
+            if w.blob is not None:
+                db.merge(JobPayload(job_id=w.job_id, encoding="gzip+json", size=w.blob_size, data=w.blob))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {**self._stats, "pending": self._count}
+
+
+@lru_cache(maxsize=1)
+def get_job_writer() -> JobWriter:
+    settings = get_settings()
+    return JobWriter(interval_ms=settings.jobs_flush_interval_ms, max_batch=settings.jobs_flush_max_batch)
@@ -1,31 +1,268 @@
 from __future__ import annotations
 
-from concurrent.futures import ThreadPoolExecutor
-from typing import Any, Callable, Dict, Optional
+import argparse
+import os
+import signal
+import socket
+import threading
+import time
+import uuid
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
 
-from app.jobs.queue import JobQueue
+from app.core.config import get_settings
 from app.core.logging import get_logger
+from app.jobs.handlers import JOB_HANDLERS, JobHandler
+from app.jobs.queue import JobCancelled, JobQueue, JobStatus, LeasedJob
 
 logger = get_logger(__name__)
 
 
 class JobWorker:
-    """Executes jobs in background threads (in-process POC)."""
+    """Pulls jobs from the durable queue and runs them.
 
-    def __init__(self, queue: JobQueue, max_workers: int = 2):
+    - `concurrency` threads each lease one job at a time (poll every
+      `poll_interval` seconds when the queue is empty); which job is decided
+      by the queue (priority classes, fair share per tenant)
+    - `kind_limits` caps the jobs of a kind running at once (ex. {"scan": 1}:
+      the other slots stay free for interactive jobs); the cap is global,
+      enforced by JobQueue.lease(), and checked here first to skip leases
+      that could not succeed
+    - a heartbeat thread polls cancel requests every `cancel_poll` seconds
+      and renews the leases of running jobs every third of the visibility
+      timeout; a cancelled job stops at its next progress report
+    - progress updates are queued at most once per `progress_interval`
+      seconds, partial results always (JobWriter)
+    - the heartbeat thread also deletes, every `prune_interval` seconds, the
+      events of jobs finished more than `events_retention_s` ago (0 = keep)
+    - runs inside the API process (settings.jobs_inprocess_workers) or
+      standalone, as many processes / hosts as needed:
+          python -m app.jobs.worker --concurrency 4
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        *,
+        concurrency: int = 2,
+        handlers: Optional[Dict[str, JobHandler]] = None,
+        kinds: Optional[List[str]] = None,
+        poll_interval: float = 1.0,
+        progress_interval: float = 1.0,
+        kind_limits: Optional[Dict[str, int]] = None,
+        cancel_poll: float = 2.0,
+        events_retention_s: float = 0.0,
+        prune_interval: float = 600.0,
+        worker_id: Optional[str] = None,
+    ) -> None:
         self.queue = queue
-        self.pool = ThreadPoolExecutor(max_workers=max_workers)
+        self.concurrency = max(1, concurrency)
+        self.handlers = handlers if handlers is not None else JOB_HANDLERS
+        self.kinds = kinds or sorted(self.handlers)
+        self.poll_interval = poll_interval
+        self.progress_interval = progress_interval
+        self.kind_limits = dict(kind_limits or {})
+        self.cancel_poll = max(0.1, cancel_poll)
+        self.events_retention_s = max(0.0, events_retention_s)
+        self.prune_interval = prune_interval
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._running: Dict[str, LeasedJob] = {}
+        self._lock = threading.Lock()
+        self._lease_lock = threading.Lock()
+
+    def start(self) -> None:
+        if self._threads:
+            return
+        self._stop.clear()
+        for i in range(self.concurrency):
+            t = threading.Thread(target=self._loop, name=f"job-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        hb = threading.Thread(target=self._heartbeat, name="job-heartbeat", daemon=True)
+        hb.start()
+        self._threads.append(hb)
+        logger.info(f"Job worker {self.worker_id} started: {self.concurrency} slots, kinds={self.kinds}")
+
+    def stop(self, timeout: float = 30.0) -> None:
+        """Stop leasing; wait up to `timeout` for running jobs.
+
+        Jobs still running after that keep their lease, which expires and
+        lets another worker take them over.
+        """
+        self._stop.set()
+        deadline = time.monotonic() + timeout
+        for t in self._threads:
+            t.join(max(0.0, deadline - time.monotonic()))
+        self._threads = []
+        self.queue.writer.flush()
+
+    def _allowed_kinds(self) -> List[str]:
+        with self._lock:
+            running: Dict[str, int] = {}
+            for leased in self._running.values():
+                running[leased.job.kind] = running.get(leased.job.kind, 0) + 1
+        return [k for k in self.kinds if running.get(k, 0) < self.kind_limits.get(k, self.concurrency)]
+
+    def _lease(self) -> Optional[LeasedJob]:
+        # un lease à la fois par process: les limites par kind restent exactes
+        with self._lease_lock:
+            kinds = self._allowed_kinds()
+            if not kinds:
+                return None
+            leased = self.queue.lease(self.worker_id, kinds=kinds)
+            if leased is not None:
+                with self._lock:
+                    self._running[leased.job.id] = leased
+            return leased
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                leased = self._lease()
+            except Exception:
+                logger.exception("Job lease failed")
+                leased = None
+            if leased is None:
+                self._stop.wait(self.poll_interval)
+                continue
+            try:
+                self._execute(leased)
+            finally:
+                with self._lock:
+                    self._running.pop(leased.job.id, None)
+
+    def _execute(self, leased: LeasedJob) -> None:
+        job = leased.job
+        handler = self.handlers.get(job.kind)
+        if handler is None:
+            self.queue.fail(leased, f"Unknown job kind: {job.kind}", retry=False)
+            return
+
+        last = 0.0
 
-    def submit(self, *, job_id: str, fn: Callable[[], Dict[str, Any]]) -> None:
-        """Submit a no-arg function that returns a dict result."""
-        self.queue.set_running(job_id)
+        def progress(counters: Dict[str, Any], item: Optional[Dict[str, Any]] = None) -> None:
+            nonlocal last
+            if leased.cancel.is_set():
+                raise JobCancelled(job.id)
+            try:
+                if item is not None:
+                    self.queue.add_result(leased, item)
+                now = time.monotonic()
+                if now - last < self.progress_interval:
+                    return
+                last = now
+                self.queue.set_progress(leased, counters)
+            except Exception:
+                logger.exception("Job progress update failed", extra={"job_id": job.id})
+
+        try:
+            result = handler(leased.params, progress)
+            if leased.cancel.is_set():
+                raise JobCancelled(job.id)
+            self.queue.complete(leased, result)
+        except JobCancelled:
+            logger.info(f"Job {job.id} cancelled")
+            self.queue.cancelled(leased)
+        except Exception as e:
+            logger.exception("Job failed", extra={"job_id": job.id, "attempt": job.attempts})
+            status = self.queue.fail(leased, str(e))
+            if status == JobStatus.queued:
+                logger.info(f"Job {job.id} re-queued (attempt {job.attempts}/{job.max_attempts})")
 
-        def _run():
+    def _heartbeat(self) -> None:
+        renew_every = max(1.0, self.queue.visibility_timeout.total_seconds() / 3)
+        last_renew = time.monotonic()
+        last_prune = 0.0
+        while not self._stop.wait(self.cancel_poll):
+            if self.events_retention_s and time.monotonic() - last_prune >= self.prune_interval:
+                last_prune = time.monotonic()
+                try:
+                    n = self.queue.prune_events(older_than_s=self.events_retention_s)
+                    if n:
+                        logger.info(f"Job events pruned: {n}")
+                except Exception:
+                    logger.exception("Job events prune failed")
+            with self._lock:
+                running = list(self._running.values())
+            if not running:
+                last_renew = time.monotonic()
+                continue
             try:
-                res = fn()
-                self.queue.set_done(job_id, res)
-            except Exception as e:
-                logger.exception("Job failed", extra={"job_id": job_id})
-                self.queue.set_error(job_id, str(e))
+                for job_id in self.queue.cancel_requested([leased.job.id for leased in running]):
+                    for leased in running:
+                        if leased.job.id == job_id:
+                            leased.cancel.set()
+            except Exception:
+                logger.exception("Job cancel poll failed")
+            if time.monotonic() - last_renew < renew_every:
+                continue
+            last_renew = time.monotonic()
+            for leased in running:
+                try:
+                    if not self.queue.heartbeat(leased):
+                        logger.warning("Job lease lost", extra={"job_id": leased.job.id})
+                except Exception:
+                    logger.exception("Job heartbeat failed", extra={"job_id": leased.job.id})
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            running = {job_id: leased.job.kind for job_id, leased in self._running.items()}
+        return {
+            "worker_id": self.worker_id,
+            "concurrency": self.concurrency,
+            "kinds": self.kinds,
+            "kind_limits": self.kind_limits,
+            "running": running,
+        }
+
+
+@lru_cache(maxsize=1)
+def get_job_worker() -> JobWorker:
+    """In-process worker of the API (settings.jobs_inprocess_workers slots)."""
+    settings = get_settings()
+    return JobWorker(
+        JobQueue(),
+        concurrency=settings.jobs_inprocess_workers,
+        poll_interval=settings.jobs_poll_interval_s,
+        kind_limits=settings.jobs_kind_limits,
+        cancel_poll=settings.jobs_cancel_poll_s,
+        events_retention_s=settings.jobs_events_retention_h * 3600,
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    from app.core.logging import setup_logging
+    from app.db.session import init_db
+
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Standalone job worker (durable queue in job_results)")
+    parser.add_argument("--concurrency", type=int, default=max(1, settings.jobs_inprocess_workers))
+    parser.add_argument("--kinds", nargs="*", default=None, help=f"job kinds to run (default: all: {sorted(JOB_HANDLERS)})")
+    parser.add_argument("--poll-interval", type=float, default=settings.jobs_poll_interval_s)
+    args = parser.parse_args(argv)
+
+    setup_logging(level="INFO", json_logs=True)
+    init_db()
+
+    worker = JobWorker(
+        JobQueue(),
+        concurrency=args.concurrency,
+        kinds=args.kinds,
+        poll_interval=args.poll_interval,
+        kind_limits=settings.jobs_kind_limits,
+        cancel_poll=settings.jobs_cancel_poll_s,
+        events_retention_s=settings.jobs_events_retention_h * 3600,
+    )
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    worker.start()
+    stop.wait()
+    logger.info("Job worker stopping")
+    worker.stop()
+
 
-        self.pool.submit(_run)
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -10,8 +10,9 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.config import get_settings
 from app.core.logging import setup_logging, request_id_ctx, get_logger
-from app.core.errors import AppError
+from app.core.errors import AppError, RetryableError
 from app.db.session import init_db
+from app.services.uploads import UploadSizeLimitMiddleware
 
 from app.api.routes_health import router as health_router
 from app.api.routes_detect import router as detect_router
@@ -38,18 +39,32 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     # DB init (POC)
     init_db()
 
-    # Optionnel: warmup au startup (charge modèles en RAM)
+    # Optionnel: warmup au startup (charge modèles en RAM, dans le registry partagé)
     try:
-        from app.services.orchestrator import Orchestrator
+        from app.detectors.registry import get_detector_registry
 
-        orc = Orchestrator()
-        status = orc.warmup(settings.preload_detectors)
+        status = get_detector_registry().warmup(settings.preload_detectors)
         logger.info(f"Warmup detectors: {status}")
     except Exception as e:
         logger.exception("Warmup failed")
 
+    # Worker de jobs in-process (0 = jobs exécutés uniquement par des workers externes)
+    job_worker = None
+    if settings.jobs_inprocess_workers > 0:
+        from app.jobs.worker import get_job_worker
+
+        job_worker = get_job_worker()
+        job_worker.start()
+
     yield
 
+    if job_worker is not None:
+        job_worker.stop()
+    # écritures d'état de jobs encore en attente (write-behind)
+    from app.jobs.store import get_job_writer
+
+    get_job_writer().flush()
+
 
 app = FastAPI(
     title=get_settings().app_name,
@@ -67,6 +82,10 @@ app.add_middleware(
 )
 
 
+# Uploads trop gros rejetés (413) pendant la réception, pas après
+app.add_middleware(UploadSizeLimitMiddleware, max_bytes=get_settings().upload_max_mb * 1024 * 1024)
+
+
 # --- Middleware Request-ID (corrélation logs + debug) ---
 @app.middleware("http")
 async def request_id_middleware(request: Request, call_next):
@@ -86,7 +105,9 @@ async def app_error_handler(request: Request, exc: AppError):
     from fastapi.responses import JSONResponse
 
     payload = {"error": {"code": exc.code, "message": exc.message, "details": exc.details}}
-    return JSONResponse(status_code=exc.status_code, content=payload)
+    # 429 / 503 (TooManyRequests, Overloaded): délai conseillé au client
+    headers = {"Retry-After": str(exc.retry_after)} if isinstance(exc, RetryableError) else None
+    return JSONResponse(status_code=exc.status_code, content=payload, headers=headers)
 
 
 # --- Routes ---
@@ -16,6 +16,8 @@ class DcpSpan(BaseModel):
     score: float = Field(ge=0, le=1)
     source: str
     text: Optional[str] = None
+    # Documents paginés (PDF): numéro de page (1-based), start/end relatifs à la page
+    page: Optional[int] = None
     metadata: Dict[str, Any] = Field(default_factory=dict)
 
 
@@ -27,6 +29,10 @@ class DetectTextRequest(BaseModel):
     return_text: bool = True
     merge_overlaps: bool = True
     best_effort: bool = True
+    # None = valeur par défaut des settings (detector_parallel)
+    parallel: Optional[bool] = None
+    # None = settings.ner_cascade_enabled (NER transformers seulement sur les segments à signal)
+    cascade: Optional[bool] = None
 
 
 class DetectTextResponse(BaseModel):
@@ -34,6 +40,28 @@ class DetectTextResponse(BaseModel):
     by_detector: Dict[str, List[DcpSpan]]
     summary: Dict[str, int]
     errors: Dict[str, str] = Field(default_factory=dict)
+    timings_ms: Dict[str, float] = Field(default_factory=dict)
+    # {detectors, segments, segments_skipped, chars, chars_skipped, skipped_ratio}
+    cascade: Dict[str, Any] = Field(default_factory=dict)
+
+
+class DetectBatchRequest(BaseModel):
+    texts: List[str]
+    language: str = "fr"
+    detectors: List[str] = Field(default_factory=lambda: ["regex", "presidio", "spacy", "hf"])
+    min_score: float = 0.4
+    return_text: bool = True
+    merge_overlaps: bool = True
+    best_effort: bool = True
+    parallel: Optional[bool] = None
+    cascade: Optional[bool] = None
+
+
+class DetectBatchResponse(BaseModel):
+    # Un résultat par texte, dans l'ordre de la requête
+    results: List[DetectTextResponse]
+    # Temps par détecteur pour tout le batch
+    timings_ms: Dict[str, float] = Field(default_factory=dict)
 
 
 class BenchTextRequest(BaseModel):
@@ -65,6 +93,20 @@ class DetectStructuredRequest(BaseModel):
     min_score: float = 0.4
 
 
+class ProfileStructuredRequest(BaseModel):
+    # obj: objet JSON imbriqué (colonnes = chemins de clés), ou liste de lignes
+    # plates {colonne: valeur} (colonnes = noms de colonnes)
+    obj: Any
+    language: str = "fr"
+    detectors: List[str] = Field(default_factory=lambda: ["regex", "presidio", "spacy", "hf"])
+    min_score: float = 0.4
+    max_samples: int = Field(default=200, ge=1)
+    step: int = Field(default=16, ge=1)
+    min_rate: float = Field(default=0.05, gt=0, le=1)
+    confidence: float = Field(default=0.95, gt=0, lt=1)
+    seed: int = 0
+
+
 class ScanRequest(BaseModel):
     # Pour l’instant on supporte surtout le filesystem local (POC)
     connector: Literal["filesystem"] = "filesystem"
@@ -74,9 +116,15 @@ class ScanRequest(BaseModel):
     detectors: List[str] = Field(default_factory=lambda: ["regex", "presidio", "spacy", "hf"])
     min_score: float = 0.4
     limit: int = 200  # limite POC
+    # None = settings.scan_parallel (pools extraction / OCR / détection)
+    parallel: Optional[bool] = None
+    # Ne retraite que les fichiers nouveaux / modifiés depuis le dernier scan (index en base)
+    incremental: bool = False
 
 
 class ScanResponse(BaseModel):
     scanned: int
     results: List[Dict[str, Any]]
-    summary: Dict[str, int]
\ No newline at end of file
+    summary: Dict[str, int]
+    # incremental: {new, changed, unchanged, deleted, pii_changed}
+    diff: Optional[Dict[str, Any]] = None
\ No newline at end of file
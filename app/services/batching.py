@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from app.core.config import get_settings
+from app.core.errors import Overloaded
+from app.core.logging import get_logger
+from app.models.schemas import DcpSpan
+
+logger = get_logger(__name__)
+
+BatchFn = Callable[[List[str], str], List[List[DcpSpan]]]
+
+
+@dataclass
+class _Item:
+    text: str
+    language: str
+    enqueued: float = field(default_factory=time.perf_counter)
+    future: "Future[List[DcpSpan]]" = field(default_factory=Future)
+
+
+class MicroBatcher:
+    """Coalesces concurrent calls on one model into batched calls.
+
+    - items are queued (at most `max_queue`, else Overloaded) and a single
+      thread per model drains them: up to `max_batch` items, waiting at
+      most `max_wait_ms` after the oldest one was queued
+    - one call per language in the batch; results go back to each caller
+    - if a batch fails, its items are retried one by one so a bad input
+      only fails its own request
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fn: BatchFn,
+        *,
+        max_batch: int = 16,
+        max_wait_ms: float = 10.0,
+        max_queue: int = 256,
+    ) -> None:
+        self.name = name
+        self.fn = fn
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._queue: "queue.Queue[_Item]" = queue.Queue(maxsize=max(1, max_queue))
+        self._lock = threading.Lock()
+        self._stats = {"batches": 0, "items": 0, "rejected": 0, "max_batch_seen": 0}
+        self._thread = threading.Thread(target=self._loop, name=f"batch-{name}", daemon=True)
+        self._thread.start()
+
+    def submit(self, texts: List[str], language: str) -> List["Future[List[DcpSpan]]"]:
+        items = [_Item(t, language) for t in texts]
+        for i, item in enumerate(items):
+            try:
+                self._queue.put_nowait(item)
+            except queue.Full:
+                for queued in items[:i]:
+                    queued.future.cancel()  # ignorés par la boucle
+                with self._lock:
+                    self._stats["rejected"] += 1
+                raise Overloaded(f"Detector queue full: {self.name}", details={"detector": self.name})
+        return [item.future for item in items]
+
+    def detect(self, texts: List[str], language: str) -> List[List[DcpSpan]]:
+        return [f.result() for f in self.submit(texts, language)]
+
+    def _collect(self) -> List[_Item]:
+        first = self._queue.get()
+        batch = [first]
+        deadline = first.enqueued + self.max_wait
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.perf_counter()
+            try:
+                batch.append(self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return [item for item in batch if item.future.set_running_or_notify_cancel()]
+
+    def _loop(self) -> None:
+        while True:
+            batch = self._collect()
+            if not batch:
+                continue
+            with self._lock:
+                self._stats["batches"] += 1
+                self._stats["items"] += len(batch)
+                self._stats["max_batch_seen"] = max(self._stats["max_batch_seen"], len(batch))
+            by_lang: Dict[str, List[_Item]] = {}
+            for item in batch:
+                by_lang.setdefault(item.language, []).append(item)
+            for language, items in by_lang.items():
+                self._run(items, language)
+
+    def _run(self, items: List[_Item], language: str) -> None:
+        try:
+            results = self.fn([item.text for item in items], language)
+        except Exception as e:
+            if len(items) == 1:
+                items[0].future.set_exception(e)
+                return
+            logger.warning(f"Batch failed on {self.name}, retrying items one by one: {e}")
+            for item in items:
+                try:
+                    item.future.set_result(self.fn([item.text], language)[0])
+                except Exception as err:
+                    item.future.set_exception(err)
+            return
+        for item, spans in zip(items, results):
+            item.future.set_result(spans)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            batches = self._stats["batches"]
+            return {
+                **self._stats,
+                "avg_batch": round(self._stats["items"] / batches, 2) if batches else 0.0,
+                "queued": self._queue.qsize(),
+                "max_batch": self.max_batch,
+                "max_wait_ms": self.max_wait * 1000.0,
+            }
+
+
+_batchers: Dict[str, MicroBatcher] = {}
+_batchers_lock = threading.Lock()
+
+
+def get_micro_batcher(name: str) -> Optional[MicroBatcher]:
+    """Shared batcher of a detector (None if micro-batching is off for it)."""
+    settings = get_settings()
+    if not settings.microbatch_enabled or name not in settings.microbatch_detectors:
+        return None
+    batcher = _batchers.get(name)
+    if batcher is not None:
+        return batcher
+    with _batchers_lock:
+        batcher = _batchers.get(name)
+        if batcher is None:
+            from app.detectors.registry import get_detector_registry
+            from app.services.concurrency import detector_threads, get_cpu_budget
+
+            det = get_detector_registry().get(name)
+
+            def run(texts: List[str], language: str) -> List[List[DcpSpan]]:
+                with get_cpu_budget().reserve(detector_threads(name)):
+                    if len(texts) == 1:
+                        return [det.detect(text=texts[0], language=language)]
+                    return det.detect_batch(texts, language=language)
+
+            batcher = _batchers[name] = MicroBatcher(
+                name,
+                run,
+                max_batch=settings.microbatch_max_items,
+                max_wait_ms=settings.microbatch_max_wait_ms,
+                max_queue=settings.microbatch_max_queue,
+            )
+        return batcher
+
+
+def reset_batchers() -> None:
+    """Forget the batchers (after fork: their drain threads stayed in the parent)."""
+    global _batchers_lock
+    _batchers.clear()
+    _batchers_lock = threading.Lock()
+
+
+def batching_stats() -> Dict[str, Dict[str, Any]]:
+    with _batchers_lock:
+        return {name: b.stats() for name, b in _batchers.items()}
@@ -0,0 +1,345 @@
+from __future__ import annotations
+
+import atexit
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.core.config import get_settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+def text_digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8", errors="surrogatepass")).hexdigest()
+
+
+class DetectionCache:
+    """Content-hash cache of per-detector results.
+
+    Key: (text hash, language, detector fingerprint, min_score). The
+    fingerprint embeds the detector name, version and configuration, so a
+    config change never serves stale results.
+
+    - Tier 1: bounded in-memory LRU.
+    - Tier 2 (optional): SQLite file, survives restarts; hits are promoted
+      to the LRU. put() only queues the row: a writer thread inserts queued
+      rows every `flush_ms` (or `flush_max` rows) in one transaction, so
+      detector threads never wait on disk commits.
+
+    Values are lists of span dicts (DcpSpan.model_dump()), rebuilt by the
+    caller: cached objects are never shared between requests.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_entries: int = 10_000,
+        disk_path: Optional[str] = None,
+        disk_max_entries: int = 200_000,
+        flush_ms: float = 200.0,
+        flush_max: int = 500,
+    ) -> None:
+        self.max_entries = max(1, max_entries)
+        self.disk_max_entries = max(1, disk_max_entries)
+        self.flush_interval = max(0.0, flush_ms) / 1000.0
+        self.flush_max = max(1, flush_max)
+        self._lru: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._fingerprints: Dict[str, str] = {}
+        self._stats = {"hits": 0, "misses": 0, "disk_hits": 0, "puts": 0, "evictions": 0, "disk_batches": 0}
+
+        self._db: Optional[sqlite3.Connection] = None
+        # connexion partagée: tout accès SQLite passe par _db_lock (pris avant _lock, jamais sous _lock)
+        self._db_lock = threading.Lock()
+        self._disk_pending: Dict[str, tuple] = {}
+        self._disk_cond = threading.Condition(self._lock)
+        self._writer: Optional[threading.Thread] = None
+        self._disk_puts = 0
+        if disk_path:
+            Path(disk_path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(disk_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS detection_cache ("
+                " key TEXT PRIMARY KEY, detector TEXT, fingerprint TEXT, payload TEXT, created_at REAL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS ix_detection_cache_detector ON detection_cache(detector)")
+            self._db.commit()
+
+    @staticmethod
+    def make_key(digest: str, *, language: str, fingerprint: str, min_score: float) -> str:
+        return f"{digest}|{language}|{fingerprint}|{min_score:.4f}"
+
+    def register_fingerprint(self, detector: str, fingerprint: str) -> None:
+        """Drop entries of `detector` computed with another configuration."""
+        with self._lock:
+            if self._fingerprints.get(detector) == fingerprint:
+                return
+            self._fingerprints[detector] = fingerprint
+            stale = [k for k in self._lru if f"|{detector}:" in k and f"|{fingerprint}|" not in k]
+            for k in stale:
+                del self._lru[k]
+            for k in [k for k, row in self._disk_pending.items() if row[1] == detector and row[2] != fingerprint]:
+                del self._disk_pending[k]
+        if self._db is not None:
+            with self._db_lock:
+                self._db.execute(
+                    "DELETE FROM detection_cache WHERE detector = ? AND fingerprint != ?", (detector, fingerprint)
+                )
+                self._db.commit()
+
+    def get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        with self._lock:
+            val = self._lru.get(key)
+            if val is not None:
+                self._lru.move_to_end(key)
+                self._stats["hits"] += 1
+                return val
+            pending = self._disk_pending.get(key)
+            if pending is not None:
+                val = json.loads(pending[3])
+                self._stats["hits"] += 1
+                self._lru_put(key, val)
+                return val
+        if self._db is not None:
+            with self._db_lock:
+                row = self._db.execute("SELECT payload FROM detection_cache WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                val = json.loads(row[0])
+                with self._lock:
+                    self._stats["hits"] += 1
+                    self._stats["disk_hits"] += 1
+                    self._lru_put(key, val)
+                return val
+        with self._lock:
+            self._stats["misses"] += 1
+        return None
+
+    def put(self, key: str, spans: List[Dict[str, Any]], *, detector: str, fingerprint: str) -> None:
+        row = None
+        if self._db is not None:
+            row = (key, detector, fingerprint, json.dumps(spans, ensure_ascii=False), time.time())
+        with self._lock:
+            self._stats["puts"] += 1
+            self._lru_put(key, spans)
+            if row is not None:
+                self._ensure_writer()
+                self._disk_pending[key] = row
+                if len(self._disk_pending) == 1 or len(self._disk_pending) >= self.flush_max:
+                    self._disk_cond.notify_all()
+
+    def _ensure_writer(self) -> None:
+        # démarré au premier put (après fork: nouveau cache, nouveau thread)
+        if self._writer is None or not self._writer.is_alive():
+            self._writer = threading.Thread(target=self._write_loop, name="detection-cache-writer", daemon=True)
+            self._writer.start()
+            atexit.register(self.flush)
+
+    def _write_loop(self) -> None:
+        while True:
+            with self._lock:
+                while not self._disk_pending:
+                    self._disk_cond.wait()
+                if len(self._disk_pending) < self.flush_max:
+                    self._disk_cond.wait(self.flush_interval)  # laisse les puts suivants se regrouper
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Detection cache disk flush failed")
+                time.sleep(1.0)
+
+    def flush(self) -> None:
+        """Write queued disk entries now (blocking)."""
+        if self._db is None:
+            return
+        with self._db_lock:
+            with self._lock:
+                rows, self._disk_pending = list(self._disk_pending.values()), {}
+            if not rows:
+                return
+            self._db.executemany(
+                "INSERT OR REPLACE INTO detection_cache(key, detector, fingerprint, payload, created_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._disk_puts += len(rows)
+            # élagage périodique du tier disque (les plus anciennes d'abord)
+            if self._disk_puts >= 1000:
+                self._disk_puts = 0
+                self._db.execute(
+                    "DELETE FROM detection_cache WHERE key IN ("
+                    " SELECT key FROM detection_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                    (self.disk_max_entries,),
+                )
+            self._db.commit()
+        with self._lock:
+            self._stats["disk_batches"] += 1
+
+    def _lru_put(self, key: str, val: List[Dict[str, Any]]) -> None:
+        self._lru[key] = val
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def invalidate(self, detector: Optional[str] = None) -> int:
+        """Drop all entries (or those of one detector). Returns the number of memory entries removed."""
+        with self._lock:
+            if detector is None:
+                n = len(self._lru)
+                self._lru.clear()
+                self._disk_pending.clear()
+            else:
+                keys = [k for k in self._lru if f"|{detector}:" in k]
+                for k in keys:
+                    del self._lru[k]
+                n = len(keys)
+                for k in [k for k, row in self._disk_pending.items() if row[1] == detector]:
+                    del self._disk_pending[k]
+        if self._db is not None:
+            with self._db_lock:
+                if detector is None:
+                    self._db.execute("DELETE FROM detection_cache")
+                else:
+                    self._db.execute("DELETE FROM detection_cache WHERE detector = ?", (detector,))
+                self._db.commit()
+        return n
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            out: Dict[str, Any] = {
+                **self._stats,
+                "hit_rate": round(self._stats["hits"] / lookups, 4) if lookups else 0.0,
+                "entries": len(self._lru),
+                "max_entries": self.max_entries,
+                "disk": self._db is not None,
+            }
+            if self._db is not None:
+                out["disk_pending"] = len(self._disk_pending)
+        if self._db is not None:
+            with self._db_lock:
+                out["disk_entries"] = self._db.execute("SELECT COUNT(*) FROM detection_cache").fetchone()[0]
+        return out
+
+
+@lru_cache(maxsize=1)
+def get_detection_cache() -> Optional[DetectionCache]:
+    """Shared cache (None si désactivé dans les settings)."""
+    settings = get_settings()
+    if not settings.detection_cache_enabled:
+        return None
+    disk_path = None
+    if settings.detection_cache_disk:
+        disk_path = str(Path(settings.storage_dir) / "detection_cache.sqlite")
+    return DetectionCache(
+        max_entries=settings.detection_cache_max_entries,
+        disk_path=disk_path,
+        disk_max_entries=settings.detection_cache_disk_max_entries,
+        flush_ms=settings.detection_cache_disk_flush_ms,
+        flush_max=settings.detection_cache_disk_flush_max,
+    )
+
+
+class OcrCache:
+    """Persistent OCR result cache (SQLite under storage_dir).
+
+    Key: (image content hash, OCR language, backend + version, OCR
+    parameters). Payloads are OcrResult dicts; the file is bounded to
+    `max_bytes` of payload, least recently used entries evicted first.
+    """
+
+    def __init__(self, path: str, *, max_bytes: int = 256 << 20) -> None:
+        self.max_bytes = max(1, max_bytes)
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "puts": 0, "evictions": 0}
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS ocr_cache ("
+            " key TEXT PRIMARY KEY, payload TEXT, size INTEGER, accessed_at REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS ix_ocr_cache_accessed ON ocr_cache(accessed_at)")
+        self._db.commit()
+        self._size = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM ocr_cache").fetchone()[0]
+
+    @staticmethod
+    def make_key(digest: str, *, lang: str, backend: str, params: str) -> str:
+        return f"{digest}|{lang}|{backend}|{params}"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute("SELECT payload FROM ocr_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["hits"] += 1
+            self._db.execute("UPDATE ocr_cache SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+            return json.loads(row[0])
+
+    def put(self, key: str, result: Dict[str, Any]) -> None:
+        payload = json.dumps(result, ensure_ascii=False)
+        size = len(payload.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._stats["puts"] += 1
+            old = self._db.execute("SELECT size FROM ocr_cache WHERE key = ?", (key,)).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO ocr_cache(key, payload, size, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, payload, size, time.time()),
+            )
+            self._size += size - (old[0] if old else 0)
+            if self._size > self.max_bytes:
+                self._evict()
+            self._db.commit()
+
+    def _evict(self) -> None:
+        # les moins récemment lues d'abord, jusqu'à 90% du budget
+        target = int(self.max_bytes * 0.9)
+        for key, size in self._db.execute("SELECT key, size FROM ocr_cache ORDER BY accessed_at").fetchall():
+            if self._size <= target:
+                break
+            self._db.execute("DELETE FROM ocr_cache WHERE key = ?", (key,))
+            self._size -= size
+            self._stats["evictions"] += 1
+
+    def clear(self) -> int:
+        with self._lock:
+            n = self._db.execute("DELETE FROM ocr_cache").rowcount
+            self._db.commit()
+            self._size = 0
+            return n
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_rate": round(self._stats["hits"] / lookups, 4) if lookups else 0.0,
+                "entries": self._db.execute("SELECT COUNT(*) FROM ocr_cache").fetchone()[0],
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+            }
+
+
+@lru_cache(maxsize=1)
+def get_ocr_cache() -> Optional[OcrCache]:
+    """Shared OCR cache (None si désactivé dans les settings)."""
+    settings = get_settings()
+    if not settings.ocr_cache_enabled:
+        return None
+    return OcrCache(
+        str(Path(settings.storage_dir) / "ocr_cache.sqlite"),
+        max_bytes=settings.ocr_cache_max_mb << 20,
+    )
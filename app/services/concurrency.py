@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+import os
+import sys
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, Literal, TypeVar
+
+from app.core.config import get_settings
+from app.core.errors import TooManyRequests
+
+T = TypeVar("T")
+
+# light: regex seul / extract: extraction de fichiers, OCR, scans / model: le reste
+# jobs: lectures d'état des jobs et flux SSE (jamais derrière une rafale de /detect)
+PoolKind = Literal["light", "model", "extract", "jobs"]
+
+_END = object()
+
+
+class CpuBudget:
+    """Counting semaphore with weighted acquisitions.
+
+    Each detector declares how many CPU threads it uses (torch / spaCy intra-op
+    threads); running detectors never exceed `capacity` threads in total, so
+    parallel execution does not oversubscribe cores.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = max(1, int(capacity))
+        self._available = self.capacity
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def reserve(self, threads: int) -> Iterator[None]:
+        # A detector heavier than the whole budget still runs, alone.
+        need = min(max(1, int(threads)), self.capacity)
+        with self._cond:
+            while self._available < need:
+                self._cond.wait()
+            self._available -= need
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._available += need
+                self._cond.notify_all()
+
+
+@lru_cache(maxsize=1)
+def get_cpu_budget() -> CpuBudget:
+    settings = get_settings()
+    return CpuBudget(settings.cpu_thread_budget or os.cpu_count() or 1)
+
+
+@lru_cache(maxsize=1)
+def get_detector_executor() -> ThreadPoolExecutor:
+    """Bounded executor used to fan detectors out (1 par process)."""
+    settings = get_settings()
+    return ThreadPoolExecutor(max_workers=max(1, settings.detector_max_workers), thread_name_prefix="detector")
+
+
+def detector_threads(name: str) -> int:
+    """CPU thread budget declared for a detector (default: 1)."""
+    return int(get_settings().detector_thread_budgets.get(name, 1))
+
+
+def apply_torch_threads() -> None:
+    """Size torch's intra-op pool to the declared detector budgets.
+
+    torch defaults to one thread per core for every op; without this each
+    torch detector running under a budget of N would still use all cores.
+    The pool is process-wide: sized to the largest declared budget, capped
+    by the CPU budget. No-op until torch is imported.
+    """
+    torch = sys.modules.get("torch")
+    if torch is None:
+        return
+    threads = max(get_settings().detector_thread_budgets.values(), default=1)
+    torch.set_num_threads(max(1, min(int(threads), get_cpu_budget().capacity)))
+
+
+class WorkPool:
+    """Dedicated executor awaited by async handlers, with admission control.
+
+    At most `max_pending` calls are running or queued; beyond that, admit()
+    raises TooManyRequests (429 + Retry-After) instead of growing the queue.
+    The request context (request id) is propagated to the worker thread.
+    """
+
+    def __init__(self, name: str, *, workers: int, max_pending: int, retry_after: int = 1) -> None:
+        self.name = name
+        self.workers = max(1, workers)
+        self.max_pending = max(self.workers, max_pending)
+        self.retry_after = retry_after
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"pool-{name}")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._rejected = 0
+
+    def admit(self) -> None:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._rejected += 1
+                raise TooManyRequests(
+                    f"{self.name} pool saturated, retry later",
+                    retry_after=self.retry_after,
+                    details={"pool": self.name, "pending": self._pending},
+                )
+            self._pending += 1
+
+    def release(self) -> None:
+        with self._lock:
+            self._pending -= 1
+
+    async def call(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run on the pool without admission (caller already admitted)."""
+        ctx = contextvars.copy_context()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, functools.partial(ctx.run, fn, *args, **kwargs))
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        self.admit()
+        try:
+            return await self.call(fn, *args, **kwargs)
+        finally:
+            self.release()
+
+    def stream(self, items: Iterable[T]) -> AsyncIterator[T]:
+        """Iterate a blocking iterable on the pool (StreamingResponse body).
+
+        Admission is taken by the caller (admit()) before the response starts
+        and released once: when the stream ends, or when the body is dropped
+        without being consumed (client gone before the first chunk).
+        """
+        released = threading.Event()
+
+        def release_once() -> None:
+            if not released.is_set():
+                released.set()
+                self.release()
+
+        body = self._iterate(items, release_once)
+        weakref.finalize(body, release_once)
+        return body
+
+    async def _iterate(self, items: Iterable[T], done: Callable[[], None]) -> AsyncIterator[T]:
+        try:
+            it = iter(items)
+            while True:
+                item = await self.call(next, it, _END)
+                if item is _END:
+                    return
+                yield item  # type: ignore[misc]
+        finally:
+            done()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "pending": self._pending,
+                "max_pending": self.max_pending,
+                "rejected": self._rejected,
+            }
+
+
+@lru_cache(maxsize=None)
+def get_work_pool(kind: PoolKind) -> WorkPool:
+    settings = get_settings()
+    cfg = {
+        "light": (settings.pool_light_workers, settings.pool_light_max_pending),
+        "model": (settings.pool_model_workers, settings.pool_model_max_pending),
+        "extract": (settings.pool_extract_workers, settings.pool_extract_max_pending),
+        "jobs": (settings.pool_jobs_workers, settings.pool_jobs_max_pending),
+    }
+    workers, max_pending = cfg[kind]
+    return WorkPool(kind, workers=workers, max_pending=max_pending, retry_after=settings.pool_retry_after_s)
+
+
+def detection_pool(detectors: Iterable[str]) -> WorkPool:
+    """Light pool when every requested detector is cheap (regex), model pool otherwise."""
+    light = set(get_settings().light_detectors)
+    return get_work_pool("light" if set(detectors) <= light else "model")
@@ -1,18 +1,83 @@
 from __future__ import annotations
 
+import hashlib
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
 from functools import lru_cache
-from typing import Any
+from typing import Any, List, Optional, Sequence, Tuple, Union
 
 from app.core.logging import get_logger
 from app.core.config import get_settings
+from app.services.cache import OcrCache, get_ocr_cache
 
 logger = get_logger(__name__)
 
+# Chemin d'image ou image PIL déjà chargée (ex: page PDF rendue)
+ImageInput = Union[str, Any]
 
-@lru_cache(maxsize=1)
-def _get_paddleocr(lang: str = "fr"):
-    """Load PaddleOCR once per process (CPU)."""
+_EXIF_ORIENTATION = 0x0112
+_EXIF_MAKE = 0x010F
+
+
+@dataclass
+class OcrLine:
+    text: str
+    confidence: float
+    # Quadrilatère [[x, y] x4] dans les coordonnées de l'image d'origine
+    box: List[List[float]] = field(default_factory=list)
+
+
+@dataclass
+class OcrResult:
+    text: str
+    lines: List[OcrLine] = field(default_factory=list)
+    width: int = 0
+    height: int = 0
+    scale: float = 1.0  # facteur de réduction appliqué avant l'OCR
+    angle_cls: bool = True
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "OcrResult":
+        return cls(**{**d, "lines": [OcrLine(**line) for line in d.get("lines", [])]})
+
+
+def image_digest(image: ImageInput, *, chunk_size: int = 1 << 20) -> str:
+    """Content hash of an image file, or of the pixels of an already loaded PIL image."""
+    h = hashlib.sha256()
+    if isinstance(image, str):
+        with open(image, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                h.update(chunk)
+    else:
+        h.update(f"{image.mode}|{image.size[0]}x{image.size[1]}|".encode())
+        h.update(image.tobytes())
+    return h.hexdigest()
+
+
+def _pil_image():
+    try:
+        from PIL import Image
+    except Exception as e:
+        raise RuntimeError("Pillow not installed. Install with: pip install pillow") from e
+    return Image
+
+
+def _backend_version() -> str:
+    try:
+        from importlib.metadata import version
+
+        return f"paddleocr-{version('paddleocr')}"
+    except Exception:
+        return "paddleocr-unknown"
+
+
+def _new_paddleocr(lang: str):
+    """Load one PaddleOCR instance (CPU); each OCR worker thread owns one."""
     os.environ.setdefault("DISABLE_MODEL_SOURCE_CHECK", "True")
     try:
         from paddleocr import PaddleOCR
@@ -20,36 +85,188 @@ def _get_paddleocr(lang: str = "fr"):
         logger.error("paddleocr import failed", exc_info=e)
         raise RuntimeError(f"PaddleOCR import failed: {e}")
 
-    # use_angle_cls improves orientation; keep defaults for det/rec.
+    # use_angle_cls charge le classifieur d'orientation; il est désactivable
+    # par appel (predict) pour les images déjà droites.
     return PaddleOCR(use_angle_cls=True, lang=lang)
 
 
-def _paddle_ocr(image_path: str, lang: str) -> str:
-    ocr = _get_paddleocr(lang=lang)
-    # API (paddleocr 3.3.x): cls est géré à l'init, pas en argument.
-    result = ocr.ocr(image_path)
-    texts = []
-    for page in result:
+def _parse_paddle(result: Any) -> List[OcrLine]:
+    """Lines from PaddleOCR output (3.x dict results, or 2.x [box, (text, score)] lists)."""
+    lines: List[OcrLine] = []
+    for page in result or []:
+        if page is None:
+            continue
+        if hasattr(page, "get") and page.get("rec_texts") is not None:
+            polys = page.get("rec_polys")
+            if polys is None:
+                polys = page.get("dt_polys", [])
+            for i, txt in enumerate(page["rec_texts"]):
+                score = page.get("rec_scores", [1.0] * len(page["rec_texts"]))[i]
+                box = [[float(x), float(y)] for x, y in polys[i]] if i < len(polys) else []
+                lines.append(OcrLine(text=str(txt), confidence=float(score), box=box))
+            continue
         for line in page:
             if not line or len(line) < 2:
                 continue
-            txt = line[1][0]
+            txt, score = line[1][0], line[1][1]
             if isinstance(txt, str):
-                texts.append(txt)
-    return "\n".join(texts).strip()
+                lines.append(OcrLine(text=txt, confidence=float(score), box=[[float(x), float(y)] for x, y in line[0]]))
+    return lines
 
 
-def run_ocr(image_path: str) -> str:
-    """OCR helper (PaddleOCR only)."""
+class OcrService:
+    """Batched OCR (PaddleOCR).
+
+    - images are downscaled to `target_dpi` (and at most `max_side` pixels)
+      before recognition; boxes are mapped back to original coordinates
+    - the angle classifier is skipped for upright images: EXIF orientation
+      applied, or no camera EXIF (scans, screenshots, rendered PDF pages)
+    - `workers` threads, each holding its own model instance
+    - optional persistent cache keyed by image content hash, language,
+      backend version and the parameters above: known images skip OCR
+    """
+
+    def __init__(
+        self,
+        *,
+        workers: int = 1,
+        lang: str = "fr",
+        target_dpi: int = 200,
+        max_side: int = 2480,
+        skip_angle_cls: bool = True,
+        cache: Optional[OcrCache] = None,
+    ) -> None:
+        self.workers = max(1, workers)
+        self.lang = lang
+        self.target_dpi = target_dpi
+        self.max_side = max_side
+        self.skip_angle_cls = skip_angle_cls
+        self.cache = cache
+        self._backend = _backend_version()
+        self._local = threading.local()
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ocr")
+
+    def _model(self):
+        model = getattr(self._local, "model", None)
+        if model is None:
+            model = self._local.model = _new_paddleocr(self.lang)
+        return model
+
+    def prepare(self, image: ImageInput, *, upright: Optional[bool] = None) -> Tuple[Any, float, bool, Tuple[int, int]]:
+        """Load, orient and downscale. Returns (image, scale, upright, original size)."""
+        if isinstance(image, str):
+            # fichier fermé dès la conversion (convert() renvoie une image chargée, détachée du fichier)
+            with _pil_image().open(image) as img:
+                return self._prepare(img, upright)
+        return self._prepare(image, upright)
+
+    def _prepare(self, img: Any, upright: Optional[bool]) -> Tuple[Any, float, bool, Tuple[int, int]]:
+        # img est déjà une image PIL: Pillow est installé
+        from PIL import Image, ImageOps
+
+        exif = img.getexif()
+        orientation = exif.get(_EXIF_ORIENTATION)
+        if orientation and orientation != 1:
+            img = ImageOps.exif_transpose(img)
+            upright = True if upright is None else upright
+        elif upright is None:
+            # pas d'appareil photo dans l'EXIF => scan / capture, supposé droit
+            upright = orientation == 1 or not exif.get(_EXIF_MAKE)
+
+        size = img.size
+        scale = 1.0
+        dpi = (img.info.get("dpi") or (0, 0))[0]
+        if dpi and dpi > self.target_dpi:
+            scale = self.target_dpi / float(dpi)
+        longest = max(size) * scale
+        if self.max_side and longest > self.max_side:
+            scale *= self.max_side / longest
+        if scale < 1.0:
+            img = img.resize((max(1, round(size[0] * scale)), max(1, round(size[1] * scale))), Image.LANCZOS)
+        return img.convert("RGB"), scale, bool(upright), size
+
+    def _cache_key(self, image: ImageInput, upright: Optional[bool], digest: Optional[str] = None) -> str:
+        params = f"{self.target_dpi}|{self.max_side}|{int(self.skip_angle_cls)}|{upright}"
+        return OcrCache.make_key(digest or image_digest(image), lang=self.lang, backend=self._backend, params=params)
+
+    def _ocr_one(self, image: ImageInput, upright: Optional[bool], digest: Optional[str] = None) -> OcrResult:
+        if self.cache is None:
+            return self._recognize(image, upright)
+        key = self._cache_key(image, upright, digest)
+        hit = self.cache.get(key)
+        if hit is not None:
+            return OcrResult.from_dict(hit)
+        res = self._recognize(image, upright)
+        self.cache.put(key, res.to_dict())
+        return res
+
+    def _recognize(self, image: ImageInput, upright: Optional[bool]) -> OcrResult:
+        import numpy as np
+
+        img, scale, upright, (w, h) = self.prepare(image, upright=upright)
+        use_cls = not (self.skip_angle_cls and upright)
+        model = self._model()
+        arr = np.asarray(img)[:, :, ::-1]  # RGB -> BGR (convention OpenCV de Paddle)
+        if hasattr(model, "predict"):
+            result = model.predict(arr, use_textline_orientation=use_cls)
+        else:
+            result = model.ocr(arr, cls=use_cls)
+        lines = _parse_paddle(result)
+        if scale != 1.0:
+            for line in lines:
+                line.box = [[x / scale, y / scale] for x, y in line.box]
+        return OcrResult(
+            text="\n".join(line.text for line in lines).strip(),
+            lines=lines,
+            width=w,
+            height=h,
+            scale=scale,
+            angle_cls=use_cls,
+        )
+
+    def ocr(self, image: ImageInput, *, upright: Optional[bool] = None, digest: Optional[str] = None) -> OcrResult:
+        return self.ocr_batch([image], upright=upright, digests=[digest])[0]
+
+    def ocr_batch(
+        self,
+        images: Sequence[ImageInput],
+        *,
+        upright: Optional[bool] = None,
+        digests: Optional[Sequence[Optional[str]]] = None,
+    ) -> List[OcrResult]:
+        """OCR several images across the workers; results in input order.
+
+        `digests`: sha256 of each image when already known (uploads hashed
+        while streamed to disk), so the cache key does not re-read the file.
+        """
+        digests = list(digests) if digests is not None else [None] * len(images)
+        futures = [self._pool.submit(self._ocr_one, img, upright, d) for img, d in zip(images, digests)]
+        try:
+            return [f.result() for f in futures]
+        except Exception as e:
+            for f in futures:
+                f.cancel()
+            logger.exception("PaddleOCR failed", exc_info=e)
+            raise RuntimeError(f"PaddleOCR failed: {e}") from e
+
+
+@lru_cache(maxsize=1)
+def get_ocr_service() -> OcrService:
+    """Shared OCR service (models loaded lazily, one per worker thread)."""
     settings = get_settings()
     backend = os.getenv("OCR_BACKEND", settings.ocr_backend).lower()
-    lang = os.getenv("OCR_LANG", "fr")
-
     if backend not in {"auto", "paddleocr"}:
         raise RuntimeError(f"OCR_BACKEND must be 'paddleocr' or 'auto', got {backend}")
+    return OcrService(
+        workers=settings.ocr_workers,
+        lang=os.getenv("OCR_LANG", "fr"),
+        target_dpi=settings.ocr_target_dpi,
+        max_side=settings.ocr_max_side,
+        skip_angle_cls=settings.ocr_skip_angle_cls,
+        cache=get_ocr_cache(),
+    )
 
-    try:
-        return _paddle_ocr(image_path, lang=lang)
-    except Exception as e:
-        logger.exception("PaddleOCR failed", exc_info=e)
-        raise RuntimeError(f"PaddleOCR failed: {e}") from e
+
+def run_ocr(image_path: str) -> str:
+    """OCR helper (PaddleOCR only): text of one image."""
+    return get_ocr_service().ocr(image_path).text
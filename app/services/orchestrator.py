@@ -1,94 +1,241 @@
 from __future__ import annotations
 
 import time
+from dataclasses import dataclass, field
 from typing import Any, Dict, List, Tuple
 
+from app.core.config import get_settings
 from app.models.schemas import DcpSpan
+from app.services.batching import get_micro_batcher
+from app.services.cache import get_detection_cache, text_digest
+from app.services.concurrency import detector_threads, get_cpu_budget, get_detector_executor
+from app.services.prefilter import Segment, get_ner_gate
 from app.services.scoring import finalize_spans, summarize
 
-from app.detectors.regex_detector import RegexDetector
-from app.detectors.presidio_detector import PresidioDetector
-from app.detectors.spacy_detector import SpacyDetector
-from app.detectors.hf_ner_detector import HFNerDetector
-from app.detectors.piiranha import PiiranhaDetector
-from app.detectors.gliner_small import GLiNERSmallDetector
+from app.detectors.registry import DetectorRegistry, get_detector_registry
+
+
+@dataclass
+class DetectionResult:
+    """Full detection output (the 4-tuple API + per-detector wall time)."""
+    spans: List[DcpSpan]
+    by_detector: Dict[str, List[DcpSpan]]
+    summary: Dict[str, int]
+    errors: Dict[str, str] = field(default_factory=dict)
+    timings_ms: Dict[str, float] = field(default_factory=dict)
+    # Cascade NER: segments / caractères épargnés aux détecteurs transformers
+    cascade: Dict[str, Any] = field(default_factory=dict)
+
+    def as_tuple(self) -> Tuple[List[DcpSpan], Dict[str, List[DcpSpan]], Dict[str, int], Dict[str, str]]:
+        return self.spans, self.by_detector, self.summary, self.errors
 
 
 class Orchestrator:
     """
     Runs selected detectors and returns per-detector + merged outputs.
     Designed for benchmarking multiple open-source solutions via the API body.
+
+    Detectors are resolved through the process-wide DetectorRegistry, so
+    creating several Orchestrator instances never loads a model twice.
     """
 
-    def __init__(self) -> None:
-        # Lazy init factories
-        self.registry = {
-            "regex": lambda: RegexDetector(),
-            "presidio": lambda: PresidioDetector(),
-            "spacy": lambda: SpacyDetector(),
-            "hf": lambda: HFNerDetector(),
-            "gliner-small": lambda: GLiNERSmallDetector(),
-            "piiranha": lambda: PiiranhaDetector(),
-            
-        }
-        self._instances: Dict[str, Any] = {}
+    def __init__(self, registry: DetectorRegistry | None = None) -> None:
+        self.registry = registry or get_detector_registry()
 
     def get_detector(self, name: str) -> Any:
-        if name not in self.registry:
-            raise ValueError(f"Detector inconnu: {name}")
-        if name not in self._instances:
-            self._instances[name] = self.registry[name]()
-        return self._instances[name]
+        return self.registry.get(name)
 
     def warmup(self, detectors: List[str] | None = None) -> Dict[str, str]:
         """Best-effort warmup to preload models into RAM."""
-        detectors = detectors or list(self.registry.keys())
-        status: Dict[str, str] = {}
-        for d in detectors:
-            try:
-                self.get_detector(d)
-                status[d] = "ok"
-            except Exception as e:
-                status[d] = f"error: {e}"
-        return status
+        return self.registry.warmup(detectors)
 
-    def detect_text_multi(
+    def _run_one(
         self,
+        det_name: str,
         *,
-        text: str,
+        texts: List[str],
         language: str,
-        detectors: List[str],
         min_score: float,
-        merge_overlaps: bool,
-        return_text: bool,
-        best_effort: bool = True,
-    ) -> Tuple[List[DcpSpan], Dict[str, List[DcpSpan]], Dict[str, int], Dict[str, str]]:
+        digests: List[str] | None = None,
+    ) -> Tuple[List[List[DcpSpan]], float]:
+        """Run a single detector on a batch; returns (filtered spans per text, wall time in ms).
+
+        When the detection cache is enabled, only texts missing from the cache
+        are sent to the detector. Small calls go through the detector's
+        MicroBatcher when micro-batching is on for it.
         """
-        Run detectors; returns (merged_spans, by_detector, summary, errors).
+        start = time.perf_counter()
+        det = self.get_detector(det_name)
+        cache = get_detection_cache() if digests is not None else None
+
+        batch: List[List[DcpSpan] | None] = [None] * len(texts)
+        keys: List[str] = []
+        if cache is not None:
+            fingerprint = det.fingerprint()
+            cache.register_fingerprint(det_name, fingerprint)
+            keys = [
+                cache.make_key(d, language=language, fingerprint=fingerprint, min_score=min_score) for d in digests
+            ]
+            for i, k in enumerate(keys):
+                hit = cache.get(k)
+                if hit is not None:
+                    batch[i] = [DcpSpan(**d) for d in hit]
+
+        todo = [i for i, spans in enumerate(batch) if spans is None]
+        if todo:
+            # petits appels: coalescés avec les requêtes concurrentes sur le même modèle
+            batcher = get_micro_batcher(det_name) if len(todo) < get_settings().microbatch_max_items else None
+            if batcher is not None:
+                found = batcher.detect([texts[i] for i in todo], language)
+            else:
+                with get_cpu_budget().reserve(detector_threads(det_name)):
+                    if len(todo) == 1:
+                        found = [det.detect(text=texts[todo[0]], language=language)]
+                    else:
+                        found = det.detect_batch([texts[i] for i in todo], language=language)
+            for i, spans in zip(todo, found):
+                spans = [s for s in spans if s.score >= min_score]
+                if cache is not None:
+                    cache.put(keys[i], [s.model_dump() for s in spans], detector=det_name, fingerprint=fingerprint)
+                batch[i] = spans
+
+        return batch, round((time.perf_counter() - start) * 1000.0, 2)  # type: ignore[return-value]
+
+    def _run_detectors(
+        self,
+        *,
+        texts: List[str],
+        language: str,
+        detectors: List[str],
+        min_score: float,
+        best_effort: bool,
+        parallel: bool | None,
+        cascade: bool | None = None,
+    ) -> Tuple[List[Dict[str, List[DcpSpan]]], Dict[str, str], Dict[str, float], List[Dict[str, Any]]]:
         """
+        Run detectors sequentially or fanned out on the shared executor.
+        Returns (by_detector per text, errors, timings, cascade stats per text);
+        dicts are always keyed in the order of `detectors` (deterministic merge).
 
-        by_detector: Dict[str, List[DcpSpan]] = {}
+        With the cascade on, the transformer detectors (settings.ner_cascade_detectors)
+        only see the segments selected by the NerGate; their spans are shifted
+        back to offsets of the original text.
+        """
+        settings = get_settings()
+        parallel = settings.detector_parallel if parallel is None else parallel
+        cascade = settings.ner_cascade_enabled if cascade is None else cascade
         errors: Dict[str, str] = {}
-        all_spans: List[DcpSpan] = []
+        timings: Dict[str, float] = {}
+        names = list(dict.fromkeys(detectors))
+        by_text: List[Dict[str, List[DcpSpan]]] = [{} for _ in texts]
 
-        for det_name in detectors:
-            try:
-                det = self.get_detector(det_name)
-                spans: List[DcpSpan] = det.detect(text=text, language=language)
+        use_cache = get_detection_cache() is not None
+        digests = [text_digest(t) for t in texts] if use_cache else None
 
-                spans = [s for s in spans if s.score >= min_score]
-                if not return_text:
-                    for s in spans:
-                        s.text = None
+        gated = {n for n in names if n in settings.ner_cascade_detectors} if cascade else set()
+        stats: List[Dict[str, Any]] = [{} for _ in texts]
+        segments: List[Segment] = []
+        if gated:
+            segments, counts = get_ner_gate().plan(texts)
+            seg_texts = [texts[i][s:e] for i, s, e in segments]
+            seg_digests = [text_digest(t) for t in seg_texts] if use_cache else None
+            stats = self._cascade_stats(texts, segments, counts, sorted(gated, key=names.index))
 
-                by_detector[det_name] = spans
-                all_spans.extend(spans)
+        def run(n: str) -> Tuple[List[List[DcpSpan]], float]:
+            if n not in gated:
+                return self._run_one(n, texts=texts, language=language, min_score=min_score, digests=digests)
+            if not segments:
+                return [[] for _ in texts], 0.0  # rien à analyser: le modèle n'est même pas chargé
+            seg_batch, ms = self._run_one(
+                n, texts=seg_texts, language=language, min_score=min_score, digests=seg_digests
+            )
+            return self._unsegment(seg_batch, segments, len(texts)), ms
 
-            except Exception as e:
-                errors[det_name] = str(e)
-                by_detector[det_name] = []
+        outcomes: Dict[str, Any] = {}
+        if parallel and len(names) > 1:
+            pool = get_detector_executor()
+            futures = {n: pool.submit(run, n) for n in names}
+            for n in names:
+                try:
+                    outcomes[n] = (futures[n].result(), None)
+                except Exception as e:
+                    outcomes[n] = (None, e)
+        else:
+            for n in names:
+                try:
+                    outcomes[n] = (run(n), None)
+                except Exception as e:
+                    outcomes[n] = (None, e)
+                    if not best_effort:
+                        break
+
+        for n in names:
+            if n not in outcomes:
+                continue
+            res, err = outcomes[n]
+            if err is not None:
                 if not best_effort:
-                    raise
+                    raise err
+                errors[n] = str(err)
+                for by_detector in by_text:
+                    by_detector[n] = []
+                continue
+            batch, timings[n] = res
+            for by_detector, spans in zip(by_text, batch):
+                by_detector[n] = spans
+
+        return by_text, errors, timings, stats
+
+    @staticmethod
+    def _unsegment(seg_batch: List[List[DcpSpan]], segments: List[Segment], n_texts: int) -> List[List[DcpSpan]]:
+        """Spans found on segments -> spans per original text (offsets shifted)."""
+        out: List[List[DcpSpan]] = [[] for _ in range(n_texts)]
+        for (i, start, _), spans in zip(segments, seg_batch):
+            for sp in spans:
+                sp.start += start
+                sp.end += start
+                out[i].append(sp)
+        return out
+
+    @staticmethod
+    def _cascade_stats(
+        texts: List[str], segments: List[Segment], counts: List[Tuple[int, int]], gated: List[str]
+    ) -> List[Dict[str, Any]]:
+        kept_chars = [0] * len(texts)
+        for i, s, e in segments:
+            kept_chars[i] += e - s
+        out: List[Dict[str, Any]] = []
+        for text, (total, kept), chars in zip(texts, counts, kept_chars):
+            skipped = len(text) - chars
+            out.append(
+                {
+                    "detectors": gated,
+                    "segments": total,
+                    "segments_skipped": total - kept,
+                    "chars": len(text),
+                    "chars_skipped": skipped,
+                    "skipped_ratio": round(skipped / len(text), 4) if text else 0.0,
+                }
+            )
+        return out
+
+    @staticmethod
+    def _finalize(
+        by_detector: Dict[str, List[DcpSpan]],
+        *,
+        min_score: float,
+        merge_overlaps: bool,
+        return_text: bool,
+        errors: Dict[str, str],
+        timings: Dict[str, float],
+        cascade: Dict[str, Any] | None = None,
+    ) -> DetectionResult:
+        all_spans: List[DcpSpan] = []
+        for spans in by_detector.values():
+            if not return_text:
+                for s in spans:
+                    s.text = None
+            all_spans.extend(spans)
 
         merged = finalize_spans(
             all_spans,
@@ -96,7 +243,118 @@ class Orchestrator:
             merge=merge_overlaps,
             merge_persons=True,
         )
-        return merged, by_detector, summarize(merged), errors
+        return DetectionResult(
+            spans=merged,
+            by_detector=by_detector,
+            summary=summarize(merged),
+            errors=dict(errors),
+            timings_ms=dict(timings),
+            cascade=cascade or {},
+        )
+
+    def detect(
+        self,
+        *,
+        text: str,
+        language: str,
+        detectors: List[str],
+        min_score: float,
+        merge_overlaps: bool,
+        return_text: bool,
+        best_effort: bool = True,
+        parallel: bool | None = None,
+        cascade: bool | None = None,
+    ) -> DetectionResult:
+        """Run detectors and return a DetectionResult (incl. per-detector wall time)."""
+        by_text, errors, timings, stats = self._run_detectors(
+            texts=[text],
+            language=language,
+            detectors=detectors,
+            min_score=min_score,
+            best_effort=best_effort,
+            parallel=parallel,
+            cascade=cascade,
+        )
+        return self._finalize(
+            by_text[0],
+            min_score=min_score,
+            merge_overlaps=merge_overlaps,
+            return_text=return_text,
+            errors=errors,
+            timings=timings,
+            cascade=stats[0],
+        )
+
+    def detect_batch(
+        self,
+        *,
+        texts: List[str],
+        language: str,
+        detectors: List[str],
+        min_score: float,
+        merge_overlaps: bool,
+        return_text: bool,
+        best_effort: bool = True,
+        parallel: bool | None = None,
+        cascade: bool | None = None,
+    ) -> Tuple[List[DetectionResult], Dict[str, float]]:
+        """
+        Batch entry point: each detector receives all `texts` in one call
+        (nlp.pipe, HF list input, GLiNER / Presidio batch APIs).
+        Returns (one DetectionResult per text, wall time per detector for the whole batch).
+        """
+        if not texts:
+            return [], {}
+        by_text, errors, timings, stats = self._run_detectors(
+            texts=list(texts),
+            language=language,
+            detectors=detectors,
+            min_score=min_score,
+            best_effort=best_effort,
+            parallel=parallel,
+            cascade=cascade,
+        )
+        results = [
+            self._finalize(
+                by_detector,
+                min_score=min_score,
+                merge_overlaps=merge_overlaps,
+                return_text=return_text,
+                errors=errors,
+                timings={},
+                cascade=text_stats,
+            )
+            for by_detector, text_stats in zip(by_text, stats)
+        ]
+        return results, timings
+
+    def detect_text_multi(
+        self,
+        *,
+        text: str,
+        language: str,
+        detectors: List[str],
+        min_score: float,
+        merge_overlaps: bool,
+        return_text: bool,
+        best_effort: bool = True,
+        parallel: bool | None = None,
+        cascade: bool | None = None,
+    ) -> Tuple[List[DcpSpan], Dict[str, List[DcpSpan]], Dict[str, int], Dict[str, str]]:
+        """
+        Run detectors; returns (merged_spans, by_detector, summary, errors).
+        """
+        return self.detect(
+            text=text,
+            language=language,
+            detectors=detectors,
+            min_score=min_score,
+            merge_overlaps=merge_overlaps,
+            return_text=return_text,
+            best_effort=best_effort,
+            parallel=parallel,
+            cascade=cascade,
+        ).as_tuple()
 
     def bench_text_multi(
         self,
@@ -130,6 +388,7 @@ class Orchestrator:
                 "summary": summarize(spans),
             }
         return report
+
     def detect_text(
         self,
         text: str,
@@ -144,23 +403,20 @@ class Orchestrator:
         API STABLE utilisée par routes_detect + pipelines (text/image/doc).
         Retourne: (spans_merged, by_detector, summary, errors)
         """
-        by_detector: Dict[str, List[DcpSpan]] = {}
-        errors: Dict[str, str] = {}
-
-        for det_name in detectors:
-            try:
-                det = self.get_detector(det_name)
-                spans = det.detect(text=text, language=language, min_score=min_score)
-                # option: vider le texte si return_text=False
-                if not return_text:
-                    for s in spans:
-                        s.text = ""
-                by_detector[det_name] = spans
-            except Exception as e:
-                if not best_effort:
-                    raise
-                errors[det_name] = str(e)
-                by_detector[det_name] = []
+        by_text, errors, _, _ = self._run_detectors(
+            texts=[text],
+            language=language,
+            detectors=detectors,
+            min_score=min_score,
+            best_effort=best_effort,
+            parallel=None,
+        )
+        by_detector = by_text[0]
+        # option: vider le texte si return_text=False
+        if not return_text:
+            for spans in by_detector.values():
+                for s in spans:
+                    s.text = ""
 
         # Merge + summary (si tu as déjà une util, branche-la ici)
         merged = self._merge_spans(sum(by_detector.values(), [])) if merge_overlaps else sum(by_detector.values(), [])
@@ -1,68 +1,84 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Any, Dict, Iterator, List, Tuple
 
+from app.core.config import get_settings
+from app.extractors.dispatcher import ExtractorDispatcher
+from app.extractors.pdf_extractor import iter_pdf_pages
 from app.models.schemas import DcpSpan
 from app.services.orchestrator import Orchestrator
 
 
+def _page_order(s: DcpSpan) -> Tuple[int, int, int]:
+    return (s.page or 0, s.start, s.end)
+
+
 class DocumentPipeline:
     """
     Document pipeline (best-effort): extract text then run text detectors.
 
-    Optional deps:
-    - pdfplumber for PDF
+    Extraction goes through ExtractorDispatcher (app/extractors). Optional deps:
+    - pdfplumber / pdfminer.six for PDF (pypdfium2 to render scanned pages)
     - python-docx for DOCX
     - openpyxl for XLSX
     """
 
     def __init__(self, orchestrator: Orchestrator | None = None) -> None:
         self.orc = orchestrator or Orchestrator()
+        # Moteur d'extraction unique (dispatch suffixe / magic bytes)
+        self.extractor = ExtractorDispatcher()
+        self.pdf = self.extractor.by_name["pdf"]
 
     def extract_text(self, file_path: str) -> str:
-        p = Path(file_path)
-        suffix = p.suffix.lower()
-
-        if suffix in {".txt", ".md", ".log"}:
-            return p.read_text(encoding="utf-8", errors="ignore")
-
-        if suffix == ".pdf":
-            try:
-                import pdfplumber
-            except Exception as e:
-                raise RuntimeError("pdfplumber non installé. Fais: pip install pdfplumber") from e
-
-            parts: List[str] = []
-            with pdfplumber.open(str(p)) as pdf:
-                for page in pdf.pages:
-                    parts.append(page.extract_text() or "")
-            return "\n".join(parts)
-
-        if suffix == ".docx":
-            try:
-                import docx
-            except Exception as e:
-                raise RuntimeError("python-docx non installé. Fais: pip install python-docx") from e
-            d = docx.Document(str(p))
-            return "\n".join([para.text for para in d.paragraphs])
-
-        if suffix == ".xlsx":
-            try:
-                from openpyxl import load_workbook
-            except Exception as e:
-                raise RuntimeError("openpyxl non installé. Fais: pip install openpyxl") from e
-
-            wb = load_workbook(str(p), read_only=True, data_only=True)
-            parts: List[str] = []
-            for ws in wb.worksheets:
-                for row in ws.iter_rows(values_only=True):
-                    vals = [str(v) for v in row if v is not None]
-                    if vals:
-                        parts.append(" ".join(vals))
-            return "\n".join(parts)
-
-        raise RuntimeError(f"Format non supporté: {suffix}")
+        return self.extractor.extract(file_path).text
+
+    def iter_pages(self, file_path: str, *, parallel: bool = True) -> Iterator[Tuple[int, str]]:
+        """PDF page stream (page number, text); parallel = page ranges in the shared process pool.
+
+        The text layer is probed first: raw pdfminer pass when it is enough,
+        pdfplumber layout otherwise, OCR (in this process) for scanned PDFs.
+        """
+        mode = self.pdf.text_mode(file_path)
+        if not parallel or mode == "ocr":
+            return iter_pdf_pages(file_path, mode, ocr_dpi=self.pdf.ocr_dpi)
+        from app.services.scan_engine import get_scan_engine
+
+        return get_scan_engine().iter_pdf_pages(
+            file_path, mode=mode, pages_per_task=get_settings().pdf_pages_per_task
+        )
+
+    def detect_pages(
+        self,
+        *,
+        file_path: str,
+        language: str = "fr",
+        detectors: List[str] | None = None,
+        min_score: float = 0.4,
+        merge_overlaps: bool = True,
+        return_text: bool = False,
+        parallel: bool = True,
+    ) -> Iterator[Dict[str, Any]]:
+        """Detect a PDF page by page, as soon as each page is extracted (completion order).
+
+        Yields {"page", "spans", "by_detector", "summary", "errors"}; span
+        offsets are relative to the page text and `span.page` is set.
+        """
+        for page, text in self.iter_pages(file_path, parallel=parallel):
+            spans, by_det, summary, errors = self.detect_text(
+                text=text,
+                language=language,
+                detectors=detectors,
+                min_score=min_score,
+                merge_overlaps=merge_overlaps,
+                return_text=return_text,
+            )
+            for s in spans:
+                s.page = page
+            for det_spans in by_det.values():
+                for s in det_spans:
+                    s.page = page
+            yield {"page": page, "spans": spans, "by_detector": by_det, "summary": summary, "errors": errors}
 
     def detect_file(
         self,
@@ -74,7 +90,36 @@ class DocumentPipeline:
         merge_overlaps: bool = True,
         return_text: bool = False,
     ) -> Tuple[List[DcpSpan], Dict[str, List[DcpSpan]], Dict[str, int], Dict[str, str]]:
+        if Path(file_path).suffix.lower() == ".pdf":
+            return self._detect_pdf(
+                file_path=file_path,
+                language=language,
+                detectors=detectors,
+                min_score=min_score,
+                merge_overlaps=merge_overlaps,
+                return_text=return_text,
+            )
         text = self.extract_text(file_path)
+        return self.detect_text(
+            text=text,
+            language=language,
+            detectors=detectors,
+            min_score=min_score,
+            merge_overlaps=merge_overlaps,
+            return_text=return_text,
+        )
+
+    def detect_text(
+        self,
+        *,
+        text: str,
+        language: str = "fr",
+        detectors: List[str] | None = None,
+        min_score: float = 0.4,
+        merge_overlaps: bool = True,
+        return_text: bool = False,
+    ) -> Tuple[List[DcpSpan], Dict[str, List[DcpSpan]], Dict[str, int], Dict[str, str]]:
+        """Detection step only (text already extracted, ex: by the scan engine process pool)."""
         detectors = detectors or ["regex", "presidio", "spacy", "hf"]
         return self.orc.detect_text_multi(
             text=text,
@@ -84,4 +129,25 @@ class DocumentPipeline:
             merge_overlaps=merge_overlaps,
             return_text=return_text,
             best_effort=True,
-        )
\ No newline at end of file
+        )
+
+    def _detect_pdf(
+        self, *, file_path: str, **kwargs: Any
+    ) -> Tuple[List[DcpSpan], Dict[str, List[DcpSpan]], Dict[str, int], Dict[str, str]]:
+        """Page-by-page detection gathered in the usual (spans, by_detector, summary, errors) shape."""
+        spans: List[DcpSpan] = []
+        by_det: Dict[str, List[DcpSpan]] = {}
+        summary: Dict[str, int] = {}
+        errors: Dict[str, str] = {}
+        for res in self.detect_pages(file_path=file_path, **kwargs):
+            spans.extend(res["spans"])
+            for name, det_spans in res["by_detector"].items():
+                by_det.setdefault(name, []).extend(det_spans)
+            for label, n in res["summary"].items():
+                summary[label] = summary.get(label, 0) + n
+            for name, msg in res["errors"].items():
+                errors.setdefault(name, f"page {res['page']}: {msg}")
+        spans.sort(key=_page_order)
+        for det_spans in by_det.values():
+            det_spans.sort(key=_page_order)
+        return spans, by_det, summary, errors
@@ -1,21 +1,22 @@
 from __future__ import annotations
 
-from typing import List, Tuple, Dict, Any
+from typing import List, Optional, Tuple, Dict, Any
 
 from app.services.orchestrator import Orchestrator
-from app.services.ocr import run_ocr
-
-# Singleton au module scope (1 seule fois par process)
-_ORCH = Orchestrator()
+from app.services.ocr import OcrResult, get_ocr_service
 
 
 class ImagePipeline:
-    def __init__(self):
-        # rien à faire ici (ou garde juste des options si tu veux)
-        pass
+    def __init__(self, orchestrator: Orchestrator | None = None) -> None:
+        # Les modèles sont partagés via le DetectorRegistry du process
+        self.orc = orchestrator or Orchestrator()
 
     def ocr(self, image_path: str) -> str:
-        return run_ocr(image_path)
+        return self.ocr_result(image_path).text
+
+    def ocr_result(self, image_path: str, *, digest: Optional[str] = None) -> OcrResult:
+        """Text plus line boxes / confidences (`digest`: sha256 of the file if already known)."""
+        return get_ocr_service().ocr(image_path, digest=digest)
 
     def detect_image(
         self,
@@ -28,9 +29,28 @@ class ImagePipeline:
         best_effort: bool = True,
     ):
         text = self.ocr(image_path)
+        return self.detect_ocr_text(
+            text=text,
+            language=language,
+            detectors=detectors,
+            min_score=min_score,
+            merge_overlaps=merge_overlaps,
+            return_text=return_text,
+            best_effort=best_effort,
+        )
 
-        # ⚠️ ici on utilise le singleton _ORCH
-        return _ORCH.detect_text(
+    def detect_ocr_text(
+        self,
+        text: str,
+        language: str,
+        detectors: List[str],
+        min_score: float,
+        merge_overlaps: bool = True,
+        return_text: bool = True,
+        best_effort: bool = True,
+    ):
+        """Detection step only (text already OCR-ed, ex: by the scan engine OCR pool)."""
+        return self.orc.detect_text(
             text=text,
             language=language,
             detectors=detectors,
@@ -1,9 +1,16 @@
 from __future__ import annotations
 
+import math
+import random
+import re
+from statistics import NormalDist
 from typing import Any, Dict, Iterable, List, Tuple
 
 from app.models.schemas import DcpSpan
 from app.services.orchestrator import Orchestrator
+from app.services.scoring import summarize
+
+_INDEX_RE = re.compile(r"\[\d+\]")
 
 
 def _flatten(obj: Any, prefix: str = "") -> Iterable[Tuple[str, str]]:
@@ -24,8 +31,38 @@ def _flatten(obj: Any, prefix: str = "") -> Iterable[Tuple[str, str]]:
             yield (prefix or "value", s)
 
 
+def _wilson(positives: int, n: int, z: float) -> Tuple[float, float]:
+    """Wilson score interval for a binomial proportion."""
+    if n == 0:
+        return 0.0, 1.0
+    p = positives / n
+    denom = 1 + z * z / n
+    center = (p + z * z / (2 * n)) / denom
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+    return max(0.0, center - half), min(1.0, center + half)
+
+
+def _is_rows(obj: Any) -> bool:
+    """List of flat {column: value} rows (table export, DatabaseConnector.fetch)."""
+    return (
+        isinstance(obj, list)
+        and bool(obj)
+        and all(isinstance(r, dict) and not any(isinstance(v, (dict, list)) for v in r.values()) for r in obj)
+    )
+
+
+def _column_key(path: str) -> str:
+    """Key path without list indices: users[3].email -> users[*].email"""
+    return _INDEX_RE.sub("[*]", path)
+
+
 class StructuredPipeline:
-    """Structured-data detection by running text detectors on values."""
+    """Structured-data detection by running text detectors on values.
+
+    Values are processed column by column (key path without list indices):
+    each distinct value of a column is detected once, in a single batch call
+    per detector, and the result is fanned back out to every path holding it.
+    """
 
     def __init__(self, orchestrator: Orchestrator | None = None) -> None:
         self.orc = orchestrator or Orchestrator()
@@ -41,30 +78,183 @@ class StructuredPipeline:
         detectors = detectors or ["regex", "presidio", "spacy", "hf"]
         results: Dict[str, Any] = {"fields": {}, "summary": {}, "errors": {}}
 
-        global_spans: List[DcpSpan] = []
+        # column -> value -> [paths] (l'ordre d'insertion garde l'ordre du document)
+        columns: Dict[str, Dict[str, List[str]]] = {}
+        order: List[Tuple[str, str]] = []
         for path, value in _flatten(obj):
-            spans, by_det, summary, errors = self.orc.detect_text_multi(
-                text=value,
+            columns.setdefault(_column_key(path), {}).setdefault(value, []).append(path)
+            order.append((path, value))
+
+        by_value: Dict[Tuple[str, str], Any] = {}
+        for column, values in columns.items():
+            distinct = list(values.keys())
+            detections, _ = self.orc.detect_batch(
+                texts=distinct,
                 language=language,
                 detectors=detectors,
                 min_score=min_score,
                 merge_overlaps=True,
                 return_text=True,
                 best_effort=True,
+                cascade=False,  # valeurs de cellule: trop courtes pour le signal de la cascade
             )
+            for value, res in zip(distinct, detections):
+                by_value[(column, value)] = res
 
+        global_spans: List[DcpSpan] = []
+        for path, value in order:
+            res = by_value[(_column_key(path), value)]
             results["fields"][path] = {
                 "value": value,
-                "spans": spans,
-                "by_detector": by_det,
-                "summary": summary,
-                "errors": errors,
+                "spans": res.spans,
+                "by_detector": res.by_detector,
+                "summary": res.summary,
+                "errors": res.errors,
             }
-            global_spans.extend(spans)
-            results["errors"].update({f"{path}:{k}": v for k, v in errors.items()})
-
-        out_sum: Dict[str, int] = {}
-        for s in global_spans:
-            out_sum[s.label] = out_sum.get(s.label, 0) + 1
-        results["summary"] = out_sum
-        return results
\ No newline at end of file
+            global_spans.extend(res.spans)
+            results["errors"].update({f"{path}:{k}": v for k, v in res.errors.items()})
+
+        results["summary"] = summarize(global_spans)
+        results["stats"] = {
+            "leaves": len(order),
+            "columns": len(columns),
+            "distinct_values": len(by_value),
+        }
+        return results
+
+    def profile(self, *, obj: Any, **kwargs: Any) -> Dict[str, Any]:
+        """Column-level PII profile: flat rows by column name (profile_rows),
+        any other object by key path (profile_object)."""
+        if _is_rows(obj):
+            return self.profile_rows(rows=obj, **kwargs)
+        return self.profile_object(obj=obj, **kwargs)
+
+    def profile_object(self, *, obj: Any, **kwargs: Any) -> Dict[str, Any]:
+        """Column-level PII profile of a nested object (see profile_columns)."""
+        columns: Dict[str, List[str]] = {}
+        for path, value in _flatten(obj):
+            columns.setdefault(_column_key(path), []).append(value)
+        return self.profile_columns(columns=columns, **kwargs)
+
+    def profile_rows(self, *, rows: List[Dict[str, Any]], **kwargs: Any) -> Dict[str, Any]:
+        """Column-level PII profile of tabular rows (ex: DatabaseConnector.profile)."""
+        columns: Dict[str, List[str]] = {}
+        for row in rows:
+            for col, v in row.items():
+                if v is None or not str(v).strip():
+                    continue
+                columns.setdefault(str(col), []).append(str(v))
+        return self.profile_columns(columns=columns, **kwargs)
+
+    def profile_columns(
+        self,
+        *,
+        columns: Dict[str, List[str]],
+        language: str = "fr",
+        detectors: List[str] | None = None,
+        min_score: float = 0.4,
+        max_samples: int = 200,
+        step: int = 16,
+        min_rate: float = 0.05,
+        confidence: float = 0.95,
+        seed: int = 0,
+    ) -> Dict[str, Any]:
+        """
+        Sample values per column and stop early once the verdict is stable.
+
+        A column is "pii" when its share of values containing PII is >= min_rate.
+        Sampling goes by rounds of `step` values per active column (all columns
+        of a round share one detect_batch call); a column stops as soon as the
+        Wilson interval of its PII rate is entirely above or below min_rate, so
+        cost scales with the number of columns rather than rows.
+        """
+        detectors = detectors or ["regex", "presidio", "spacy", "hf"]
+        z = NormalDist().inv_cdf((1 + confidence) / 2)
+        rng = random.Random(seed)
+
+        state: Dict[str, Dict[str, Any]] = {}
+        for col, values in columns.items():
+            order = list(range(len(values)))
+            rng.shuffle(order)
+            state[col] = {"order": order, "cursor": 0, "sampled": 0, "positives": 0, "labels": {}, "stopped": None}
+
+        errors: Dict[str, str] = {}
+        active = [c for c in state if state[c]["order"]]
+        while active:
+            round_values: Dict[str, List[str]] = {}
+            for col in active:
+                st = state[col]
+                budget = min(step, max_samples - st["sampled"])
+                idx = st["order"][st["cursor"] : st["cursor"] + budget]
+                st["cursor"] += len(idx)
+                round_values[col] = [columns[col][i] for i in idx]
+
+            distinct = list(dict.fromkeys(v for vals in round_values.values() for v in vals))
+            detections, _ = self.orc.detect_batch(
+                texts=distinct,
+                language=language,
+                detectors=detectors,
+                min_score=min_score,
+                merge_overlaps=True,
+                return_text=False,
+                best_effort=True,
+                cascade=False,
+            )
+            by_value = dict(zip(distinct, detections))
+
+            next_active: List[str] = []
+            for col, vals in round_values.items():
+                st = state[col]
+                for v in vals:
+                    res = by_value[v]
+                    errors.update({f"{col}:{k}": e for k, e in res.errors.items()})
+                    st["sampled"] += 1
+                    if res.spans:
+                        st["positives"] += 1
+                    for label in {sp.label for sp in res.spans}:
+                        st["labels"][label] = st["labels"].get(label, 0) + 1
+
+                lo, hi = _wilson(st["positives"], st["sampled"], z)
+                if lo >= min_rate or hi < min_rate:
+                    st["stopped"] = "stable"
+                elif st["cursor"] >= len(st["order"]):
+                    st["stopped"] = "exhausted"
+                elif st["sampled"] >= max_samples:
+                    st["stopped"] = "max_samples"
+                else:
+                    next_active.append(col)
+            active = next_active
+
+        out: Dict[str, Any] = {}
+        for col, st in state.items():
+            n, pos = st["sampled"], st["positives"]
+            lo, hi = _wilson(pos, n, z)
+            if lo >= min_rate:
+                verdict = "pii"
+            elif hi < min_rate:
+                verdict = "no_pii"
+            elif st["stopped"] == "exhausted" and n:
+                # colonne entièrement lue: le taux observé est exact
+                verdict = "pii" if pos / n >= min_rate else "no_pii"
+            else:
+                verdict = "uncertain"
+            labels = dict(sorted(st["labels"].items(), key=lambda kv: -kv[1]))
+            out[col] = {
+                "total": len(columns[col]),
+                "sampled": n,
+                "positives": pos,
+                "pii_rate": round(pos / n, 4) if n else 0.0,
+                "ci": [round(lo, 4), round(hi, 4)],
+                "verdict": verdict,
+                "stopped": st["stopped"],
+                "labels": {k: round(c / n, 4) for k, c in labels.items()} if n else {},
+                "top_label": next(iter(labels), None),
+            }
+
+        return {
+            "columns": out,
+            "pii_columns": sorted(c for c, r in out.items() if r["verdict"] == "pii"),
+            "confidence": confidence,
+            "min_rate": min_rate,
+            "errors": errors,
+        }
@@ -3,7 +3,7 @@ from __future__ import annotations
 from typing import Any, Dict, List, Tuple
 
 from app.models.schemas import DcpSpan
-from app.services.orchestrator import Orchestrator
+from app.services.orchestrator import DetectionResult, Orchestrator
 
 
 class TextPipeline:
@@ -34,6 +34,59 @@ class TextPipeline:
             best_effort=best_effort,
         )
 
+    def run(
+        self,
+        *,
+        text: str,
+        language: str = "fr",
+        detectors: List[str] | None = None,
+        min_score: float = 0.4,
+        merge_overlaps: bool = True,
+        return_text: bool = True,
+        best_effort: bool = True,
+        parallel: bool | None = None,
+        cascade: bool | None = None,
+    ) -> DetectionResult:
+        """Same as detect() but returns the full DetectionResult (timings included)."""
+        detectors = detectors or ["regex", "presidio", "spacy", "hf"]
+        return self.orc.detect(
+            text=text,
+            language=language,
+            detectors=detectors,
+            min_score=min_score,
+            merge_overlaps=merge_overlaps,
+            return_text=return_text,
+            best_effort=best_effort,
+            parallel=parallel,
+            cascade=cascade,
+        )
+
+    def detect_batch(
+        self,
+        *,
+        texts: List[str],
+        language: str = "fr",
+        detectors: List[str] | None = None,
+        min_score: float = 0.4,
+        merge_overlaps: bool = True,
+        return_text: bool = True,
+        best_effort: bool = True,
+        parallel: bool | None = None,
+        cascade: bool | None = None,
+    ) -> Tuple[List[DetectionResult], Dict[str, float]]:
+        detectors = detectors or ["regex", "presidio", "spacy", "hf"]
+        return self.orc.detect_batch(
+            texts=texts,
+            language=language,
+            detectors=detectors,
+            min_score=min_score,
+            merge_overlaps=merge_overlaps,
+            return_text=return_text,
+            best_effort=best_effort,
+            parallel=parallel,
+            cascade=cascade,
+        )
+
     def bench(
         self,
         *,
@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import FrozenSet, Iterable, List, Optional, Tuple
+
+from app.core.config import get_settings
+from app.detectors.patterns import PatternEngine
+
+# (text index, segment start, segment end) en offsets du texte d'origine
+Segment = Tuple[int, int, int]
+
+_WORD = re.compile(r"[^\W\d_]{2,}")
+# Majuscule suivie de minuscules (les sigles tout en capitales ne comptent pas)
+_CAPITALIZED = re.compile(r"(?<!\w)[A-ZÀ-ÖØ-Þ][a-zß-öø-ÿ]+(?!\w)")
+_SENTENCE_END = ".!?:\n"
+# n° + type de voie, en minuscules comme en capitales ("12 rue des lilas", "3bis, AV. Foch")
+_ADDRESS = re.compile(
+    r"\b\d{1,4}\s?(?:bis|ter)?,?\s+(?:rue|avenue|av\.?|boulevard|bd|chemin|all[ée]e|impasse|place|quai|route|cours)\b",
+    re.IGNORECASE,
+)
+
+# Prénoms fréquents (FR); complétés par settings.ner_gazetteer_path
+DEFAULT_FIRST_NAMES: FrozenSet[str] = frozenset(
+    """
+    jean marie pierre michel philippe alain nicolas christophe patrick daniel bernard eric laurent
+    frederic stephane david julien olivier thomas sebastien francois christian jacques dominique
+    antoine alexandre mathieu maxime vincent romain guillaume hugo lucas louis gabriel arthur paul
+    jules leo raphael nathan enzo theo adam nathalie isabelle sylvie catherine christine sophie
+    sandrine valerie celine stephanie veronique julie aurelie camille emma lea manon chloe ines
+    sarah laura marion pauline claire anne helene lucie alice jade louise mohamed ahmed fatima
+    eva zoe mia lou lina nina anna tom noah liam ali yanis ethan
+    """.split()
+)
+
+
+# minuscules sans accents courants (é -> e...) pour le gazetteer
+_FOLD = str.maketrans("àâäéèêëîïôöùûüç", "aaaeeeeiioouuuc")
+
+
+def _fold(word: str) -> str:
+    return word.lower().translate(_FOLD)
+
+
+class NerGate:
+    """Cheap signal deciding whether the transformer detectors must run.
+
+    A segment is sent to NER when at least one of:
+    - a validated regex candidate (email, IBAN, phone...) is present
+    - a known first name appears (gazetteer, case-insensitive)
+    - a street address cue (number + street type, any case)
+    - capitalized words (not all-caps) reach `cap_density` of the words;
+      outside sentence starts, except in texts of at most `short_chars`
+      (a lone "Dupont", "Durand a appelé hier.")
+    Segments with fewer than `min_letters` letters (numeric rows, ids,
+    timestamps) never are.
+
+    Long texts are split in segments of about `segment_chars` (cut on line
+    breaks, else spaces); adjacent selected segments are merged back so the
+    models keep their context.
+    """
+
+    def __init__(
+        self,
+        *,
+        patterns: Optional[PatternEngine] = None,
+        first_names: Iterable[str] = DEFAULT_FIRST_NAMES,
+        min_letters: int = 2,
+        cap_density: float = 0.05,
+        segment_chars: int = 1000,
+        short_chars: int = 200,
+    ) -> None:
+        self.patterns = patterns or PatternEngine()
+        self.first_names = frozenset(_fold(n) for n in first_names)
+        self.min_letters = min_letters
+        self.cap_density = cap_density
+        self.segment_chars = max(100, segment_chars)
+        self.short_chars = short_chars
+
+    def has_signal(self, text: str) -> bool:
+        words = _WORD.findall(text)
+        if sum(map(len, words)) < self.min_letters:
+            return False
+        if self.patterns.has_match(text):
+            return True
+        if not self.first_names.isdisjoint(_WORD.findall(_fold(text))):
+            return True
+        if _ADDRESS.search(text):
+            return True
+        # texte court (valeur, titre, phrase isolée): pas de contexte pour distinguer
+        # un nom en tête de phrase d'un mot ordinaire, on le compte
+        short = len(text) <= self.short_chars
+        caps = sum(1 for m in _CAPITALIZED.finditer(text) if short or not _sentence_start(text, m.start()))
+        return caps > 0 and caps >= self.cap_density * len(words)
+
+    def split(self, text: str) -> List[Tuple[int, int]]:
+        """(start, end) segments of at most ~segment_chars, cut on line breaks then spaces."""
+        n = len(text)
+        out: List[Tuple[int, int]] = []
+        pos = 0
+        while pos < n:
+            end = min(n, pos + self.segment_chars)
+            if end < n:
+                lo = pos + self.segment_chars // 2
+                cut = text.rfind("\n", lo, end)
+                if cut <= pos:
+                    cut = text.rfind(" ", lo, end)
+                if cut > pos:
+                    end = cut + 1
+            out.append((pos, end))
+            pos = end
+        return out
+
+    def plan(self, texts: List[str]) -> Tuple[List[Segment], List[Tuple[int, int]]]:
+        """Segments needing NER, and per text (segments total, segments kept)."""
+        keep: List[Segment] = []
+        counts: List[Tuple[int, int]] = []
+        for i, text in enumerate(texts):
+            segments = self.split(text)
+            kept = 0
+            for s, e in segments:
+                if not self.has_signal(text[s:e]):
+                    continue
+                kept += 1
+                if keep and keep[-1][0] == i and keep[-1][2] == s:
+                    keep[-1] = (i, keep[-1][1], e)  # segments contigus fusionnés
+                else:
+                    keep.append((i, s, e))
+            counts.append((len(segments), kept))
+        return keep, counts
+
+
+def _sentence_start(text: str, i: int) -> bool:
+    j = i - 1
+    while j >= 0 and text[j] in " \t\"'«(":
+        j -= 1
+    return j < 0 or text[j] in _SENTENCE_END
+
+
+@lru_cache(maxsize=1)
+def get_ner_gate() -> NerGate:
+    settings = get_settings()
+    names = set(DEFAULT_FIRST_NAMES)
+    if settings.ner_gazetteer_path:
+        lines = Path(settings.ner_gazetteer_path).read_text(encoding="utf-8").splitlines()
+        names.update(line.strip() for line in lines if line.strip() and not line.startswith("#"))
+    return NerGate(
+        patterns=PatternEngine.from_names(settings.regex_patterns),
+        first_names=names,
+        min_letters=settings.ner_cascade_min_letters,
+        cap_density=settings.ner_cascade_cap_density,
+        segment_chars=settings.ner_cascade_segment_chars,
+        short_chars=settings.ner_cascade_short_chars,
+    )
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import gc
+import os
+from typing import Dict, List, Optional
+
+from app.core.config import get_settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+def fork_safe_detectors(detectors: List[str]) -> List[str]:
+    """Detectors that can be loaded before fork.
+
+    Models loaded in the master are shared copy-on-write by the workers
+    (torch / spaCy weights are plain memory). ONNX Runtime sessions own
+    native thread pools that do not survive fork: they are loaded by each
+    worker (lifespan warmup) instead.
+    """
+    backends = get_settings().detector_backends
+    return [d for d in detectors if backends.get(d, "torch") == "torch"]
+
+
+def preload_models(detectors: Optional[List[str]] = None) -> Dict[str, str]:
+    """Load detectors in the master process (gunicorn preload_app), before fork.
+
+    Only loads weights: no inference runs here, so no torch / OpenMP thread
+    pool is started before the workers are forked. The loaded objects are
+    then moved out of the GC generations (gc.freeze) so that collections in
+    the workers do not touch their pages and break copy-on-write sharing.
+    """
+    from app.detectors.registry import get_detector_registry
+
+    settings = get_settings()
+    wanted = detectors if detectors is not None else (settings.prefork_preload_detectors or settings.preload_detectors)
+    names = fork_safe_detectors(wanted)
+    skipped = sorted(set(wanted) - set(names))
+    if skipped:
+        logger.info(f"Prefork: not fork-safe, loaded per worker: {skipped}")
+
+    status = get_detector_registry().warmup(names) if names else {}
+    gc.collect()
+    gc.freeze()
+    logger.info(f"Prefork preload: {status} (frozen objects: {gc.get_freeze_count()})")
+    return status
+
+
+def worker_share(size: int, workers: int) -> int:
+    """Share of one worker in a host-wide pool size (at least 1)."""
+    return max(1, int(size) // max(1, workers))
+
+
+# Tailles de pools exprimées pour l'hôte entier, divisées entre workers
+# (sinon N workers => N x cpu_count process d'extraction, N x modèles OCR...)
+SCALED_POOL_SETTINGS = (
+    "scan_ocr_workers",
+    "scan_detect_workers",
+    "scan_pdf_streams",
+    "ocr_workers",
+    "jobs_inprocess_workers",
+)
+
+
+def after_fork(workers: int) -> None:
+    """Reset per-process state in a freshly forked worker.
+
+    - DB pool: connections inherited from the master are dropped without
+      being closed (they still belong to the master)
+    - executors, pools, batcher threads and SQLite caches are rebuilt lazily
+      in the worker (threads do not survive fork)
+    - the CPU thread budget, the scan / OCR pools and the in-process job
+      slots are split between workers instead of each one assuming the
+      whole host
+    """
+    from app.db.session import engine
+    from app.jobs.store import get_job_writer
+    from app.services import batching
+    from app.services.cache import get_detection_cache, get_ocr_cache
+    from app.services.concurrency import apply_torch_threads, get_cpu_budget, get_detector_executor, get_work_pool
+    from app.services.ocr import get_ocr_service
+    from app.services.scan_engine import get_scan_engine
+
+    engine.dispose(close=False)
+
+    for accessor in (
+        get_cpu_budget,
+        get_detector_executor,
+        get_work_pool,
+        get_detection_cache,
+        get_ocr_cache,
+        get_ocr_service,
+        get_scan_engine,
+        get_job_writer,
+    ):
+        accessor.cache_clear()
+    batching.reset_batchers()
+
+    settings = get_settings()
+    # budget et pools valent pour l'hôte (0 = nombre de coeurs): chaque worker en a sa part
+    settings.cpu_thread_budget = worker_share(settings.cpu_thread_budget or os.cpu_count() or 1, workers)
+    settings.scan_extract_workers = worker_share(settings.scan_extract_workers or os.cpu_count() or 1, workers)
+    for name in SCALED_POOL_SETTINGS:
+        size = getattr(settings, name)
+        if size > 0:  # 0 = désactivé (jobs_inprocess_workers)
+            setattr(settings, name, worker_share(size, workers))
+
+    # torch déjà importé par le preload: pool intra-op recréé à la taille du budget
+    apply_torch_threads()
+
+    logger.info(
+        f"Worker {os.getpid()} forked: cpu_thread_budget={settings.cpu_thread_budget}, "
+        f"scan_extract_workers={settings.scan_extract_workers}, ocr_workers={settings.ocr_workers}"
+    )
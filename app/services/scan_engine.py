@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+import multiprocessing
+import os
+import queue
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, Optional, Set, Tuple
+
+from app.connectors.base import Resource
+from app.core.config import get_settings
+from app.extractors.pdf_extractor import PdfTextMode, extract_pdf_pages, pdf_page_count
+
+# Résultat d'un fichier (même format que ScanService._scan_one)
+FileResult = Dict[str, Any]
+
+_dispatcher = None
+
+
+def _extract_document(path: str) -> str:
+    """Runs in an extraction worker process (pdfplumber / openpyxl / python-docx)."""
+    global _dispatcher
+    if _dispatcher is None:
+        from app.extractors.dispatcher import ExtractorDispatcher
+
+        _dispatcher = ExtractorDispatcher()
+    return _dispatcher.extract(path).text
+
+
+class ScanEngine:
+    """Staged, parallel scan executor.
+
+    Stages and their pools:
+      - extraction: process pool (CPU-bound pdf/xlsx/docx parsing, no GIL)
+      - OCR: dedicated thread pool (PaddleOCR)
+      - detection: thread pool sharing the process-wide detector registry
+      - PDF: page ranges extracted in the process pool and detected page by
+        page as they arrive (one coordinating thread per PDF in flight)
+
+    Each file kind has a bounded number of files in flight; files of a
+    saturated kind wait in a bounded backlog while other kinds keep flowing,
+    so a slow OCR file never blocks text files behind it. Results are
+    yielded as soon as they are ready (completion order).
+    """
+
+    def __init__(
+        self,
+        *,
+        extract_workers: int,
+        ocr_workers: int,
+        detect_workers: int,
+        max_in_flight: int,
+        pdf_streams: int = 2,
+    ) -> None:
+        self.extract_workers = max(1, extract_workers)
+        self.ocr_workers = max(1, ocr_workers)
+        self.detect_workers = max(1, detect_workers)
+        self.max_in_flight = max(1, max_in_flight)
+        self.pdf_streams = max(1, pdf_streams)
+
+        self._extract_pool = self._new_extract_pool()
+        self._extract_lock = threading.Lock()
+        self._ocr_pool = ThreadPoolExecutor(max_workers=self.ocr_workers, thread_name_prefix="scan-ocr")
+        self._detect_pool = ThreadPoolExecutor(max_workers=self.detect_workers, thread_name_prefix="scan-detect")
+        self._pdf_pool = ThreadPoolExecutor(max_workers=self.pdf_streams, thread_name_prefix="scan-pdf")
+
+        # Fichiers en vol max par type (2x les workers du premier stage)
+        self.limits = {
+            "document": 2 * self.extract_workers,
+            "pdf": self.pdf_streams,
+            "image": 2 * self.ocr_workers,
+            "text": 2 * self.detect_workers,
+        }
+
+    def _new_extract_pool(self) -> ProcessPoolExecutor:
+        # spawn: les workers n'héritent pas des modèles / threads du parent
+        return ProcessPoolExecutor(max_workers=self.extract_workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def _submit_process(self, fn: Callable[..., Any], *args: Any) -> Future:
+        pool = self._extract_pool
+        try:
+            return pool.submit(fn, *args)
+        except BrokenProcessPool:
+            # un worker a crashé (PDF pathologique, OOM...): on recrée le pool,
+            # une seule fois même si plusieurs threads le voient cassé
+            with self._extract_lock:
+                if self._extract_pool is pool:
+                    self._extract_pool = self._new_extract_pool()
+                    pool.shutdown(wait=False, cancel_futures=True)
+                pool = self._extract_pool
+            return pool.submit(fn, *args)
+
+    def iter_pdf_pages(
+        self, path: str, *, mode: PdfTextMode = "layout", pages_per_task: int = 8
+    ) -> Iterator[Tuple[int, str]]:
+        """Yield (1-based page number, text) as page ranges complete in the process pool.
+
+        At most 2x extract_workers ranges are in flight, so peak memory does
+        not depend on the number of pages. Pages come in completion order.
+        """
+        pages_per_task = max(1, pages_per_task)
+        n = self._submit_process(pdf_page_count, path).result()
+        ranges = deque((s, min(s + pages_per_task, n)) for s in range(0, n, pages_per_task))
+        pending: Set[Future] = set()
+        try:
+            while ranges or pending:
+                while ranges and len(pending) < 2 * self.extract_workers:
+                    start, end = ranges.popleft()
+                    pending.add(self._submit_process(extract_pdf_pages, path, start, end, mode))
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for f in done:
+                    start, texts = f.result()
+                    for i, text in enumerate(texts):
+                        yield start + i + 1, text
+        finally:
+            # consommateur arrêté (ou erreur): on n'extrait pas le reste du fichier
+            for f in pending:
+                f.cancel()
+
+    def run(
+        self,
+        resources: Iterable[Resource],
+        *,
+        read_text: Callable[[Resource], str],
+        ocr: Callable[[Resource], str],
+        detect: Callable[[Resource, str], FileResult],
+        failed: Callable[[Resource, str, Exception], FileResult],
+        detect_pdf: Optional[Callable[[Resource], FileResult]] = None,
+    ) -> Iterator[FileResult]:
+        """Process resources through the stages; yields one result per file.
+
+        `detect_pdf(r)` (optional) handles a whole PDF page by page, typically
+        on top of iter_pdf_pages; without it PDFs go through `extraction`.
+        """
+        out: "queue.Queue[FileResult]" = queue.Queue()
+        active: Dict[str, int] = {k: 0 for k in self.limits}
+        waiting: Dict[str, Deque[Resource]] = {k: deque() for k in self.limits}
+        it = iter(resources)
+        exhausted = False
+
+        def stage_of(r: Resource) -> str:
+            if detect_pdf is not None and r.kind == "document" and r.uri.lower().endswith(".pdf"):
+                return "pdf"
+            return r.kind if r.kind in ("document", "image") else "text"
+
+        def error_result(r: Resource, key: str, e: Exception) -> FileResult:
+            try:
+                return failed(r, key, e)
+            except Exception:
+                return {"uri": r.uri, "kind": r.kind, "summary": {}, "errors": {key: str(e)}, "count": 0}
+
+        def guarded(r: Resource, stage: str, err_key: str, callback: Callable[[Future], None]) -> Callable[[Future], None]:
+            # chaque fichier soumis produit exactement un résultat sur `out`, même
+            # si le callback échoue (failed() qui lève, pool arrêté...): sinon
+            # active[stage] n'est jamais décrémenté et out.get() bloque
+            def run(f: Future) -> None:
+                try:
+                    callback(f)
+                except Exception as e:
+                    out.put({**error_result(r, err_key, e), "_stage": stage})
+
+            return run
+
+        def submit(r: Resource) -> None:
+            stage = stage_of(r)
+            active[stage] += 1
+
+            def on_detected(f: Future) -> None:
+                try:
+                    res = f.result()
+                except Exception as e:
+                    res = error_result(r, "scan", e)
+                out.put({**res, "_stage": stage})
+
+            try:
+                if stage == "pdf":
+                    self._pdf_pool.submit(detect_pdf, r).add_done_callback(guarded(r, stage, "scan", on_detected))
+                    return
+
+                if stage == "document":
+                    first: Future = self._submit_process(_extract_document, r.uri.replace("file://", ""))
+                    err_key = "extract"
+                elif stage == "image":
+                    first = self._ocr_pool.submit(ocr, r)
+                    err_key = "ocr"
+                else:
+                    first = self._detect_pool.submit(read_text, r)
+                    err_key = "read"
+            except Exception as e:
+                out.put({**error_result(r, "scan", e), "_stage": stage})
+                return
+
+            def on_extracted(f: Future) -> None:
+                try:
+                    text = f.result()
+                except Exception as e:
+                    out.put({**error_result(r, err_key, e), "_stage": stage})
+                    return
+                second = self._detect_pool.submit(detect, r, text)
+                second.add_done_callback(guarded(r, stage, "scan", on_detected))
+
+            first.add_done_callback(guarded(r, stage, err_key, on_extracted))
+
+        while True:
+            # 1) relance les fichiers en attente dont le stage a de la place
+            for stage, backlog in waiting.items():
+                while backlog and active[stage] < self.limits[stage]:
+                    submit(backlog.popleft())
+
+            # 2) lit la suite de l'énumération tant que le backlog est borné
+            while not exhausted and sum(len(b) for b in waiting.values()) < self.max_in_flight:
+                try:
+                    r = next(it)
+                except StopIteration:
+                    exhausted = True
+                    break
+                stage = stage_of(r)
+                if active[stage] < self.limits[stage]:
+                    submit(r)
+                else:
+                    waiting[stage].append(r)
+
+            if not any(active.values()):
+                break
+
+            res = out.get()
+            active[res.pop("_stage")] -= 1
+            yield res
+
+    def shutdown(self) -> None:
+        self._extract_pool.shutdown(wait=False, cancel_futures=True)
+        self._ocr_pool.shutdown(wait=False, cancel_futures=True)
+        self._detect_pool.shutdown(wait=False, cancel_futures=True)
+        self._pdf_pool.shutdown(wait=False, cancel_futures=True)
+
+
+@lru_cache(maxsize=1)
+def get_scan_engine() -> ScanEngine:
+    """Shared engine (pools created once per process, on first parallel scan)."""
+    settings = get_settings()
+    return ScanEngine(
+        extract_workers=settings.scan_extract_workers or os.cpu_count() or 1,
+        ocr_workers=settings.scan_ocr_workers,
+        detect_workers=settings.scan_detect_workers,
+        max_in_flight=settings.scan_max_in_flight,
+        pdf_streams=settings.scan_pdf_streams,
+    )
+
@@ -0,0 +1,274 @@
+from __future__ import annotations
+
+import datetime as dt
+import hashlib
+import json
+import os
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, insert, or_, select, update
+
+from app.connectors.base import Resource
+from app.db.models import ScanIndexEntry
+from app.db.session import SessionLocal
+
+
+def detectors_key(*, language: str, detectors: List[str], min_score: float) -> str:
+    return f"{language}|{min_score:.2f}|{','.join(sorted(set(detectors)))}"
+
+
+def file_sha256(path: str, *, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _like_prefix(prefix: str) -> str:
+    """LIKE pattern matching paths that start with `prefix` (escape char: backslash)."""
+    return prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+class ScanIndex:
+    """Persistent file fingerprint index used by incremental scans.
+
+    - size + mtime unchanged => file considered unchanged (no read at all)
+    - otherwise the content hash decides (touch / copy without edit => unchanged)
+    - entries are read one directory at a time, as the enumeration reaches
+      it (FileSystemConnector lists a directory's files together): memory
+      does not grow with the size of the indexed tree
+    - writes are buffered and upserted in batches (bulk UPDATE by id + bulk
+      INSERT, no per-row lookup)
+    - every entry met by the scan is stamped with its `scan_id` (batched
+      UPDATE by id); deletions are the entries under root left with another
+      scan_id, streamed then removed by one DELETE. They are only reported
+      when the enumeration was complete (fewer files than `limit`)
+    """
+
+    def __init__(
+        self, *, root: str, key: str, recursive: bool = True, limit: int = 0, batch_size: int = 200
+    ) -> None:
+        self.root = str(Path(root).expanduser().resolve())  # même normalisation que FileSystemConnector
+        self.key = key
+        self.recursive = recursive
+        self.limit = limit
+        self.batch_size = batch_size
+        self._dir: Optional[str] = None
+        self._entries: Dict[str, Dict[str, Any]] = {}  # entrées du répertoire en cours
+        self._pending: Dict[str, Dict[str, Any]] = {}  # path -> fingerprint du fichier en cours
+        self._dirty: List[Tuple[str, Dict[str, Any]]] = []
+        self._seen_ids: List[int] = []  # entrées vues, tamponnées par lot
+        self.scan_id = uuid.uuid4().hex
+        self.seen = 0
+        self.new: List[str] = []
+        self.changed: List[str] = []
+        self.unchanged = 0
+        self.pii_changed: List[str] = []
+
+    def _children(self, directory: str):
+        """Filter on the index entries directly under `directory`."""
+        prefix = directory.rstrip(os.sep) + os.sep
+        return (
+            ScanIndexEntry.detectors_key == self.key,
+            ScanIndexEntry.path.like(_like_prefix(prefix), escape="\\"),
+            ~ScanIndexEntry.path.like(_like_prefix(prefix) + os.sep + "%", escape="\\"),
+        )
+
+    def _load_dir(self, directory: str) -> None:
+        self._dir = directory
+        self._entries = {}
+        with SessionLocal() as db:
+            rows = db.execute(
+                select(
+                    ScanIndexEntry.id,
+                    ScanIndexEntry.path,
+                    ScanIndexEntry.size,
+                    ScanIndexEntry.mtime,
+                    ScanIndexEntry.content_hash,
+                    ScanIndexEntry.summary_json,
+                    ScanIndexEntry.errors_json,
+                    ScanIndexEntry.count,
+                ).where(*self._children(directory))
+            )
+            for row in rows:
+                self._entries[row.path] = {
+                    "id": row.id,
+                    "size": row.size,
+                    "mtime": row.mtime,
+                    "content_hash": row.content_hash,
+                    "summary_json": row.summary_json or "{}",
+                    "errors_json": row.errors_json or "{}",
+                    "count": row.count,
+                }
+
+    def check(self, r: Resource) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """Returns (status, reusable result or None); status is new | changed | unchanged."""
+        path = r.uri.replace("file://", "")
+        self.seen += 1
+        directory = os.path.dirname(path)
+        if directory != self._dir:
+            self._load_dir(directory)
+        st = os.stat(path)
+        prev = self._entries.pop(path, None)
+        if prev is not None:
+            # vu par ce scan, même s'il échoue ensuite (pas réindexé, mais pas supprimé)
+            self._seen_ids.append(prev["id"])
+            self._maybe_flush()
+        fp: Dict[str, Any] = {"size": st.st_size, "mtime": st.st_mtime, "content_hash": ""}
+
+        if prev is not None and prev["size"] == fp["size"] and prev["mtime"] == fp["mtime"]:
+            self.unchanged += 1
+            return "unchanged", self._cached_result(r, prev)
+
+        fp["content_hash"] = file_sha256(path)
+        if prev is not None and prev["content_hash"] == fp["content_hash"]:
+            # contenu identique: on rafraîchit juste size/mtime
+            self.unchanged += 1
+            self._dirty.append((path, {**prev, **fp}))
+            self._maybe_flush()
+            return "unchanged", self._cached_result(r, prev)
+
+        status = "new" if prev is None else "changed"
+        self._pending[path] = {
+            **fp,
+            "status": status,
+            "id": prev["id"] if prev else None,
+            "prev_summary": prev["summary_json"] if prev else None,
+        }
+        return status, None
+
+    def record(self, result: Dict[str, Any]) -> str:
+        """Store the fresh result of a new / changed file; returns its status.
+
+        Failed files are not indexed, so the next run retries them.
+        """
+        path = result["uri"].replace("file://", "")
+        fp = self._pending.pop(path, None)
+        if fp is None:
+            return "new"
+        status = fp.pop("status")
+        prev_summary = fp.pop("prev_summary")
+        (self.new if status == "new" else self.changed).append(result["uri"])
+        summary = result.get("summary") or {}
+        if prev_summary is not None and json.loads(prev_summary) != summary:
+            self.pii_changed.append(result["uri"])
+        if result.get("errors"):
+            return status
+        self._dirty.append(
+            (
+                path,
+                {
+                    **fp,
+                    "kind": result.get("kind", "file"),
+                    "summary_json": json.dumps(summary, ensure_ascii=False),
+                    "errors_json": "{}",
+                    "count": int(result.get("count") or 0),
+                },
+            )
+        )
+        self._maybe_flush()
+        return status
+
+    def finish(self) -> Dict[str, Any]:
+        """Flush pending writes, drop deleted files from the index and return the diff."""
+        self.flush()
+        deleted: List[str] = []
+        if not self.limit or self.seen < self.limit:
+            deleted = self._drop_unseen()
+        return {
+            "new": self.new,
+            "changed": self.changed,
+            "unchanged": self.unchanged,
+            "deleted": [f"file://{p}" for p in deleted],
+            "pii_changed": self.pii_changed,
+        }
+
+    def _drop_unseen(self) -> List[str]:
+        """Remove the entries under root not stamped by this scan; returns their paths."""
+        if self.recursive:
+            prefix = self.root.rstrip(os.sep) + os.sep
+            where = (
+                ScanIndexEntry.detectors_key == self.key,
+                or_(ScanIndexEntry.path == self.root, ScanIndexEntry.path.like(_like_prefix(prefix), escape="\\")),
+            )
+        else:
+            where = self._children(self.root)
+        unseen = (*where, ScanIndexEntry.scan_id != self.scan_id)
+        with SessionLocal() as db:
+            rows = db.execute(
+                select(ScanIndexEntry.path)
+                .where(*unseen)
+                .order_by(ScanIndexEntry.path)
+                .execution_options(yield_per=1000)
+            )
+            deleted = [path for (path,) in rows]
+            if deleted:
+                db.execute(delete(ScanIndexEntry).where(*unseen).execution_options(synchronize_session=False))
+                db.commit()
+        return deleted
+
+    def _maybe_flush(self) -> None:
+        if len(self._dirty) >= self.batch_size or len(self._seen_ids) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._seen_ids:
+            seen, self._seen_ids = self._seen_ids, []
+            with SessionLocal() as db:
+                db.execute(
+                    update(ScanIndexEntry)
+                    .where(ScanIndexEntry.id.in_(seen))
+                    .values(scan_id=self.scan_id)
+                    .execution_options(synchronize_session=False)
+                )
+                db.commit()
+        if not self._dirty:
+            return
+        batch, self._dirty = self._dirty, []
+        now = dt.datetime.now(dt.timezone.utc)
+        rows: Dict[str, Dict[str, Any]] = {}
+        for path, data in batch:
+            rows[path] = {
+                "id": data.get("id"),
+                "path": path,
+                "detectors_key": self.key,
+                "kind": data.get("kind", "file"),
+                "size": data["size"],
+                "mtime": data["mtime"],
+                "content_hash": data["content_hash"],
+                "summary_json": data.get("summary_json") or "{}",
+                "errors_json": data.get("errors_json") or "{}",
+                "count": int(data.get("count") or 0),
+                "scanned_at": now,
+                "scan_id": self.scan_id,
+            }
+        with SessionLocal() as db:
+            # id inconnu (fichier nouveau, ou indexé entre-temps par un autre scan): 1 SELECT par batch
+            unknown = [p for p, row in rows.items() if row["id"] is None]
+            if unknown:
+                for row_id, path in db.execute(
+                    select(ScanIndexEntry.id, ScanIndexEntry.path).where(
+                        ScanIndexEntry.detectors_key == self.key, ScanIndexEntry.path.in_(unknown)
+                    )
+                ):
+                    rows[path]["id"] = row_id
+            updates = [row for row in rows.values() if row["id"] is not None]
+            inserts = [{k: v for k, v in row.items() if k != "id"} for row in rows.values() if row["id"] is None]
+            if updates:
+                db.execute(update(ScanIndexEntry), updates)
+            if inserts:
+                db.execute(insert(ScanIndexEntry), inserts)
+            db.commit()
+
+    @staticmethod
+    def _cached_result(r: Resource, prev: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "uri": r.uri,
+            "kind": r.kind,
+            "summary": json.loads(prev["summary_json"]),
+            "errors": json.loads(prev["errors_json"]),
+            "count": prev["count"],
+        }
@@ -1,13 +1,24 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List
+import contextvars
+import queue
+import threading
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
+from app.connectors.base import Resource
 from app.connectors.filesystem import FileSystemConnector
+from app.core.config import get_settings
 from app.extractors.dispatcher import ExtractorDispatcher
 from app.services.pipeline_text import TextPipeline
 from app.services.pipeline_images import ImagePipeline
 from app.services.pipeline_docs import DocumentPipeline
-from app.services.scoring import summarize
+from app.services.scan_engine import get_scan_engine
+from app.services.scan_index import ScanIndex, detectors_key
+
+
+class _ScanStopped(Exception):
+    """The consumer of an incremental scan went away."""
 
 
 class ScanService:
@@ -19,7 +30,7 @@ class ScanService:
         self.doc_pipeline = DocumentPipeline()
         self.img_pipeline = ImagePipeline()
 
-    def scan(
+    def iter_scan(
         self,
         *,
         connector: str,
@@ -29,60 +40,305 @@ class ScanService:
         detectors: List[str],
         min_score: float,
         limit: int = 200,
-    ) -> Dict[str, Any]:
+        parallel: Optional[bool] = None,
+        index: Optional[ScanIndex] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """Stream per-file results as files are processed.
+
+        Enumeration is lazy: `limit` stops listing the tree as soon as it is
+        reached, and no span is kept once a file's result has been emitted.
+        In parallel mode results come in completion order (ScanEngine).
+
+        With an `index` (see open_index), unchanged files are not reprocessed:
+        their stored result is reused and every result carries a `status`
+        (new | changed | unchanged). Call `index.finish()` at the end.
+        """
+        # validation immédiate (pas au premier next()), pour pouvoir renvoyer un 400
         if connector != "filesystem":
             raise ValueError("Only connector=filesystem is supported for now")
 
-        resources = list(self.fs.list(root, recursive=recursive))[: max(0, limit)]
-        results: List[Dict[str, Any]] = []
-        global_spans = []
+        resources = islice(self.fs.list(root, recursive=recursive), max(0, limit))
+        parallel = get_settings().scan_parallel if parallel is None else parallel
+        if index is not None:
+            return self._iter_incremental(
+                resources,
+                index,
+                lambda rs: self._process(rs, language=language, detectors=detectors, min_score=min_score, parallel=parallel),
+            )
+        return self._process(resources, language=language, detectors=detectors, min_score=min_score, parallel=parallel)
 
-        for r in resources:
-            # Strategy:
-            # - for documents/images: use pipelines (they handle extraction)
-            # - for text files: read directly and detect
-            if r.kind == "document":
-                spans, _, summary, errors = self.doc_pipeline.detect_file(
-                    file_path=r.uri.replace("file://", ""),
-                    language=language,
-                    detectors=detectors,
-                    min_score=min_score,
-                    merge_overlaps=True,
-                    return_text=False,
-                )
-                global_spans.extend(spans)
-                results.append({"uri": r.uri, "kind": r.kind, "summary": summary, "errors": errors, "count": len(spans)})
+    def open_index(
+        self, *, root: str, recursive: bool, language: str, detectors: List[str], min_score: float, limit: int = 200
+    ) -> ScanIndex:
+        """Fingerprint index of previous scans of `root` with the same detector set."""
+        return ScanIndex(
+            root=root,
+            key=detectors_key(language=language, detectors=detectors, min_score=min_score),
+            recursive=recursive,
+            limit=max(0, limit),
+        )
 
-            elif r.kind == "image":
+    def _process(
+        self, resources: Iterable[Resource], *, language: str, detectors: List[str], min_score: float, parallel: bool
+    ) -> Iterator[Dict[str, Any]]:
+        if not parallel:
+            return (self._scan_one(r, language=language, detectors=detectors, min_score=min_score) for r in resources)
+
+        return get_scan_engine().run(
+            resources,
+            read_text=self._read,
+            ocr=lambda r: self.img_pipeline.ocr(r.uri.replace("file://", "")),
+            detect=lambda r, text: self._detect(r, text, language=language, detectors=detectors, min_score=min_score),
+            failed=self._failed,
+            detect_pdf=lambda r: self._detect_pdf(
+                r, language=language, detectors=detectors, min_score=min_score, parallel=True
+            ),
+        )
+
+    @staticmethod
+    def _iter_incremental(
+        resources: Iterable[Resource],
+        index: ScanIndex,
+        process: Callable[[Iterable[Resource]], Iterator[Dict[str, Any]]],
+        *,
+        buffer: int = 64,
+    ) -> Iterator[Dict[str, Any]]:
+        """Only new / changed files go through `process`; reused results are interleaved.
+
+        The enumeration runs on its own thread: results of unchanged files
+        are emitted as soon as they are checked, not held back until the next
+        processed file comes out of `process` (which pulls resources ahead).
+        Both sources share a bounded queue, so memory stays constant.
+        """
+        out: "queue.Queue[Tuple[str, Any]]" = queue.Queue(maxsize=max(1, buffer))
+        stop = threading.Event()
+
+        def emit(kind: str, item: Any) -> None:
+            while not stop.is_set():
+                try:
+                    out.put((kind, item), timeout=0.5)
+                    return
+                except queue.Full:
+                    continue
+            raise _ScanStopped()
+
+        def to_process() -> Iterator[Resource]:
+            for r in resources:
                 try:
-                    spans, _, summary, errors = self.img_pipeline.detect_image(
-                        image_path=r.uri.replace("file://", ""),
-                        language=language,
-                        detectors=detectors,
-                        min_score=min_score,
-                        merge_overlaps=True,
-                    )
-                    global_spans.extend(spans)
-                    results.append({"uri": r.uri, "kind": r.kind, "summary": summary, "errors": errors, "count": len(spans)})
-                except Exception as e:
-                    results.append({"uri": r.uri, "kind": r.kind, "summary": {}, "errors": {"ocr": str(e)}, "count": 0})
+                    status, cached = index.check(r)
+                except OSError:
+                    # fichier disparu / illisible: le traitement remontera l'erreur
+                    yield r
+                    continue
+                if cached is not None:
+                    emit("file", {**cached, "status": status})
+                else:
+                    yield r
 
+        def produce() -> None:
+            # toutes les écritures de l'index se font sur ce thread
+            results = process(to_process())
+            try:
+                for res in results:
+                    emit("file", {**res, "status": index.record(res)})
+                emit("end", None)
+            except _ScanStopped:
+                pass
+            except BaseException as e:
+                try:
+                    emit("error", e)
+                except _ScanStopped:
+                    pass
+            finally:
+                close = getattr(results, "close", None)
+                if close is not None:
+                    close()
+
+        ctx = contextvars.copy_context()
+        producer = threading.Thread(target=ctx.run, args=(produce,), name="scan-incremental", daemon=True)
+        producer.start()
+        try:
+            while True:
+                kind, item = out.get()
+                if kind == "end":
+                    break
+                if kind == "error":
+                    raise item
+                yield item
+            producer.join()
+        finally:
+            # consommateur parti (client déconnecté): le producteur s'arrête au prochain emit
+            stop.set()
+
+    def scan(
+        self,
+        *,
+        connector: str,
+        root: str,
+        recursive: bool,
+        language: str,
+        detectors: List[str],
+        min_score: float,
+        limit: int = 200,
+        parallel: Optional[bool] = None,
+        incremental: bool = False,
+        on_result: Optional[Callable[[Dict[str, Any], Dict[str, Any]], None]] = None,
+    ) -> Dict[str, Any]:
+        """Run a full scan; `on_result(file_result, progress)` is called after each file.
+
+        `incremental=True` reuses the results of files unchanged since the
+        previous scan and adds a `diff` (new / changed / deleted / pii_changed).
+        """
+        results: List[Dict[str, Any]] = []
+        progress = ScanProgress()
+        index = None
+        if incremental:
+            index = self.open_index(
+                root=root, recursive=recursive, language=language, detectors=detectors, min_score=min_score, limit=limit
+            )
+
+        for res in self.iter_scan(
+            connector=connector,
+            root=root,
+            recursive=recursive,
+            language=language,
+            detectors=detectors,
+            min_score=min_score,
+            limit=limit,
+            parallel=parallel,
+            index=index,
+        ):
+            progress.add(res)
+            results.append(res)
+            if on_result:
+                on_result(res, progress.snapshot())
+
+        out: Dict[str, Any] = {
+            "scanned": progress.scanned,
+            "results": results,
+            "summary": dict(progress.summary),
+        }
+        if index is not None:
+            out["diff"] = index.finish()
+        return out
+
+    def _scan_one(self, r: Resource, *, language: str, detectors: List[str], min_score: float) -> Dict[str, Any]:
+        # Strategy:
+        # - for documents/images: use pipelines (they handle extraction)
+        # - for text files: read directly and detect
+        # An error on one file is reported in its result and never stops the scan.
+        path = r.uri.replace("file://", "")
+        if r.kind == "document" and path.lower().endswith(".pdf"):
+            return self._detect_pdf(r, language=language, detectors=detectors, min_score=min_score, parallel=False)
+        try:
+            if r.kind == "document":
+                text = self.doc_pipeline.extract_text(path)
+            elif r.kind == "image":
+                text = self.img_pipeline.ocr(path)
             else:
-                text = self.fs.read_text(r.uri)
-                spans, _, summary, errors = self.text_pipeline.detect(
-                    text=text,
-                    language=language,
-                    detectors=detectors,
-                    min_score=min_score,
-                    merge_overlaps=True,
-                    return_text=False,
-                    best_effort=True,
-                )
-                global_spans.extend(spans)
-                results.append({"uri": r.uri, "kind": r.kind, "summary": summary, "errors": errors, "count": len(spans)})
+                text = self._read(r)
+        except Exception as e:
+            return self._failed(r, {"document": "extract", "image": "ocr"}.get(r.kind, "read"), e)
+
+        try:
+            return self._detect(r, text, language=language, detectors=detectors, min_score=min_score)
+        except Exception as e:
+            return self._failed(r, "scan", e)
 
+    def _read(self, r: Resource) -> str:
+        if r.kind == "text":
+            return self.fs.read_text(r.uri)
+        # suffixe inconnu: le dispatcher identifie le format par ses magic bytes
+        return self.extractor.extract(r.uri.replace("file://", "")).text
+
+    def _detect(
+        self, r: Resource, text: str, *, language: str, detectors: List[str], min_score: float
+    ) -> Dict[str, Any]:
+        """Detection step for an already extracted / OCR-ed file."""
+        if r.kind == "document":
+            spans, _, summary, errors = self.doc_pipeline.detect_text(
+                text=text,
+                language=language,
+                detectors=detectors,
+                min_score=min_score,
+                merge_overlaps=True,
+                return_text=False,
+            )
+        elif r.kind == "image":
+            spans, _, summary, errors = self.img_pipeline.detect_ocr_text(
+                text=text,
+                language=language,
+                detectors=detectors,
+                min_score=min_score,
+                merge_overlaps=True,
+            )
+        else:
+            spans, _, summary, errors = self.text_pipeline.detect(
+                text=text,
+                language=language,
+                detectors=detectors,
+                min_score=min_score,
+                merge_overlaps=True,
+                return_text=False,
+                best_effort=True,
+            )
+        return {"uri": r.uri, "kind": r.kind, "summary": summary, "errors": errors, "count": len(spans)}
+
+    def _detect_pdf(
+        self, r: Resource, *, language: str, detectors: List[str], min_score: float, parallel: bool
+    ) -> Dict[str, Any]:
+        """PDF scanned page by page: only per-file counters are kept, never all the spans."""
+        summary: Dict[str, int] = {}
+        errors: Dict[str, str] = {}
+        count = pages = 0
+        try:
+            for res in self.doc_pipeline.detect_pages(
+                file_path=r.uri.replace("file://", ""),
+                language=language,
+                detectors=detectors,
+                min_score=min_score,
+                merge_overlaps=True,
+                return_text=False,
+                parallel=parallel,
+            ):
+                pages += 1
+                count += len(res["spans"])
+                for label, n in res["summary"].items():
+                    summary[label] = summary.get(label, 0) + n
+                for name, msg in res["errors"].items():
+                    errors.setdefault(name, f"page {res['page']}: {msg}")
+        except Exception as e:
+            # extraction (ou détection) interrompue: on garde ce qui a été vu
+            errors["extract"] = str(e)
+        return {"uri": r.uri, "kind": r.kind, "summary": summary, "errors": errors, "count": count, "pages": pages}
+
+    @staticmethod
+    def _failed(r: Resource, stage: str, e: Exception) -> Dict[str, Any]:
+        return {"uri": r.uri, "kind": r.kind, "summary": {}, "errors": {stage: str(e)}, "count": 0}
+
+
+class ScanProgress:
+    """Incremental scan counters (constant memory, whatever the number of files)."""
+
+    def __init__(self) -> None:
+        self.scanned = 0
+        self.with_pii = 0
+        self.errors = 0
+        self.summary: Dict[str, int] = {}
+
+    def add(self, res: Dict[str, Any]) -> None:
+        self.scanned += 1
+        if res.get("count"):
+            self.with_pii += 1
+        if res.get("errors"):
+            self.errors += 1
+        for label, n in (res.get("summary") or {}).items():
+            self.summary[label] = self.summary.get(label, 0) + n
+
+    def snapshot(self) -> Dict[str, Any]:
         return {
-            "scanned": len(resources),
-            "results": results,
-            "summary": summarize(global_spans),
-        }
\ No newline at end of file
+            "scanned": self.scanned,
+            "with_pii": self.with_pii,
+            "errors": self.errors,
+            "summary": dict(self.summary),
+        }
@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from app.core.config import get_settings
+from app.core.errors import PayloadTooLarge
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+UPLOAD_PREFIX = "upload_"
+# marge pour les boundaries / champs du multipart autour du fichier
+_MULTIPART_SLACK = 64 * 1024
+
+
+@dataclass
+class StoredUpload:
+    """An upload copied to disk; removed by remove() / on leaving a `with` block."""
+    path: str
+    filename: str
+    size: int
+    sha256: str
+
+    def remove(self) -> None:
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self) -> "StoredUpload":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.remove()
+
+
+class UploadStore:
+    """Copies uploads to disk in fixed-size chunks.
+
+    - constant memory per upload (`chunk_bytes`), sha256 computed while
+      copying (reusable as a cache key: OCR cache, dedup...)
+    - `max_bytes` enforced while copying (PayloadTooLarge, partial file
+      removed); written to `.part` then renamed, so a file under its final
+      name is always complete
+    - files are removed by the caller after processing; orphans (crash,
+      client gone mid-stream) older than `ttl_s` are swept at most every
+      ttl_s / 4 on the next save
+    """
+
+    def __init__(
+        self,
+        base_dir: str,
+        *,
+        max_bytes: int = 0,
+        chunk_bytes: int = 1 << 20,
+        ttl_s: int = 3600,
+        legacy_dir: Optional[str] = None,
+    ) -> None:
+        self.base = Path(base_dir)
+        self.max_bytes = max(0, max_bytes)
+        self.chunk_bytes = max(64 * 1024, chunk_bytes)
+        self.ttl_s = ttl_s
+        self._legacy = Path(legacy_dir) if legacy_dir else None
+        self._last_sweep = 0.0
+        self._sweep_lock = threading.Lock()
+
+    def save(self, upload: Any) -> StoredUpload:
+        """Copy a starlette UploadFile (blocking: run it on a worker pool)."""
+        self.base.mkdir(parents=True, exist_ok=True)
+        self._maybe_sweep()
+        suffix = Path(upload.filename or "").suffix[:16]
+        final = self.base / f"{UPLOAD_PREFIX}{uuid.uuid4().hex}{suffix}"
+        part = final.with_name(final.name + ".part")
+        h = hashlib.sha256()
+        size = 0
+        src = upload.file
+        try:
+            src.seek(0)
+            with part.open("wb") as f:
+                for chunk in iter(lambda: src.read(self.chunk_bytes), b""):
+                    size += len(chunk)
+                    if self.max_bytes and size > self.max_bytes:
+                        raise PayloadTooLarge(
+                            f"Upload exceeds {self.max_bytes // (1024 * 1024)} MB",
+                            details={"max_bytes": self.max_bytes, "filename": upload.filename},
+                        )
+                    h.update(chunk)
+                    f.write(chunk)
+            os.replace(part, final)
+        except BaseException:
+            part.unlink(missing_ok=True)
+            raise
+        return StoredUpload(path=str(final), filename=upload.filename or final.name, size=size, sha256=h.hexdigest())
+
+    def _maybe_sweep(self) -> None:
+        now = time.monotonic()
+        if now - self._last_sweep < max(60.0, self.ttl_s / 4):
+            return
+        if not self._sweep_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_sweep = now
+            removed = self.sweep()
+            if removed:
+                logger.info(f"Upload sweep: {removed} orphan file(s) removed")
+        finally:
+            self._sweep_lock.release()
+
+    def sweep(self) -> int:
+        """Remove upload files older than ttl_s (also those left by older versions in storage_dir)."""
+        cutoff = time.time() - self.ttl_s
+        removed = 0
+        for d in (self.base, self._legacy):
+            if d is None or not d.is_dir():
+                continue
+            for entry in os.scandir(d):
+                if not (entry.name.startswith(UPLOAD_PREFIX) and entry.is_file()):
+                    continue
+                try:
+                    if entry.stat().st_mtime < cutoff:
+                        os.unlink(entry.path)
+                        removed += 1
+                except FileNotFoundError:
+                    pass
+        return removed
+
+
+@lru_cache(maxsize=1)
+def get_upload_store() -> UploadStore:
+    settings = get_settings()
+    return UploadStore(
+        str(Path(settings.storage_dir) / "uploads"),
+        max_bytes=settings.upload_max_mb * 1024 * 1024,
+        chunk_bytes=settings.upload_chunk_kb * 1024,
+        ttl_s=settings.upload_ttl_s,
+        legacy_dir=settings.storage_dir,
+    )
+
+
+class UploadSizeLimitMiddleware:
+    """Rejects oversized request bodies under `path_prefix` while they stream in (413).
+
+    Starlette spools multipart files to disk before the route runs; this
+    stops a too large upload at the declared Content-Length, or as soon as
+    the received bytes exceed the limit, instead of after the whole body.
+    """
+
+    def __init__(self, app: Callable[..., Any], *, max_bytes: int, path_prefix: str = "/files") -> None:
+        self.app = app
+        self.max_body = max_bytes + _MULTIPART_SLACK if max_bytes > 0 else 0
+        self.path_prefix = path_prefix
+
+    async def __call__(self, scope: dict, receive: Callable[..., Any], send: Callable[..., Any]) -> None:
+        if not self.max_body or scope["type"] != "http" or not scope["path"].startswith(self.path_prefix):
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        declared = headers.get(b"content-length", b"")
+        if declared.isdigit() and int(declared) > self.max_body:
+            await self._reject(send)
+            return
+
+        received = 0
+
+        async def limited_receive() -> dict:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body:
+                    from fastapi import HTTPException
+
+                    # remonte tel quel à travers le parsing du body (FastAPI) => 413
+                    raise HTTPException(status_code=413, detail="upload_too_large")
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+    async def _reject(self, send: Callable[..., Any]) -> None:
+        body = json.dumps({"detail": "upload_too_large"}).encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 413,
+                "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
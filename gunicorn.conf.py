@@ -0,0 +1,30 @@
+# Mode prefork: gunicorn -c gunicorn.conf.py app.main:app
+#
+# L'app et les modèles (settings.prefork_preload_detectors, sinon
+# preload_detectors) sont chargés une fois dans le master, puis les workers
+# uvicorn sont forkés et partagent les poids copy-on-write: la RAM ne
+# croît pas avec le nombre de workers.
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8080')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "0")) or multiprocessing.cpu_count()
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+keepalive = 5
+# Un chargement de modèle non préchargé peut dépasser le timeout par défaut
+timeout = int(os.getenv("WORKER_TIMEOUT", "120"))
+graceful_timeout = 30
+
+
+def on_starting(server):
+    # master, après le preload de l'app et avant le premier fork
+    from app.services.prefork import preload_models
+
+    preload_models()
+
+
+def post_fork(server, worker):
+    from app.services.prefork import after_fork
+
+    after_fork(server.cfg.workers)
@@ -1,3 +1,5 @@
+import argparse
+
 from huggingface_hub import snapshot_download
 
 MODELS = [
@@ -7,6 +9,11 @@ MODELS = [
 ]
 
 def main():
+    parser = argparse.ArgumentParser()
+    # garde les exports *.onnx publiés sur le Hub (backend onnx, cf. scripts/export_onnx.py)
+    parser.add_argument("--onnx", action="store_true", help="télécharge aussi les fichiers *.onnx")
+    args = parser.parse_args()
+
     for m in MODELS:
         snapshot_download(
             repo_id=m["repo_id"],
@@ -17,7 +24,7 @@ def main():
                 "*.msgpack",
                 "*.h5",
                 "*.ot",
-                "*.onnx",
+                *([] if args.onnx else ["*.onnx"]),
             ],  # optionnel
         )
 
@@ -0,0 +1,101 @@
+"""Export the transformer detectors to ONNX, then quantize them to INT8.
+
+    python scripts/export_onnx.py                  # hf, piiranha, gliner-small
+    python scripts/export_onnx.py --detector hf --no-quantize
+
+Output: <settings.onnx_model_dir>/<detector>/{model.onnx, model_quantized.onnx,
+config + tokenizer}. Select the backend with DETECTOR_BACKENDS='{"hf": "onnx-int8"}'
+and check the accuracy with scripts/validate_onnx.py.
+
+Requires: pip install 'optimum[onnxruntime]' (+ gliner for gliner-small)
+"""
+from __future__ import annotations
+
+import argparse
+import shutil
+from pathlib import Path
+
+from app.detectors.onnx_backend import ONNX_FILES, onnx_model_dir
+
+MODELS = {
+    "hf": "Jean-Baptiste/camembert-ner",
+    "piiranha": "iiiorg/piiranha-v1-detect-personal-information",
+    "gliner-small": "vicgalle/gliner-small-pii",
+}
+
+
+def export_token_classification(model_id: str, out: Path) -> None:
+    from optimum.onnxruntime import ORTModelForTokenClassification
+    from transformers import AutoTokenizer
+
+    model = ORTModelForTokenClassification.from_pretrained(model_id, export=True)
+    model.save_pretrained(out)
+    AutoTokenizer.from_pretrained(model_id).save_pretrained(out)
+
+
+def export_gliner(model_id: str, out: Path) -> None:
+    """Same graph as gliner's convert_to_onnx.py (span-level models)."""
+    import torch
+    from gliner import GLiNER
+
+    model = GLiNER.from_pretrained(model_id, load_tokenizer=True)
+    model.save_pretrained(out)  # config + tokenizer, relus par GLiNER.from_pretrained(load_onnx_model=True)
+
+    inputs, _ = model.prepare_model_inputs(["Jean Dupont habite à Lyon."], ["person", "location"])
+    names = ["input_ids", "attention_mask", "words_mask", "text_lengths", "span_idx", "span_mask"]
+    dynamic_axes = {
+        "input_ids": {0: "batch_size", 1: "sequence_length"},
+        "attention_mask": {0: "batch_size", 1: "sequence_length"},
+        "words_mask": {0: "batch_size", 1: "sequence_length"},
+        "text_lengths": {0: "batch_size", 1: "value"},
+        "span_idx": {0: "batch_size", 1: "num_spans", 2: "idx"},
+        "span_mask": {0: "batch_size", 1: "num_spans"},
+        "logits": {0: "position", 1: "batch_size", 2: "sequence_length", 3: "num_classes"},
+    }
+    torch.onnx.export(
+        model.model,
+        tuple(inputs[n] for n in names),
+        str(out / ONNX_FILES["onnx"]),
+        input_names=names,
+        output_names=["logits"],
+        dynamic_axes=dynamic_axes,
+        opset_version=14,
+    )
+
+
+def quantize(out: Path) -> None:
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    # INT8 dynamique: poids quantifiés, activations calculées à la volée (pas de calibration)
+    quantize_dynamic(
+        model_input=str(out / ONNX_FILES["onnx"]),
+        model_output=str(out / ONNX_FILES["onnx-int8"]),
+        weight_type=QuantType.QInt8,
+        per_channel=True,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--detector", action="append", choices=sorted(MODELS), help="répétable (défaut: tous)")
+    parser.add_argument("--no-quantize", action="store_true", help="n'écrit que model.onnx (fp32)")
+    args = parser.parse_args()
+
+    for det in args.detector or sorted(MODELS):
+        out = onnx_model_dir(det)
+        if out.exists():
+            shutil.rmtree(out)
+        out.mkdir(parents=True)
+        print(f"[{det}] export {MODELS[det]} -> {out}")
+        if det == "gliner-small":
+            export_gliner(MODELS[det], out)
+        else:
+            export_token_classification(MODELS[det], out)
+        if not args.no_quantize:
+            quantize(out)
+        for f in sorted(out.glob("*.onnx")):
+            print(f"[{det}]   {f.name}: {f.stat().st_size / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Compare an ONNX backend with eager PyTorch on sample texts.
+
+    python scripts/validate_onnx.py --detector hf --backend onnx-int8
+    python scripts/validate_onnx.py --detector piiranha --texts corpus.txt --min-f1 0.97
+
+Reports entity agreement (F1 on (start, end, label), torch = reference) and
+per-text latency of both backends. Exit code 1 when F1 < --min-f1.
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import time
+from typing import Dict, List, Set, Tuple
+
+from app.core.config import get_settings
+from app.detectors.registry import default_factories
+
+SAMPLES = [
+    "Bonjour, je m'appelle Marie Dupont et j'habite au 12 rue de la Paix à Paris.",
+    "Le contrat a été signé par Jean-Pierre Martin (société Acme SAS) le 3 mars à Lyon.",
+    "Contactez Sophie Bernard au 06 12 34 56 78 ou par mail sophie.bernard@example.fr.",
+    "Patient: Louis Moreau, né le 12/04/1980, suivi à l'hôpital Saint-Louis de Marseille.",
+    "Meeting with John Smith from Contoso in Berlin next Tuesday.",
+    "Le serveur a redémarré sans erreur après la mise à jour.",
+]
+
+Key = Tuple[int, int, str]
+
+
+def run(detector: str, backend: str, texts: List[str]) -> Tuple[List[Set[Key]], List[float]]:
+    settings = get_settings()
+    settings.detector_backends = {**settings.detector_backends, detector: backend}
+    det = default_factories()[detector]()
+    det.detect(texts[0])  # warmup
+    found: List[Set[Key]] = []
+    times: List[float] = []
+    for text in texts:
+        start = time.perf_counter()
+        spans = det.detect(text)
+        times.append((time.perf_counter() - start) * 1000.0)
+        found.append({(s.start, s.end, s.label) for s in spans})
+    return found, times
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--detector", required=True, choices=["hf", "piiranha", "gliner-small"])
+    parser.add_argument("--backend", default="onnx-int8", choices=["onnx", "onnx-int8"])
+    parser.add_argument("--texts", help="fichier texte, 1 exemple par ligne (défaut: échantillons intégrés)")
+    parser.add_argument("--min-f1", type=float, default=0.95)
+    args = parser.parse_args()
+
+    texts = SAMPLES
+    if args.texts:
+        with open(args.texts, encoding="utf-8") as f:
+            texts = [line.strip() for line in f if line.strip()]
+
+    ref, ref_ms = run(args.detector, "torch", texts)
+    got, got_ms = run(args.detector, args.backend, texts)
+
+    tp = sum(len(r & g) for r, g in zip(ref, got))
+    n_ref, n_got = sum(map(len, ref)), sum(map(len, got))
+    precision = tp / n_got if n_got else 1.0
+    recall = tp / n_ref if n_ref else 1.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+
+    report: Dict[str, float] = {
+        "texts": len(texts),
+        "entities_torch": n_ref,
+        f"entities_{args.backend}": n_got,
+        "precision": round(precision, 4),
+        "recall": round(recall, 4),
+        "f1": round(f1, 4),
+        "torch_ms_median": round(statistics.median(ref_ms), 2),
+        f"{args.backend}_ms_median": round(statistics.median(got_ms), 2),
+        "speedup": round(statistics.median(ref_ms) / max(statistics.median(got_ms), 1e-6), 2),
+    }
+    for k, v in report.items():
+        print(f"{k:>24}: {v}")
+    return 0 if f1 >= args.min_f1 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
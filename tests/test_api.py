@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import hashlib
+import io
+import os
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.core.config import Settings
+from app.core.errors import AppError, NotFound, Overloaded, PayloadTooLarge, TooManyRequests
+from app.core.security import tenant_id
+from app.main import app, app_error_handler
+from app.services.uploads import UploadSizeLimitMiddleware, UploadStore
+
+
+def test_tenant_single_when_auth_disabled():
+    settings = Settings(enable_api_key=False)
+    assert tenant_id("key-a", settings) == tenant_id("key-b", settings) == "anonymous"
+
+
+def test_tenant_per_api_key():
+    settings = Settings(enable_api_key=True, api_keys=["key-a", "key-b"])
+    a, b = tenant_id("key-a", settings), tenant_id("key-b", settings)
+    assert a != b and len(a) == 16
+    assert tenant_id(None, settings) == "anonymous"
+
+
+def _raising(exc: Exception):
+    def route():
+        raise exc
+
+    return route
+
+
+def _client(*errors: Exception) -> TestClient:
+    """App with one route per error, behind the real AppError handler."""
+    api = FastAPI()
+    api.add_exception_handler(AppError, app_error_handler)
+    for i, exc in enumerate(errors):
+        api.add_api_route(f"/{i}", _raising(exc))
+    return TestClient(api)
+
+
+def test_capacity_errors_carry_retry_after():
+    client = _client(TooManyRequests(retry_after=3), Overloaded(retry_after=5), NotFound())
+
+    r = client.get("/0")
+    assert r.status_code == 429 and r.headers["Retry-After"] == "3"
+    assert r.json()["error"]["code"] == "TOO_MANY_REQUESTS"
+    r = client.get("/1")
+    assert r.status_code == 503 and r.headers["Retry-After"] == "5"
+    # autres AppError: pas de Retry-After
+    r = client.get("/2")
+    assert r.status_code == 404 and "Retry-After" not in r.headers
+
+
+_TEXTS = [
+    "Contact: jean.dupont@example.com, tel 06 12 34 56 78",
+    "",
+    "IBAN FR76 3000 6000 0112 3456 7890 189",
+    "Contact: jean.dupont@example.com, tel 06 12 34 56 78",
+    "aucune donnée personnelle",
+]
+
+
+def test_detect_batch_matches_single_text_calls():
+    client = TestClient(app)
+    body = {"detectors": ["regex"], "language": "fr"}
+    r = client.post("/detect/batch", json={**body, "texts": _TEXTS})
+    assert r.status_code == 200
+    results = r.json()["results"]
+    assert len(results) == len(_TEXTS)
+
+    for text, batched in zip(_TEXTS, results):
+        single = client.post("/detect/text", json={**body, "text": text}).json()
+        assert batched["spans"] == single["spans"]
+        assert batched["summary"] == single["summary"]
+    assert [s["label"] for s in results[0]["spans"]] == ["EMAIL", "PHONE"]
+
+
+# --- Uploads ---
+
+
+def _upload(data: bytes, filename: str = "scan.pdf") -> SimpleNamespace:
+    # même interface que starlette UploadFile pour UploadStore.save
+    return SimpleNamespace(filename=filename, file=io.BytesIO(data))
+
+
+def test_upload_store_copies_in_chunks_with_sha256(tmp_path):
+    data = os.urandom(300 * 1024)
+    store = UploadStore(str(tmp_path), max_bytes=len(data), chunk_bytes=64 * 1024)
+
+    with store.save(_upload(data)) as up:
+        assert up.size == len(data) and up.filename == "scan.pdf"
+        assert up.sha256 == hashlib.sha256(data).hexdigest()
+        assert up.path.endswith(".pdf") and open(up.path, "rb").read() == data
+    assert os.listdir(tmp_path) == []
+
+
+def test_upload_store_rejects_oversized_upload(tmp_path):
+    store = UploadStore(str(tmp_path), max_bytes=100 * 1024, chunk_bytes=64 * 1024)
+
+    with pytest.raises(PayloadTooLarge) as exc:
+        store.save(_upload(b"x" * (100 * 1024 + 1)))
+    assert exc.value.status_code == 413
+    assert os.listdir(tmp_path) == []  # fichier partiel supprimé
+
+
+def test_upload_size_limit_middleware():
+    api = FastAPI()
+    api.add_middleware(UploadSizeLimitMiddleware, max_bytes=1024)
+
+    @api.post("/files/echo")
+    @api.post("/detect/echo")
+    async def echo(request: Request):
+        return {"size": len(await request.body())}
+
+    client = TestClient(api)
+    big = b"x" * (1024 + 128 * 1024)  # au-delà de la marge multipart
+    resp = client.post("/files/echo", content=big)
+    assert resp.status_code == 413 and resp.json() == {"detail": "upload_too_large"}
+    # sans Content-Length (chunked): coupé pendant la réception
+    resp = client.post("/files/echo", content=iter([big[:65536]] * 3))
+    assert resp.status_code == 413
+    assert client.post("/files/echo", content=b"x" * 1024).json() == {"size": 1024}
+    # hors du préfixe: pas de limite
+    assert client.post("/detect/echo", content=big).json() == {"size": len(big)}
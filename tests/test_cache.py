@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+from app.services.cache import DetectionCache, OcrCache, text_digest
+
+_SPANS = [{"start": 0, "end": 5, "label": "PERSON", "score": 0.9, "source": "hf"}]
+
+
+def _key(text: str = "Alice", *, language: str = "fr", fingerprint: str = "hf:1:model=a", min_score: float = 0.4):
+    return DetectionCache.make_key(text_digest(text), language=language, fingerprint=fingerprint, min_score=min_score)
+
+
+# --- Cache des détections ---
+
+
+def test_key_covers_text_language_config_and_threshold():
+    keys = {
+        _key(),
+        _key("Bob"),
+        _key(language="en"),
+        _key(fingerprint="hf:2:model=a"),
+        _key(fingerprint="hf:1:model=b"),
+        _key(min_score=0.5),
+    }
+    assert len(keys) == 6
+    assert _key() == _key()
+
+
+def test_lru_is_bounded():
+    cache = DetectionCache(max_entries=2)
+    for text in ("a", "b", "c"):
+        cache.put(_key(text), _SPANS, detector="hf", fingerprint="hf:1:model=a")
+    assert cache.get(_key("a")) is None
+    assert cache.get(_key("c")) == _SPANS
+    assert cache.stats()["evictions"] == 1
+
+
+def test_new_fingerprint_drops_stale_entries():
+    cache = DetectionCache()
+    cache.register_fingerprint("hf", "hf:1:model=a")
+    cache.put(_key(), _SPANS, detector="hf", fingerprint="hf:1:model=a")
+    cache.put(_key(fingerprint="spacy:1:"), _SPANS, detector="spacy", fingerprint="spacy:1:")
+
+    cache.register_fingerprint("hf", "hf:2:model=a")  # nouvelle version du détecteur
+    assert cache.get(_key()) is None
+    assert cache.get(_key(fingerprint="spacy:1:")) == _SPANS
+
+
+def test_invalidate_one_detector():
+    cache = DetectionCache()
+    cache.put(_key(), _SPANS, detector="hf", fingerprint="hf:1:model=a")
+    cache.put(_key(fingerprint="spacy:1:"), _SPANS, detector="spacy", fingerprint="spacy:1:")
+    assert cache.invalidate("hf") == 1
+    assert cache.get(_key()) is None and cache.get(_key(fingerprint="spacy:1:")) == _SPANS
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "detection_cache.sqlite")
+    cache = DetectionCache(disk_path=path, flush_ms=60_000)
+    cache.put(_key(), _SPANS, detector="hf", fingerprint="hf:1:model=a")
+    # pas encore écrite: servie depuis la file d'écriture
+    assert cache.stats()["disk_pending"] == 1
+    assert cache.get(_key()) == _SPANS
+    cache.flush()
+    assert cache.stats()["disk_entries"] == 1
+
+    reopened = DetectionCache(disk_path=path)
+    assert reopened.get(_key()) == _SPANS
+    assert reopened.stats()["disk_hits"] == 1
+    # config changée entre-temps: purgée aussi sur disque
+    reopened.register_fingerprint("hf", "hf:2:model=a")
+    assert reopened.stats()["disk_entries"] == 0
+
+
+def test_disk_writes_are_batched(tmp_path):
+    cache = DetectionCache(disk_path=str(tmp_path / "c.sqlite"), flush_ms=60_000, flush_max=1000)
+    for i in range(50):
+        cache.put(_key(f"t{i}"), _SPANS, detector="hf", fingerprint="hf:1:model=a")
+    cache.flush()
+    stats = cache.stats()
+    assert stats["disk_entries"] == 50 and stats["disk_pending"] == 0
+    assert stats["disk_batches"] <= 2  # une transaction pour la rafale, pas une par put
+
+
+# --- Cache OCR ---
+
+
+def _ocr_key(digest: str = "d1", **kw) -> str:
+    return OcrCache.make_key(digest, **{"lang": "fra", "backend": "tesseract:5", "params": "psm=3", **kw})
+
+
+def test_ocr_cache_key_and_persistence(tmp_path):
+    path = str(tmp_path / "ocr_cache.sqlite")
+    cache = OcrCache(path)
+    cache.put(_ocr_key(), {"text": "Bonjour", "confidence": 91.0})
+    assert cache.get(_ocr_key()) == {"text": "Bonjour", "confidence": 91.0}
+    # autre langue, moteur ou paramètres: autre entrée
+    assert cache.get(_ocr_key(lang="eng")) is None
+    assert cache.get(_ocr_key(backend="tesseract:4")) is None
+    assert cache.get(_ocr_key(params="psm=6")) is None
+
+    reopened = OcrCache(path)
+    assert reopened.get(_ocr_key()) == {"text": "Bonjour", "confidence": 91.0}
+    assert reopened.stats()["bytes"] == cache.stats()["bytes"] > 0
+
+
+def test_ocr_cache_evicts_least_recently_read(tmp_path):
+    cache = OcrCache(str(tmp_path / "ocr_cache.sqlite"), max_bytes=300)
+    payload = {"text": "x" * 80}
+    cache.put(_ocr_key("a"), payload)
+    cache.put(_ocr_key("b"), payload)
+    cache.put(_ocr_key("c"), payload)
+    assert cache.get(_ocr_key("a")) == payload  # "a" relue: "b" devient la plus ancienne
+
+    cache.put(_ocr_key("d"), payload)
+    assert cache.get(_ocr_key("b")) is None
+    assert cache.get(_ocr_key("a")) == payload and cache.get(_ocr_key("d")) == payload
+    assert cache.stats()["bytes"] <= 300
+    # plus gros que tout le budget: ignoré
+    cache.put(_ocr_key("e"), {"text": "x" * 400})
+    assert cache.get(_ocr_key("e")) is None
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+
+import pytest
+
+from app.core.config import get_settings
+from app.core.errors import Overloaded, TooManyRequests
+from app.services.batching import MicroBatcher
+from app.services.concurrency import WorkPool
+from app.services.prefork import SCALED_POOL_SETTINGS, after_fork
+
+
+@pytest.fixture()
+def settings(monkeypatch):
+    # after_fork modifie le singleton: valeurs restaurées par monkeypatch
+    s = get_settings()
+    for name in ("cpu_thread_budget", "scan_extract_workers", *SCALED_POOL_SETTINGS):
+        monkeypatch.setattr(s, name, getattr(s, name))
+    return s
+
+
+def test_after_fork_splits_explicit_sizes(settings):
+    settings.cpu_thread_budget = 16
+    settings.scan_extract_workers = 8
+    settings.ocr_workers = 6
+    settings.scan_pdf_streams = 2
+    settings.jobs_inprocess_workers = 0
+
+    after_fork(4)
+
+    assert settings.cpu_thread_budget == 4
+    assert settings.scan_extract_workers == 2
+    assert settings.ocr_workers == 1
+    assert settings.scan_pdf_streams == 1  # au moins 1 par worker
+    assert settings.jobs_inprocess_workers == 0  # désactivé: reste à 0
+
+
+def test_after_fork_splits_default_sizes(settings, monkeypatch):
+    monkeypatch.setattr(os, "cpu_count", lambda: 16)
+    settings.cpu_thread_budget = 0
+    settings.scan_extract_workers = 0
+
+    after_fork(4)
+
+    assert settings.cpu_thread_budget == 4
+    assert settings.scan_extract_workers == 4
+
+
+# --- Pools de travail ---
+
+
+def test_work_pool_rejects_beyond_max_pending():
+    pool = WorkPool("test", workers=1, max_pending=2, retry_after=3)
+    gate = threading.Event()
+
+    async def scenario():
+        running = [asyncio.ensure_future(pool.run(gate.wait, 5)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        with pytest.raises(TooManyRequests) as exc:
+            await pool.run(lambda: None)
+        gate.set()
+        await asyncio.gather(*running)
+        return exc.value
+
+    err = asyncio.run(scenario())
+    assert err.status_code == 429 and err.retry_after == 3
+    assert pool.stats() == {"workers": 1, "pending": 0, "max_pending": 2, "rejected": 1}
+    # places libérées: de nouveau admis
+    assert asyncio.run(pool.run(lambda: 42)) == 42
+
+
+# --- Micro-batching ---
+
+
+def test_micro_batcher_full_queue_raises_overloaded():
+    started, gate = threading.Event(), threading.Event()
+    seen = []
+
+    def fn(texts, language):
+        seen.extend(texts)
+        started.set()
+        gate.wait(5)
+        return [[] for _ in texts]
+
+    batcher = MicroBatcher("test", fn, max_batch=1, max_wait_ms=0, max_queue=2)
+    busy = batcher.submit(["busy"], "fr")
+    assert started.wait(5)  # la boucle est bloquée dans fn: la file ne se vide plus
+    queued = batcher.submit(["q1"], "fr")
+
+    with pytest.raises(Overloaded) as exc:
+        batcher.submit(["q2", "q3"], "fr")  # q2 entre dans la file, q3 non
+    assert exc.value.status_code == 503 and exc.value.details == {"detector": "test"}
+
+    gate.set()
+    assert [f.result(5) for f in busy + queued] == [[], []]
+    # q2 annulé avec la requête rejetée: jamais passé au modèle
+    assert batcher.stats()["rejected"] == 1
+    assert seen == ["busy", "q1"]
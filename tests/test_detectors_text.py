@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import re
+
+from app.detectors.chunking import TokenWindowChunker, run_token_classification
+from app.detectors.patterns import PatternEngine, iban_ok, luhn_ok, nir_ok, siren_ok
+from app.services.orchestrator import DetectionResult
+from app.services.pipeline_structured import StructuredPipeline
+from app.services.prefilter import NerGate
+
+
+def _names(text: str) -> list[tuple[str, str]]:
+    return [(spec.name, text[s:e]) for s, e, spec in PatternEngine().scan(text)]
+
+
+# --- Validateurs ---
+
+
+def test_luhn():
+    assert luhn_ok("4532 0151 1283 0366")
+    assert not luhn_ok("4532 0151 1283 0367")
+    assert not luhn_ok("")
+
+
+def test_iban_mod97():
+    assert iban_ok("FR76 3000 6000 0112 3456 7890 189")
+    assert iban_ok("fr7630006000011234567890189")
+    assert not iban_ok("FR76 3000 6000 0112 3456 7890 188")
+    assert not iban_ok("FR76 3000")
+
+
+def test_nir_key():
+    assert nir_ok("1 84 05 76 451 089 31")
+    assert not nir_ok("1 84 05 76 451 089 32")
+
+
+def test_nir_corsica():
+    # 2A -> 19, 2B -> 18 pour le calcul de la clé
+    assert nir_ok("2 69 05 2A 123 456 88")
+    assert nir_ok("269052a12345688")
+    assert not nir_ok("2 69 05 2B 123 456 88")
+
+
+def test_siren_siret_luhn():
+    assert siren_ok("732 829 320")
+    assert siren_ok("732 829 320 00074")
+    assert not siren_ok("732 829 321")
+
+
+# --- Catalogue ---
+
+
+def test_siren_requires_context():
+    assert _names("SIREN : 732 829 320") == [("siren", "732 829 320")]
+    assert _names("RCS Paris 732829320") == [("siren", "732829320")]
+    assert _names("R.C.S. Nanterre 732 829 320") == [("siren", "732 829 320")]
+    # suite de 9 chiffres valide Luhn mais sans contexte: n° de commande, montant...
+    assert _names("commande 732 829 320 livrée") == []
+
+
+def test_catalogue_single_pass():
+    text = "Contact: jean.dupont@example.com, tel 06 12 34 56 78, IBAN FR76 3000 6000 0112 3456 7890 189"
+    assert _names(text) == [
+        ("email", "jean.dupont@example.com"),
+        ("phone_fr", "06 12 34 56 78"),
+        ("iban", "FR76 3000 6000 0112 3456 7890 189"),
+    ]
+
+
+def test_invalid_checksum_falls_back_to_lower_priority():
+    # 14 chiffres, pas un SIRET valide mais une carte valide (Luhn sur 14 chiffres)
+    number = "4000 0000 0000 02"
+    assert luhn_ok(number)
+    assert _names(f"carte {number}") == [("credit_card", number)]
+
+
+_SPACED_IBANS = ["GB82 WEST 1234 5698 7654 32", "NL91 ABNA 0417 1643 00", "FR14 2004 1010 0505 0001 3M02 606"]
+_PROSE = "Le contrat a été signé par les deux parties après relecture attentive. " * 20
+
+
+def test_spaced_iban_with_letters_short_text():
+    for iban in _SPACED_IBANS:
+        assert _names(f"virement sur {iban} merci") == [("iban", iban)]
+
+
+def test_spaced_iban_with_letters_in_long_text():
+    # texte long: le moteur ne scanne que des fenêtres autour des ancres
+    for iban in _SPACED_IBANS:
+        assert _names(f"{_PROSE} virement sur {iban} merci") == [("iban", iban)]
+        assert _names(f"{iban} {_PROSE}") == [("iban", iban)]
+
+
+def test_windowed_scan_matches_full_scan():
+    engine = PatternEngine()
+    # ancre d'un autre motif (@) juste avant l'IBAN: sa fenêtre s'arrête au milieu
+    text = f"{_PROSE} contact jean@example.com, payer sur {_SPACED_IBANS[2]} puis {_SPACED_IBANS[0]}. {_PROSE}"
+    assert engine.scan(text) == list(engine._iter_region(text, 0, len(text)))
+    assert [spec.name for _, _, spec in engine.scan(text)] == ["email", "iban", "iban"]
+
+
+# --- Fenêtres de tokens ---
+
+
+class _WordTokenizer:
+    """Un token par mot, offsets comme un tokenizer HF "fast"."""
+
+    model_max_length = 10_000
+
+    def num_special_tokens_to_add(self, pair: bool = False) -> int:
+        return 0
+
+    def __call__(self, text: str, add_special_tokens: bool = False, return_offsets_mapping: bool = True):
+        return {"offset_mapping": [m.span() for m in re.finditer(r"\S+", text)]}
+
+
+class _CapitalizedNer:
+    """Faux pipeline token-classification: chaque mot capitalisé est une PER."""
+
+    def __init__(self) -> None:
+        self.tokenizer = _WordTokenizer()
+
+    def __call__(self, texts, batch_size: int = 1):
+        return [
+            [
+                {"entity_group": "PER", "start": m.start(), "end": m.end(), "word": m.group(0), "score": 0.9}
+                for m in re.finditer(r"\b[A-Z]\w+", t)
+            ]
+            for t in texts
+        ]
+
+
+def test_windows_overlap_and_cover_text():
+    text = " ".join(f"w{i}" for i in range(50))
+    chunker = TokenWindowChunker(_WordTokenizer(), max_tokens=10, overlap=4, batch_size=2)
+    windows = list(chunker.windows(text))
+    assert windows[0][0] == 0
+    assert windows[-1][1] == len(text)
+    for (s1, e1), (s2, _) in zip(windows, windows[1:]):
+        assert s2 < e1  # fenêtres consécutives qui se chevauchent
+
+
+def test_token_windows_dedup_entities():
+    words = [("Alice" if i % 7 == 0 else f"mot{i}") for i in range(60)]
+    text = " ".join(words)
+    expected = [(m.start(), m.end()) for m in re.finditer(r"Alice", text)]
+
+    [spans] = run_token_classification(_CapitalizedNer(), [text], max_tokens=10, overlap=4, batch_size=3)
+
+    # chaque entité vue dans 2 fenêtres n'est gardée qu'une fois, aux offsets du texte d'origine
+    assert [(e["start"], e["end"]) for e in spans] == expected
+    assert all(text[e["start"] : e["end"]] == "Alice" for e in spans)
+
+
+def test_token_windows_several_texts():
+    texts = ["Bob " + "x " * 30 + "Carol", "", "Dave"]
+    out = run_token_classification(_CapitalizedNer(), texts, max_tokens=8, overlap=2, batch_size=4)
+    assert [[t[e["start"] : e["end"]] for e in spans] for t, spans in zip(texts, out)] == [
+        ["Bob", "Carol"],
+        [],
+        ["Dave"],
+    ]
+
+
+# --- Cascade NER ---
+
+
+def test_cascade_gate_short_texts():
+    gate = NerGate()
+    # majuscule en tête d'un texte court: compte (valeur isolée, phrase seule)
+    assert gate.has_signal("Dupont")
+    assert gate.has_signal("Durand a appelé hier.")
+    # prénoms courts
+    assert gate.has_signal("Léa")
+    assert gate.has_signal("eva")
+    # adresse en minuscules
+    assert gate.has_signal("livraison au 12 rue des lilas")
+
+
+def test_cascade_gate_skips_noise():
+    gate = NerGate()
+    assert not gate.has_signal("123456 789")
+    assert not gate.has_signal("2024-01-01T10:00:00")
+    long_text = ("Le stock est mis à jour chaque nuit. " * 10).strip()
+    assert not gate.has_signal(long_text)
+
+
+def test_structured_pipeline_bypasses_cascade():
+    calls = []
+
+    class _Orchestrator:
+        def detect_batch(self, *, texts, **kwargs):
+            calls.append(kwargs.get("cascade"))
+            return [DetectionResult(spans=[], by_detector={}, summary={}) for _ in texts], {}
+
+    pipeline = StructuredPipeline(orchestrator=_Orchestrator())
+    pipeline.detect_object(obj={"nom": "benzema", "ville": "lyon"}, detectors=["hf"])
+    pipeline.profile_rows(rows=[{"nom": "benzema"}], detectors=["hf"])
+    assert calls and all(c is False for c in calls)
@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import datetime as dt
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.models import JobResult
+from app.db.session import Base
+from app.jobs.queue import JobQueue, JobStatus
+from app.jobs.store import JobWriter
+
+
+@pytest.fixture()
+def session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(bind=engine, autoflush=False, autocommit=False)
+    engine.dispose()
+
+
+@pytest.fixture()
+def queue(session):
+    q = JobQueue(
+        session_factory=session,
+        visibility_timeout_s=60,
+        retry_backoff_s=0,
+        writer=JobWriter(session, interval_ms=0),
+    )
+    yield q
+    q.writer.flush()
+
+
+def _expire_lease(session, job_id: str) -> None:
+    with session() as db:
+        row = db.get(JobResult, job_id)
+        row.lease_expires_at = dt.datetime.now(dt.timezone.utc) - dt.timedelta(seconds=1)
+        db.commit()
+
+
+def test_lease_is_exclusive(queue):
+    job = queue.enqueue(kind="bench_text", params={"text": "x"})
+    queue.writer.flush()
+
+    leased = queue.lease("w1")
+    assert leased is not None and leased.job.id == job.id
+    assert queue.lease("w2") is None
+
+
+def test_expired_lease_is_fenced(queue, session):
+    job = queue.enqueue(kind="bench_text", params={"text": "x"})
+    queue.writer.flush()
+    first = queue.lease("w1")
+    assert first is not None
+
+    # w1 ne renouvelle plus son bail: w2 reprend le job
+    _expire_lease(session, job.id)
+    second = queue.lease("w2")
+    assert second is not None and second.job.id == job.id
+    assert not queue.heartbeat(first)
+
+    # l'ancien détenteur finit quand même: son écriture est ignorée
+    queue.complete(first, {"owner": "w1"})
+    queue.writer.flush()
+    assert queue.get(job.id).status == JobStatus.running
+    assert queue.writer.stats()["lost_leases"] == 1
+
+    queue.complete(second, {"owner": "w2"})
+    queue.writer.flush()
+    record = queue.get(job.id)
+    assert record.status == JobStatus.done
+    assert record.result == {"owner": "w2"}
+
+
+def test_failed_job_is_retried_then_errors(queue):
+    job = queue.enqueue(kind="bench_text", params={"text": "x"}, max_attempts=2)
+    queue.writer.flush()
+
+    leased = queue.lease("w1")
+    assert queue.fail(leased, "boom") == JobStatus.queued
+    queue.writer.flush()
+
+    leased = queue.lease("w1")
+    assert leased is not None and leased.job.attempts == 2
+    assert queue.fail(leased, "boom") == JobStatus.error
+    queue.writer.flush()
+    assert queue.get(job.id).status == JobStatus.error
+    assert queue.lease("w1") is None
+
+
+def test_get_reads_pending_enqueue_without_flush(session):
+    writer = JobWriter(session, interval_ms=60_000)
+    queue = JobQueue(session_factory=session, writer=writer)
+    job = queue.enqueue(kind="bench_text", params={"text": "x"})
+
+    # l'INSERT attend encore le writer: la lecture ne force pas de flush
+    assert writer.stats()["pending"] == 1
+    assert queue.get(job.id).status == JobStatus.queued
+    assert queue.status(job.id).kind == "bench_text"
+    assert writer.stats()["pending"] == 1
+
+    writer.flush()
+    assert queue.get(job.id).status == JobStatus.queued
+    assert queue.get("missing") is None
+
+
+def test_failed_insert_is_retried_not_dropped(session):
+    failures = {"left": 2}
+
+    def flaky_session():
+        db = session()
+        if failures["left"] > 0:
+            failures["left"] -= 1
+
+            def fail():
+                raise RuntimeError("database unavailable")
+
+            db.commit = fail
+        return db
+
+    writer = JobWriter(flaky_session, interval_ms=60_000, retry_backoff_s=0)
+    queue = JobQueue(session_factory=session, writer=writer)
+    job = queue.enqueue(kind="bench_text", params={"text": "x"})
+
+    writer.flush()  # échec: INSERT remis en file
+    assert writer.stats()["retried"] == 1
+    assert queue.get(job.id).status == JobStatus.queued  # toujours visible, pas de 404
+    writer.flush()
+    writer.flush()
+
+    stats = writer.stats()
+    assert stats["retried"] == 2 and stats["dropped"] == 0 and stats["pending"] == 0
+    with session() as db:
+        assert db.get(JobResult, job.id) is not None
+
+
+def test_prune_events_of_finished_jobs(queue, session):
+    old = queue.enqueue(kind="bench_text", params={"text": "x"})
+    live = queue.enqueue(kind="bench_text", params={"text": "y"})
+    queue.writer.flush()
+    leased = queue.lease("w1")
+    assert leased.job.id == old.id
+    assert queue.lease("w2").job.id == live.id
+    queue.complete(leased, {"ok": True})
+    queue.writer.flush()
+
+    with session() as db:
+        row = db.get(JobResult, old.id)
+        row.finished_at = dt.datetime.now(dt.timezone.utc) - dt.timedelta(hours=2)
+        db.commit()
+
+    assert queue.events_since(old.id) and queue.events_since(live.id)
+    assert queue.prune_events(older_than_s=3600) > 0
+    assert queue.events_since(old.id) == []
+    # job non terminé: events conservés
+    assert queue.events_since(live.id)
+    assert queue.prune_events(older_than_s=3600) == 0
+
+
+def test_kind_limit_is_global(session):
+    writer = JobWriter(session, interval_ms=0)
+    # deux process workers: chacun sa JobQueue, même base
+    q1 = JobQueue(session_factory=session, writer=writer, kind_limits={"scan": 1})
+    q2 = JobQueue(session_factory=session, writer=writer, kind_limits={"scan": 1})
+    q1.enqueue(kind="scan", params={"path": "a"})
+    q1.enqueue(kind="scan", params={"path": "b"})
+    bench = q1.enqueue(kind="bench_text", params={"text": "x"}, priority="bulk")
+    writer.flush()
+
+    first = q1.lease("w1")
+    assert first is not None and first.job.kind == "scan"
+    # l'autre scan attend, le job bench_text passe malgré sa classe
+    leased = q2.lease("w2")
+    assert leased is not None and leased.job.id == bench.id
+    assert q2.lease("w2") is None
+
+    q1.complete(first, {})
+    writer.flush()
+    assert q2.lease("w2").job.kind == "scan"
+
+
+def test_kind_limit_rechecked_at_update(session):
+    writer = JobWriter(session, interval_ms=0)
+    queue = JobQueue(session_factory=session, writer=writer, kind_limits={"scan": 1})
+    queue.enqueue(kind="scan", params={"path": "a"})
+    queue.enqueue(kind="scan", params={"path": "b"})
+    writer.flush()
+    assert queue.lease("w1") is not None
+
+    # compteurs lus avant le lease concurrent: l'UPDATE refuse quand même
+    queue._under_limit = lambda kind, running: True
+    assert queue.lease("w2") is None
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.core.config import get_settings
+from app.detectors.registry import DetectorRegistry
+from app.models.schemas import DcpSpan
+from app.services.cache import get_detection_cache
+from app.services.orchestrator import Orchestrator
+
+
+class _WordDetector:
+    """Fake detector: one span per occurrence of `word`, after `delay` seconds."""
+
+    def __init__(self, name: str, word: str, label: str, delay: float = 0.0) -> None:
+        self.name, self.word, self.label, self.delay = name, word, label, delay
+        self.calls = 0
+
+    def fingerprint(self) -> str:
+        return f"{self.name}:{self.word}"
+
+    def detect(self, text: str, language: str = "fr"):
+        self.calls += 1
+        time.sleep(self.delay)
+        spans, i = [], text.find(self.word)
+        while i != -1:
+            spans.append(DcpSpan(start=i, end=i + len(self.word), label=self.label, score=0.9, source=self.name))
+            i = text.find(self.word, i + 1)
+        return spans
+
+    def detect_batch(self, texts, language: str = "fr"):
+        return [self.detect(t, language) for t in texts]
+
+
+@pytest.fixture()
+def no_cache(monkeypatch):
+    monkeypatch.setattr(get_settings(), "detection_cache_enabled", False)
+    get_detection_cache.cache_clear()
+    yield
+    get_detection_cache.cache_clear()
+
+
+def _orchestrator(*detectors: _WordDetector) -> Orchestrator:
+    return Orchestrator(DetectorRegistry({d.name: (lambda d=d: d) for d in detectors}))
+
+
+def test_registry_loads_once_under_concurrent_get():
+    loads = []
+    release = threading.Event()
+
+    def slow_factory():
+        loads.append(threading.get_ident())
+        release.wait(5)
+        return object()
+
+    registry = DetectorRegistry({"slow": slow_factory, "other": object})
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        futures = [pool.submit(registry.get, "slow") for _ in range(8)]
+        time.sleep(0.05)
+        # un autre modèle se charge pendant que "slow" est en cours
+        assert registry.get("other") is not None
+        release.set()
+        instances = {id(f.result()) for f in futures}
+
+    assert len(loads) == 1 and len(instances) == 1
+    assert registry.loaded() == ["other", "slow"]
+
+
+def test_parallel_detectors_merge_in_request_order(no_cache):
+    # le plus lent est demandé en premier: il finit en dernier
+    orch = _orchestrator(
+        _WordDetector("slow", "Alice", "PERSON", delay=0.1),
+        _WordDetector("fast", "Paris", "LOCATION"),
+        _WordDetector("mid", "alice@example.com", "EMAIL", delay=0.03),
+    )
+    text = "Alice habite Paris, alice@example.com, et Alice revient à Paris."
+    kwargs = dict(text=text, language="fr", detectors=["slow", "fast", "mid"], min_score=0.4,
+                  merge_overlaps=True, return_text=True)
+
+    parallel = orch.detect(parallel=True, **kwargs)
+    sequential = orch.detect(parallel=False, **kwargs)
+
+    assert list(parallel.by_detector) == ["slow", "fast", "mid"]
+    assert parallel.by_detector == sequential.by_detector
+    assert [(s.start, s.end, s.label) for s in parallel.spans] == [
+        (s.start, s.end, s.label) for s in sequential.spans
+    ]
+    assert [s.start for s in parallel.spans] == sorted(s.start for s in parallel.spans)
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import os
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.connectors.base import Resource
+from app.connectors.filesystem import FileSystemConnector
+from app.db.session import Base
+from app.extractors import pdf_extractor
+from app.extractors.pdf_extractor import PdfExtractor, probe_text_layer
+from app.services import scan_index
+from app.services.scan_engine import ScanEngine
+from app.services.scan_index import ScanIndex
+
+
+@pytest.fixture()
+def index_db(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'index.db'}")
+    Base.metadata.create_all(bind=engine)
+    monkeypatch.setattr(scan_index, "SessionLocal", sessionmaker(bind=engine))
+    yield
+    engine.dispose()
+
+
+def _scan(root, **kw):
+    """One incremental pass: fresh results are a fake summary of the file content."""
+    index = ScanIndex(root=str(root), key="fr|0.40|regex", batch_size=2, **kw)
+    for r in FileSystemConnector().list(str(root)):
+        status, cached = index.check(r)
+        if cached is None:
+            text = open(r.uri.replace("file://", ""), encoding="utf-8").read()
+            index.record({"uri": r.uri, "kind": r.kind, "summary": {"EMAIL": text.count("@")}, "count": 1})
+    return index.finish()
+
+
+def _names(uris):
+    return sorted(os.path.basename(u) for u in uris)
+
+
+def test_incremental_diff(tmp_path, index_db):
+    root = tmp_path / "docs"
+    (root / "sub").mkdir(parents=True)
+    for name, body in {"a.txt": "a@x.fr", "b.txt": "rien", "sub/c.txt": "c", "sub/d.txt": "d"}.items():
+        (root / name).write_text(body)
+
+    first = _scan(root)
+    assert _names(first["new"]) == ["a.txt", "b.txt", "c.txt", "d.txt"]
+    assert first["deleted"] == [] and first["unchanged"] == 0
+
+    (root / "b.txt").write_text("b@x.fr")  # modifié, avec une PII en plus
+    (root / "sub" / "d.txt").unlink()
+    os.utime(root / "a.txt")  # touché sans modification: le hash tranche
+
+    second = _scan(root)
+    assert _names(second["changed"]) == ["b.txt"]
+    assert _names(second["pii_changed"]) == ["b.txt"]
+    assert _names(second["deleted"]) == ["d.txt"]
+    assert second["new"] == [] and second["unchanged"] == 2
+
+    third = _scan(root)
+    assert third["unchanged"] == 3
+    assert third["new"] == third["changed"] == third["deleted"] == []
+
+
+def test_deletions_not_reported_when_listing_truncated(tmp_path, index_db):
+    root = tmp_path / "docs"
+    root.mkdir()
+    for i in range(4):
+        (root / f"f{i}.txt").write_text("x")
+    _scan(root)
+    # listing interrompu à `limit` fichiers: les autres ne sont pas supprimés de l'index
+    index = ScanIndex(root=str(root), key="fr|0.40|regex", limit=2)
+    for r in list(FileSystemConnector().list(str(root)))[:2]:
+        index.check(r)
+    assert index.finish()["deleted"] == []
+    assert _scan(root)["unchanged"] == 4
+
+
+def test_engine_yields_one_result_per_file_when_callbacks_raise():
+    engine = ScanEngine(extract_workers=1, ocr_workers=1, detect_workers=2, max_in_flight=2)
+    resources = [Resource(uri=f"file:///t/{i}.txt", kind="file") for i in range(12)]
+
+    def read_text(r):
+        if r.uri.endswith(("3.txt", "7.txt")):
+            raise OSError("unreadable")
+        return r.uri
+
+    def detect(r, text):
+        if r.uri.endswith(("1.txt", "5.txt")):
+            raise ValueError("detector crashed")
+        return {"uri": r.uri, "kind": r.kind, "summary": {}, "errors": {}, "count": 1}
+
+    def failed(r, key, e):
+        # failed() qui lève lui-même: le moteur doit encore produire un résultat
+        if r.uri.endswith("5.txt"):
+            raise RuntimeError("failed() crashed too")
+        return {"uri": r.uri, "kind": r.kind, "summary": {}, "errors": {key: str(e)}, "count": 0}
+
+    try:
+        results = list(engine.run(resources, read_text=read_text, ocr=read_text, detect=detect, failed=failed))
+    finally:
+        engine.shutdown()
+
+    by_uri = {res["uri"]: res for res in results}
+    assert len(results) == len(resources) == len(by_uri)
+    assert by_uri["file:///t/3.txt"]["errors"] == {"read": "unreadable"}
+    assert by_uri["file:///t/1.txt"]["errors"] == {"scan": "detector crashed"}
+    assert by_uri["file:///t/5.txt"]["errors"] == {"scan": "detector crashed"}
+    assert by_uri["file:///t/0.txt"]["count"] == 1
+
+
+_PROSE = "Le client Jean Dupont a signé le contrat de location le 3 mars. " * 5
+
+
+@pytest.mark.parametrize(
+    "pages, mode",
+    [
+        (["", "  \n", ""], "ocr"),  # PDF scanné: pas de couche texte
+        (["(cid:12)(cid:40)" * 10 + _PROSE], "layout"),  # glyphes non décodés
+        (["Factureno4521montant" * 20], "layout"),  # mots collés par la passe brute
+        ([_PROSE, _PROSE], "raw"),
+    ],
+)
+def test_pdf_probe_mode(monkeypatch, pages, mode):
+    monkeypatch.setattr(pdf_extractor, "iter_raw_pages", lambda path, page_numbers=None: iter(pages))
+    assert probe_text_layer("doc.pdf") == mode
+
+
+def test_pdf_probe_reads_only_sample_pages(monkeypatch):
+    calls = []
+
+    def raw_pages(path, page_numbers=None):
+        calls.append(page_numbers)
+        return iter([_PROSE])
+
+    monkeypatch.setattr(pdf_extractor, "iter_raw_pages", raw_pages)
+    assert PdfExtractor(probe_pages=2).text_mode("doc.pdf") == "raw"
+    assert calls == [[0, 1]]
+    # mode forcé: pas de sondage
+    assert PdfExtractor(mode="layout").text_mode("doc.pdf") == "layout"
+    assert calls == [[0, 1]]
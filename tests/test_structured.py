@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.connectors.database import DatabaseConnector
+from app.core.config import get_settings
+from app.detectors.regex_detector import RegexDetector
+from app.detectors.registry import DetectorRegistry
+from app.services.cache import get_detection_cache
+from app.services.orchestrator import Orchestrator
+from app.services.pipeline_structured import StructuredPipeline
+
+_ROWS = [
+    {"id": i, "email": f"client{i}@example.com", "ville": ["Lyon", "Paris", "Nantes"][i % 3], "note": "RAS"}
+    for i in range(1000)
+]
+
+
+class _CountingRegex(RegexDetector):
+    """Regex detector recording every text it is asked to analyse."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.seen: list[str] = []
+
+    def detect(self, text: str, language: str = "fr", min_score: float = 0.0):
+        self.seen.append(text)
+        return super().detect(text, language, min_score)
+
+
+@pytest.fixture()
+def no_cache(monkeypatch):
+    monkeypatch.setattr(get_settings(), "detection_cache_enabled", False)
+    get_detection_cache.cache_clear()
+    yield
+    get_detection_cache.cache_clear()
+
+
+def test_detect_object_dedups_values_per_column(no_cache):
+    det = _CountingRegex()
+    orch = Orchestrator(DetectorRegistry({"regex": lambda: det}))
+    obj = {
+        "users": [{"email": "a@example.com", "ville": "Lyon"} for _ in range(50)]
+        + [{"email": "b@example.com", "ville": "Lyon"}],
+        "owner": {"email": "a@example.com"},
+    }
+
+    res = StructuredPipeline(orch).detect_object(obj=obj, detectors=["regex"])
+
+    # une détection par valeur distincte et par colonne, pas par cellule
+    assert sorted(det.seen) == ["Lyon", "a@example.com", "a@example.com", "b@example.com"]
+    assert res["stats"] == {"leaves": 103, "columns": 3, "distinct_values": 4}
+    # résultat identique à une détection cellule par cellule
+    for path, field in res["fields"].items():
+        single = orch.detect(
+            text=field["value"], language="fr", detectors=["regex"], min_score=0.4,
+            merge_overlaps=True, return_text=True,
+        )
+        assert field["spans"] == single.spans, path
+    assert res["summary"] == {"EMAIL": 52}
+
+
+def test_profile_stops_early_on_stable_columns():
+    report = StructuredPipeline().profile_rows(rows=_ROWS, detectors=["regex"], step=16, min_rate=0.05)
+    cols = report["columns"]
+
+    assert report["pii_columns"] == ["email"]
+    # 16 emails suffisent: l'intervalle de Wilson est déjà au-dessus de min_rate
+    assert cols["email"]["sampled"] == 16 and cols["email"]["stopped"] == "stable"
+    assert cols["email"]["top_label"] == "EMAIL"
+    # aucun positif: arrêt quand la borne haute passe sous min_rate (~74 valeurs à 95 %)
+    assert cols["ville"]["verdict"] == "no_pii" and cols["ville"]["stopped"] == "stable"
+    assert 64 < cols["ville"]["sampled"] <= 96 < cols["ville"]["total"]
+
+
+def test_profile_reads_whole_small_columns():
+    rows = [{"contact": "a@example.com"}] + [{"contact": "n/a"}] * 9
+    col = StructuredPipeline().profile_rows(rows=rows, detectors=["regex"], min_rate=0.05)["columns"]["contact"]
+    assert col["sampled"] == 10 and col["stopped"] == "exhausted"
+    assert col["verdict"] == "pii"  # colonne lue en entier: taux exact 0.1 >= 0.05
+
+
+def test_database_connector_profile(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'crm.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE clients (id INTEGER, email TEXT, ville TEXT)"))
+        conn.execute(text("INSERT INTO clients VALUES (:id, :email, :ville)"), [
+            {"id": r["id"], "email": r["email"], "ville": r["ville"]} for r in _ROWS[:200]
+        ])
+    with sessionmaker(bind=engine)() as db:
+        report = DatabaseConnector(db).profile("SELECT * FROM clients", detectors=["regex"])
+    engine.dispose()
+
+    assert report["pii_columns"] == ["email"]
+    assert set(report["columns"]) == {"id", "email", "ville"}
+
+
+def test_profile_dispatches_rows_and_objects():
+    pipeline = StructuredPipeline()
+    rows = pipeline.profile(obj=_ROWS[:50], detectors=["regex"])
+    nested = pipeline.profile(obj={"clients": _ROWS[:50]}, detectors=["regex"])
+    assert rows["pii_columns"] == ["email"]
+    assert nested["pii_columns"] == ["clients[*].email"]